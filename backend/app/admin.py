@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, engine, async_engine, sync_pool_metrics, async_pool_metrics
+from app.cache import feed_cache, invalidate_car_feeds
+from app.http_cache import table_versions, tables_changed
+from app.writes import insert_returning, create_row
+from app.loaders import detail_loaders
+from app.query_stats import route_stats
+from app.responses import fast_json
+from app.sessions import revoke_user
+from app.pagination import paginate, apply_filters, count_rows, set_next_cursor, set_total_count
 from app.models.car import Car, CarCreate
-from app.models.car_inventory import CarInventory
+from app.models.car_inventory import CarInventory, return_stock, stock_by_car, take_stock
 from app.models.user import User, UserUpdate
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.purchase import PurchaseModel
 from app.models.employee import Employee, EmployeeCreate
+from app.models.car_rating import backfill_rating_stats, check_rating_stats
+from app.models.category_price import refresh_category_price_stats, backfill_category_price_stats, check_category_price_stats
 
 class EmployeeUpdate(BaseModel):
     name: Optional[str] = None
@@ -36,7 +47,8 @@ class CarUpdate(BaseModel):
     image_link: Optional[str] = None
 
 class StockUpdate(BaseModel):
-    quantity: int
+    quantity: Optional[int] = None
+    delta: Optional[int] = None  # relative change, applied atomically
 
 admin_router = APIRouter()
 
@@ -46,17 +58,60 @@ def model_to_dict(obj):
         return None
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
+class ListParams:
+    """Paging, sorting and counting options shared by the admin list endpoints.
+
+    Any other query parameter named after a column is applied as a filter,
+    e.g. `?status=paid&amount__gte=1000&email__ilike=gmail`.
+    """
+    def __init__(
+        self,
+        request: Request,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        sort: Optional[str] = None,
+        count: str = Query("none", regex="^(none|exact|estimate)$"),
+    ):
+        self.filters = request.query_params
+        self.limit = limit
+        self.cursor = cursor
+        self.skip = skip
+        self.sort = sort
+        self.count = count
+
+def list_rows(query, model, params: ListParams, response: Response, entity=lambda row: row):
+    """Filter, count and keyset-paginate `query`, writing paging headers to `response`."""
+    query = apply_filters(query, model, params.filters)
+    pk = getattr(model, model.__mapper__.primary_key[0].key)
+    field = (params.sort or pk.key).lstrip("-")
+    if field not in model.__table__.columns:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {field}")
+    keys = [pk]
+    nullable = False
+    if field != pk.key:
+        keys = [getattr(model, field), pk]
+        # NULL sort values page after the rest rather than being left out
+        nullable = model.__table__.columns[field].nullable
+    total, estimated = count_rows(query, params.count)
+    rows, next_cursor = paginate(
+        query, keys, params.cursor, params.skip, params.limit,
+        descending=bool(params.sort and params.sort.startswith("-")), entity=entity, nulls_last=nullable,
+    )
+    set_next_cursor(response, next_cursor)
+    set_total_count(response, total, estimated)
+    return rows
+
 @admin_router.post("/admin/cars", response_model=dict)
 def create_car(car: CarCreate, db: Session = Depends(get_db)):
-    db_car = Car(**car.dict())
-    db.add(db_car)
-    db.commit()
-    db.refresh(db_car)
-    # Also create an inventory entry
-    inventory = CarInventory(car_id=db_car.car_id, quantity=10) # Default quantity
-    db.add(inventory)
+    car_id = insert_returning(db, Car, car.dict()).car_id
+    # Also create an inventory entry, committed together with the car
+    insert_returning(db, CarInventory, {"car_id": car_id, "quantity": 10}) # Default quantity
+    refresh_category_price_stats(db, [car.category_id])
     db.commit()
-    return {"message": "Car created successfully", "car_id": db_car.car_id}
+    invalidate_car_feeds()
+    tables_changed("car_inventory")
+    return {"message": "Car created successfully", "car_id": car_id}
 
 @admin_router.put("/admin/cars/{car_id}", response_model=dict)
 def update_car(car_id: int, car_update: CarUpdate, db: Session = Depends(get_db)):
@@ -64,22 +119,46 @@ def update_car(car_id: int, car_update: CarUpdate, db: Session = Depends(get_db)
     if not db_car:
         raise HTTPException(status_code=404, detail="Car not found")
     update_data = car_update.dict(exclude_unset=True)
+    old_category_id = db_car.category_id
     for key, value in update_data.items():
         setattr(db_car, key, value)
+    if "price" in update_data or "category_id" in update_data:
+        db.flush()
+        refresh_category_price_stats(db, [old_category_id, db_car.category_id])
     db.commit()
     db.refresh(db_car)
+    invalidate_car_feeds()
     return {"message": "Car updated successfully", "car_id": db_car.car_id}
 
 @admin_router.put("/admin/cars/{car_id}/stock", response_model=dict)
 def update_car_stock(car_id: int, stock_update: StockUpdate, db: Session = Depends(get_db)):
-    db_inventory = db.query(CarInventory).filter(CarInventory.car_id == car_id).first()
-    if not db_inventory:
+    if (stock_update.quantity is None) == (stock_update.delta is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of quantity or delta")
+    if stock_update.quantity is not None and stock_update.quantity < 0:
+        raise HTTPException(status_code=400, detail="Quantity cannot be negative")
+    # Stock is the sum over the car's locations (as /admin/cars shows it); changes go
+    # through take_stock/return_stock, so concurrent checkouts are never overwritten
+    # and a delta is applied once, not once per location
+    held = db.execute(
+        select(CarInventory.quantity)
+        .where(CarInventory.car_id == car_id)
+        .order_by(CarInventory.inventory_id)
+        .with_for_update()
+    ).scalars().all()
+    if not held:
+        if stock_update.quantity is None:
+            raise HTTPException(status_code=400, detail="No inventory exists for this car; set an absolute quantity")
         # If no inventory exists, create one
-        db_inventory = CarInventory(car_id=car_id, quantity=stock_update.quantity)
-        db.add(db_inventory)
+        db.add(CarInventory(car_id=car_id, quantity=stock_update.quantity))
     else:
-        db_inventory.quantity = stock_update.quantity
+        change = stock_update.delta if stock_update.delta is not None else stock_update.quantity - sum(held)
+        if change < 0 and not take_stock(db, car_id, -change):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Insufficient stock")
+        if change > 0:
+            return_stock(db, car_id, change)
     db.commit()
+    tables_changed("car_inventory")
     return {"message": "Car stock updated successfully", "car_id": car_id}
 
 
@@ -91,22 +170,33 @@ def delete_car(car_id: int, db: Session = Depends(get_db)):
     if not db_car:
         raise HTTPException(status_code=404, detail="Car not found")
     db.delete(db_car)
+    db.flush()
+    refresh_category_price_stats(db, [db_car.category_id])
     db.commit()
+    invalidate_car_feeds()
+    tables_changed("car_inventory")
     return {"message": "Car deleted successfully", "car_id": car_id}
 
+def cars_with_stock(db: Session):
+    """(Car, quantity) with the quantity summed over the car's inventory rows,
+    so each car is one row and paging by car_id never splits it."""
+    stock = stock_by_car()
+    return db.query(Car, stock.c.quantity).outerjoin(stock, Car.car_id == stock.c.car_id)
+
 @admin_router.get("/admin/cars", response_model=List[dict])
-def get_all_cars(db: Session = Depends(get_db)):
-    results = db.query(Car, CarInventory.quantity).outerjoin(CarInventory, Car.car_id == CarInventory.car_id).all()
+def get_all_cars(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    query = cars_with_stock(db)
+    results = list_rows(query, Car, params, response, entity=lambda row: row.Car)
     cars_list = []
     for car, quantity in results:
         car_dict = model_to_dict(car)
         car_dict['quantity'] = quantity if quantity is not None else 0
         cars_list.append(car_dict)
-    return cars_list
+    return fast_json(cars_list, response)
 
 @admin_router.get("/admin/cars/{car_id}", response_model=dict)
 def get_car_details(car_id: int, db: Session = Depends(get_db)):
-    result = db.query(Car, CarInventory.quantity).outerjoin(CarInventory, Car.car_id == CarInventory.car_id).filter(Car.car_id == car_id).first()
+    result = cars_with_stock(db).filter(Car.car_id == car_id).first()
     if not result:
         raise HTTPException(status_code=404, detail="Car not found")
     car, quantity = result
@@ -115,13 +205,13 @@ def get_car_details(car_id: int, db: Session = Depends(get_db)):
     return car_dict
 
 @admin_router.get("/admin/users", response_model=List[dict])
-def get_all_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+def get_all_users(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    users = list_rows(db.query(User), User, params, response)
     return [model_to_dict(user) for user in users]
 
 @admin_router.get("/admin/users/{user_id}", response_model=dict)
 def get_user_details(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).options(joinedload(User.purchases), joinedload(User.reviews)).filter(User.user_id == user_id).first()
+    user = db.query(User).options(*detail_loaders(User, purchases=None, reviews=None)).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user_dict = model_to_dict(user)
@@ -148,16 +238,17 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(db_user)
     db.commit()
+    revoke_user(user_id)
     return {"message": "User deleted successfully", "user_id": user_id}
 
 @admin_router.get("/admin/orders", response_model=List[dict])
-def get_all_orders(db: Session = Depends(get_db)):
-    orders = db.query(Order).all()
+def get_all_orders(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    orders = list_rows(db.query(Order), Order, params, response)
     return [model_to_dict(order) for order in orders]
 
 @admin_router.get("/admin/orders/{order_id}", response_model=dict)
 def get_order_details(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).options(joinedload(Order.order_items)).filter(Order.order_id == order_id).first()
+    order = db.query(Order).options(*detail_loaders(Order, order_items=None)).filter(Order.order_id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     order_dict = model_to_dict(order)
@@ -165,8 +256,8 @@ def get_order_details(order_id: int, db: Session = Depends(get_db)):
     return order_dict
 
 @admin_router.get("/admin/order-items", response_model=List[dict])
-def get_all_order_items(db: Session = Depends(get_db)):
-    order_items = db.query(OrderItem).all()
+def get_all_order_items(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    order_items = list_rows(db.query(OrderItem), OrderItem, params, response)
     return [model_to_dict(item) for item in order_items]
 
 @admin_router.get("/admin/order-items/{order_item_id}", response_model=dict)
@@ -177,13 +268,13 @@ def get_order_item_details(order_item_id: int, db: Session = Depends(get_db)):
     return model_to_dict(item)
 
 @admin_router.get("/admin/purchases", response_model=List[dict])
-def get_all_purchases(db: Session = Depends(get_db)):
-    purchases = db.query(PurchaseModel).all()
+def get_all_purchases(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    purchases = list_rows(db.query(PurchaseModel), PurchaseModel, params, response)
     return [model_to_dict(p) for p in purchases]
 
 @admin_router.get("/admin/purchases/{purchase_id}", response_model=dict)
 def get_purchase_details(purchase_id: int, db: Session = Depends(get_db)):
-    purchase = db.query(PurchaseModel).options(joinedload(PurchaseModel.orders), joinedload(PurchaseModel.user)).filter(PurchaseModel.purchase_id == purchase_id).first()
+    purchase = db.query(PurchaseModel).options(*detail_loaders(PurchaseModel, orders=None, user=None)).filter(PurchaseModel.purchase_id == purchase_id).first()
     if not purchase:
         raise HTTPException(status_code=404, detail="Purchase not found")
     purchase_dict = model_to_dict(purchase)
@@ -192,16 +283,13 @@ def get_purchase_details(purchase_id: int, db: Session = Depends(get_db)):
     return purchase_dict
 
 @admin_router.get("/admin/employees", response_model=List[dict])
-def get_all_employees(db: Session = Depends(get_db)):
-    employees = db.query(Employee).all()
+def get_all_employees(response: Response, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    employees = list_rows(db.query(Employee), Employee, params, response)
     return [model_to_dict(employee) for employee in employees]
 
 @admin_router.post("/admin/employees", response_model=dict)
 def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
-    db_employee = Employee(**employee.dict())
-    db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
+    db_employee = create_row(db, Employee, employee.dict())
     return {"message": "Employee created successfully", "employee_id": db_employee.emp_id}
 
 @admin_router.put("/admin/employees/{employee_id}", response_model=dict)
@@ -224,3 +312,53 @@ def delete_employee(employee_id: int, db: Session = Depends(get_db)):
     db.delete(db_employee)
     db.commit()
     return {"message": "Employee deleted successfully", "employee_id": employee_id}
+
+@admin_router.get("/admin/cache/stats", response_model=dict)
+def get_cache_stats():
+    return {"feeds": feed_cache.stats(), "table_versions": table_versions.snapshot()}
+
+@admin_router.get("/admin/db/pool", response_model=dict)
+def get_pool_stats(db: Session = Depends(get_db)):
+    """Pool saturation for this worker, next to the server's connection budget."""
+    server = {}
+    if engine.dialect.name == "postgresql":
+        server = {
+            "max_connections": int(db.execute(text("SHOW max_connections")).scalar()),
+            "connections": db.execute(text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")).scalar(),
+        }
+    return {
+        "sync": sync_pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.pool),
+        "server": server,
+    }
+
+@admin_router.get("/admin/db/queries", response_model=dict)
+def get_query_stats():
+    """Statements, database time and rows per route for this worker."""
+    return route_stats.snapshot()
+
+@admin_router.delete("/admin/db/queries", response_model=dict)
+def reset_query_stats():
+    route_stats.reset()
+    return {"message": "Query statistics reset"}
+
+@admin_router.post("/admin/ratings/backfill", response_model=dict)
+def backfill_ratings(db: Session = Depends(get_db)):
+    cars = backfill_rating_stats(db)
+    invalidate_car_feeds()
+    return {"message": "Rating aggregates rebuilt", "cars": cars}
+
+@admin_router.get("/admin/ratings/check", response_model=dict)
+def check_ratings(db: Session = Depends(get_db)):
+    mismatches = check_rating_stats(db)
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+@admin_router.post("/admin/category-prices/backfill", response_model=dict)
+def backfill_category_prices(db: Session = Depends(get_db)):
+    categories = backfill_category_price_stats(db)
+    return {"message": "Category price statistics rebuilt", "categories": categories}
+
+@admin_router.get("/admin/category-prices/check", response_model=dict)
+def check_category_prices(db: Session = Depends(get_db)):
+    mismatches = check_category_price_stats(db)
+    return {"consistent": not mismatches, "mismatches": mismatches}
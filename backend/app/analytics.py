@@ -0,0 +1,330 @@
+# app/analytics.py
+"""Materialized views behind the /queries reports.
+
+Each read-only report gets a materialized view (created by migration 3)
+that a background thread refreshes with REFRESH ... CONCURRENTLY, so
+readers keep seeing the previous contents while it rebuilds. Report
+responses say how old their data is in X-Data-As-Of, and `?fresh=true`
+runs the live query instead.
+
+The two category price comparisons take a parameter and are not
+materialized here; they still run live. The car search facet counts for
+an unfiltered search are kept here too (migration 5), so /cars/search
+without filters does not aggregate the whole catalog per request.
+"""
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import Column, DateTime, Integer, String, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import List, NamedTuple, Optional
+import logging
+import os
+import threading
+import time
+
+from app.database import Base, engine, get_db
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_REFRESH_INTERVAL = int(os.getenv("ANALYTICS_REFRESH_INTERVAL", "300"))
+REFRESH_LOCK_ID = 2211_0002  # pg_advisory_lock key, one refresher at a time across workers
+
+DATA_AS_OF_HEADER = "X-Data-As-Of"
+DATA_SOURCE_HEADER = "X-Data-Source"
+
+class ReportView(NamedTuple):
+    view: str
+    definition: str
+    unique_key: str  # REFRESH ... CONCURRENTLY needs a unique index over every row
+    columns: str     # what the report returns, in its column order
+    order_by: str = ""  # also indexed, so reads skip the sort
+    limit: Optional[int] = None
+    migration: int = 3  # schema version that creates the view
+
+    def read(self):
+        sql = f"SELECT {self.columns} FROM {self.view}"
+        if self.order_by:
+            sql += f" ORDER BY {self.order_by}"
+        if self.limit:
+            sql += f" LIMIT {self.limit}"
+        return text(sql)
+
+# Shipments per employee, shipping day and provider: small enough to
+# aggregate per request, and still filterable by date range and provider.
+SHIPMENTS_DAILY = """
+    SELECT emp_id , shipped_date AS day , shipping_provider AS provider ,
+           COUNT(*) AS shipments ,
+           COUNT(*) FILTER (WHERE status = 'delivered') AS delivered
+    FROM shipping
+    GROUP BY emp_id , shipped_date , shipping_provider
+"""
+
+# Facet counts over every available car, one row per (facet, value); the
+# columns must match app.search.FACET_COLUMNS. Within each grouping set
+# only that set's column is non-NULL, so COALESCE picks its value.
+CAR_SEARCH_FACETS = """
+    SELECT CASE WHEN GROUPING(category_id) = 0 THEN 'category_id'
+                WHEN GROUPING(engine_type) = 0 THEN 'engine_type'
+                WHEN GROUPING(transmission) = 0 THEN 'transmission'
+                ELSE 'color' END AS facet ,
+           COALESCE(category_id::text , engine_type , transmission , color) AS value ,
+           COUNT(*) AS count
+    FROM cars
+    WHERE available = TRUE
+    GROUP BY GROUPING SETS ((category_id) , (engine_type) , (transmission) , (color))
+"""
+
+REPORT_VIEWS = {
+    "available-cars-with-category": ReportView(
+        "mv_available_cars_with_category",
+        """SELECT c.car_id , c.model_name , c.manufacturer , c.year , c.price , cat.name AS category_name
+           FROM cars c
+           NATURAL JOIN categories cat
+           WHERE c.available = TRUE""",
+        "car_id",
+        "model_name , manufacturer , year , price , category_name",
+    ),
+    "users-and-purchases": ReportView(
+        "mv_users_and_purchases",
+        """SELECT u.user_id , u.username , p.purchase_id , p.amount , p.date
+           FROM users u
+           LEFT OUTER JOIN purchase p ON u.user_id = p.user_id
+           WHERE p.status = 'paid' OR p.purchase_id IS NULL""",
+        "user_id , purchase_id",
+        "username , purchase_id , amount , date",
+    ),
+    "order-details-with-car-info": ReportView(
+        "mv_order_details_with_car_info",
+        """SELECT oi.order_item_id , o.order_id , o.date AS order_date , c.model_name
+           FROM orders o
+           JOIN order_item oi USING (order_id)
+           JOIN cars c USING (car_id)
+           WHERE o.status = 'processing'""",
+        "order_item_id",
+        "order_id , order_date , model_name",
+    ),
+    "users-with-completed-purchases": ReportView(
+        "mv_users_with_completed_purchases",
+        """SELECT u.user_id , u.username , u.email
+           FROM users u
+           WHERE EXISTS (SELECT 1 FROM purchase p WHERE p.user_id = u.user_id AND p.status = 'paid')""",
+        "user_id",
+        "username , email",
+    ),
+    # One pass over shipping instead of two correlated counts per employee
+    "employees-and-orders-handled": ReportView(
+        "mv_employees_and_orders_handled",
+        """SELECT e.emp_id , e.name , e.position ,
+                  COUNT(s.ship_id) AS total_shipments ,
+                  COUNT(s.ship_id) FILTER (WHERE s.status = 'delivered') AS deliveries_completed
+           FROM employees e
+           LEFT JOIN shipping s ON s.emp_id = e.emp_id
+           WHERE e.status = 'active'
+           GROUP BY e.emp_id , e.name , e.position""",
+        "emp_id",
+        "emp_id , name , position , total_shipments , deliveries_completed",
+        "deliveries_completed DESC , total_shipments DESC , name",
+    ),
+    # Every model's count, so the top 5 is an index read
+    "top-5-most-reviewed-cars": ReportView(
+        "mv_car_review_counts",
+        """SELECT c.model_name , c.manufacturer , COUNT(r.review_id) AS review_count
+           FROM cars c
+           LEFT JOIN reviews r ON c.car_id = r.car_id
+           GROUP BY c.model_name , c.manufacturer""",
+        "model_name , manufacturer",
+        "model_name , manufacturer , review_count",
+        "review_count DESC",
+        limit=5,
+    ),
+    "available-cars-and-inventory": ReportView(
+        "mv_available_cars_and_inventory",
+        """SELECT ci.inventory_id , c.model_name , c.manufacturer , ci.quantity , ci.location
+           FROM cars c
+           INNER JOIN car_inventory ci ON c.car_id = ci.car_id
+           WHERE c.available = TRUE AND ci.quantity > 0""",
+        "inventory_id",
+        "model_name , manufacturer , quantity , location",
+        "quantity DESC",
+    ),
+    "employees-and-shipping-records": ReportView(
+        "mv_employees_and_shipping_records",
+        """SELECT e.emp_id , e.name AS employee_name , e.department ,
+                  s.ship_id , s.shipping_provider , s.status AS shipping_status ,
+                  s.shipped_date , s.delivery_date
+           FROM shipping s
+           RIGHT OUTER JOIN employees e ON s.emp_id = e.emp_id
+           WHERE e.status = 'active'""",
+        "emp_id , ship_id",
+        "emp_id , employee_name , department , ship_id , shipping_provider , shipping_status , shipped_date , delivery_date",
+        "shipped_date DESC NULLS LAST",
+    ),
+    "visible-reviews": ReportView(
+        "mv_visible_reviews",
+        """SELECT r.review_id , r.rating , r.review_text , u.username , c.model_name , r.created_at
+           FROM reviews r
+           JOIN users u USING (user_id)
+           JOIN cars c USING (car_id)
+           WHERE r.is_visible = TRUE""",
+        "review_id",
+        "review_id , rating , review_text , username , model_name",
+        "created_at DESC",
+    ),
+    "electric-or-hybrid-cars": ReportView(
+        "mv_electric_or_hybrid_cars",
+        """SELECT car_id , model_name , manufacturer , engine_type
+           FROM cars
+           WHERE lower(engine_type) IN ('electric', 'hybrid')
+           AND available = TRUE""",
+        "car_id",
+        "model_name , manufacturer , engine_type",
+        "model_name",
+    ),
+    "employee-leaderboard": ReportView(
+        "mv_employee_shipments_daily",
+        SHIPMENTS_DAILY,
+        "emp_id , day , provider",
+        "emp_id , day , provider , shipments , delivered",
+        "day",
+        migration=4,
+    ),
+    "car-search-facets": ReportView(
+        "mv_car_search_facets",
+        CAR_SEARCH_FACETS,
+        "facet , value",
+        "facet , value , count",
+        migration=5,
+    ),
+}
+
+class AnalyticsRefresh(Base):
+    __tablename__ = "analytics_refresh"
+
+    view_name = Column(String(63), primary_key=True)
+    refreshed_at = Column(DateTime, nullable=False)  # UTC, when the refresh snapshot was taken
+    duration_ms = Column(Integer)
+
+def _as_of_header(value: datetime) -> str:
+    return value.isoformat(timespec="seconds") + "Z"
+
+def view_as_of(db: Session, report: str) -> Optional[datetime]:
+    """When `report`'s view was last refreshed; None if it cannot be read yet."""
+    view = REPORT_VIEWS.get(report)
+    if view is None:
+        return None
+    return db.scalar(select(AnalyticsRefresh.refreshed_at).where(
+        AnalyticsRefresh.view_name == view.view,
+        func.to_regclass(AnalyticsRefresh.view_name).isnot(None),  # not dropped by a downgrade
+    ))
+
+def set_data_headers(response: Response, as_of: Optional[datetime]):
+    """Date the response: `as_of` for materialized data, now for live data (None)."""
+    response.headers[DATA_SOURCE_HEADER] = "live" if as_of is None else "materialized"
+    response.headers[DATA_AS_OF_HEADER] = _as_of_header(as_of or datetime.utcnow())
+
+def read_report(db: Session, response: Response, report: str, live, params: Optional[dict] = None, fresh: bool = False):
+    """Rows of `report` from its materialized view, or from `live` when asked
+    for fresh data or when the view has not been populated yet."""
+    as_of = None if fresh else view_as_of(db, report)
+    set_data_headers(response, as_of)
+    if as_of is None:
+        return db.execute(live, params or {}).fetchall()
+    return db.execute(REPORT_VIEWS[report].read()).fetchall()
+
+def _refresh_one(conn, view: str) -> int:
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    # CONCURRENTLY refuses a view that was never populated; only then take the
+    # blocking refresh (ACCESS EXCLUSIVE, readers wait). Any other failure, a
+    # lock timeout say, propagates and refresh_views logs it
+    populated = conn.scalar(text("SELECT ispopulated FROM pg_matviews WHERE matviewname = :v"), {"v": view})
+    concurrently = "CONCURRENTLY " if populated else ""
+    conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{view}"))
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    values = {"view_name": view, "refreshed_at": started_at, "duration_ms": duration_ms}
+    conn.execute(insert(AnalyticsRefresh).values(**values).on_conflict_do_update(
+        index_elements=[AnalyticsRefresh.view_name], set_=values,
+    ))
+    conn.commit()
+    return duration_ms
+
+def refresh_views(views: Optional[List[str]] = None, max_age: Optional[int] = None, bind: Engine = engine) -> dict:
+    """Refresh `views` (default: all that exist) older than `max_age` seconds.
+
+    Returns {view: duration_ms}. Skips everything when another worker holds
+    the refresh lock. Each view commits on its own, so readers pick up new
+    data view by view; the lock is session-level, hence one connection
+    for the whole run.
+    """
+    if bind.dialect.name != "postgresql":
+        return {}
+    names = views or [view.view for view in REPORT_VIEWS.values()]
+    with bind.connect() as conn:
+        if not conn.scalar(text("SELECT pg_try_advisory_lock(:k)"), {"k": REFRESH_LOCK_ID}):
+            return {}
+        try:
+            last = dict(conn.execute(select(AnalyticsRefresh.view_name, AnalyticsRefresh.refreshed_at)).all())
+            conn.commit()
+            refreshed = {}
+            for name in names:
+                if not conn.scalar(text("SELECT to_regclass(:v) IS NOT NULL"), {"v": name}):
+                    continue
+                if max_age is not None and name in last and (datetime.utcnow() - last[name]).total_seconds() < max_age:
+                    continue
+                try:
+                    refreshed[name] = _refresh_one(conn, name)
+                except Exception:
+                    conn.rollback()
+                    logger.exception("Refreshing %s failed", name)
+            return refreshed
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": REFRESH_LOCK_ID})
+            conn.commit()
+
+def start_analytics_refresher(interval: int = ANALYTICS_REFRESH_INTERVAL):
+    """Refresh stale report views now and then every `interval` seconds on a daemon thread."""
+    stop = threading.Event()
+
+    def refresh():
+        while True:
+            try:
+                refresh_views(max_age=interval)
+            except Exception:
+                logger.exception("Analytics refresher failed")
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=refresh, name="analytics-refresher", daemon=True).start()
+    return stop
+
+router = APIRouter(prefix="/admin/analytics", tags=["analytics"])
+
+@router.get("/views")
+def list_views(db: Session = Depends(get_db)):
+    """Each report view with when it was last refreshed and how long that took."""
+    last = {row.view_name: row for row in db.scalars(select(AnalyticsRefresh))}
+    now = datetime.utcnow()
+    views = []
+    for report, view in REPORT_VIEWS.items():
+        row = last.get(view.view)
+        views.append({
+            "report": report,
+            "view": view.view,
+            "refreshed_at": _as_of_header(row.refreshed_at) if row else None,
+            "age_seconds": int((now - row.refreshed_at).total_seconds()) if row else None,
+            "duration_ms": row.duration_ms if row else None,
+        })
+    return views
+
+@router.post("/refresh")
+def refresh_endpoint(report: Optional[str] = None):
+    """Refresh one report's view (?report=) or all of them, whatever their age."""
+    views = None
+    if report is not None:
+        if report not in REPORT_VIEWS:
+            raise HTTPException(status_code=404, detail=f"Unknown report, use one of {sorted(REPORT_VIEWS)}")
+        views = [REPORT_VIEWS[report].view]
+    return {"refreshed": refresh_views(views)}
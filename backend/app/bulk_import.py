@@ -0,0 +1,415 @@
+# app/bulk_import.py
+"""Streaming bulk import of cars, inventory and inventory logs.
+
+    curl -X POST --data-binary @feed.csv -H "Content-Type: text/csv" \
+        "$API/admin/import/cars?job_id=feed-42"
+    curl "$API/admin/import/jobs/feed-42"      # progress while it runs
+
+The body is read as it arrives and cut into batches. Each batch is
+validated, checked against its parent rows in one query, loaded and
+committed, so a bad row costs only itself and a long feed shows progress.
+"""
+from collections import OrderedDict
+from datetime import date, datetime
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, ValidationError, conint
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
+import codecs
+import csv
+import io
+import json
+import threading
+import uuid
+
+from app.database import SessionLocal
+from app.cache import invalidate_car_feeds
+from app.http_cache import tables_changed
+from app.models.car import Car, CarCreate
+from app.models.category import Category
+from app.models.car_inventory import CarInventory, CarInventoryCreate
+from app.models.car_inventory_log import CarInventoryLog, CarInventoryLogCreate
+from app.models.category_price import refresh_category_price_stats
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_ERRORS_KEPT = 1000  # per job; error_count keeps counting past it
+MAX_JOBS_KEPT = 50
+
+class CarImportRow(CarCreate):
+    """A car plus its opening stock; receipt fields add an inventory log row."""
+    quantity: conint(ge=0) = 10  # same default as POST /admin/cars
+    location: Optional[str] = None
+    notes: Optional[str] = None
+    unit_price: Optional[float] = None
+    condition: Optional[str] = None
+    received_date: Optional[date] = None
+
+    def has_receipt(self) -> bool:
+        return any(v is not None for v in (self.unit_price, self.condition, self.received_date))
+
+class RowError(BaseModel):
+    line: int
+    errors: List[Dict[str, str]]
+
+class ImportJobResponse(BaseModel):
+    job_id: str
+    entity: str
+    status: str  # running | done | failed
+    rows_read: int
+    rows_loaded: int
+    rows_failed: int
+    batches: int
+    bytes_read: int
+    rows_per_second: float
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    error_count: int
+    errors: List[RowError]
+    message: Optional[str] = None
+
+# --- loaders -----------------------------------------------------------------
+
+def copy_rows(db: Session, model, columns: List[str], rows: List[dict]):
+    """Load rows with COPY on psycopg2, or one multi-row INSERT elsewhere.
+
+    COPY runs on the session's own connection, inside its transaction.
+    """
+    connection = db.connection()
+    if connection.dialect.driver != "psycopg2":
+        db.execute(insert(model), rows)
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row.get(c) is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        table = model.__table__.name
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+LOG_COLUMNS = ["inventory_id", "car_id", "quantity", "unit_price", "total_value", "condition", "warehouse_location", "received_date"]
+INVENTORY_COLUMNS = ["car_id", "location", "quantity", "notes"]
+CAR_COLUMNS = list(CarCreate.__fields__) + ["added_date"]
+
+def reserve_ids(db: Session, column, count: int) -> List[int]:
+    """Take `count` values from a serial column's sequence in one round trip."""
+    return db.scalars(
+        text("SELECT nextval(pg_get_serial_sequence(:table, :column)) FROM generate_series(1, :count)"),
+        {"table": column.table.name, "column": column.name, "count": count},
+    ).all()
+
+def load_cars(db: Session, rows: List[CarImportRow]):
+    today = date.today()
+    cars = [{**{c: getattr(row, c) for c in CAR_COLUMNS[:-1]}, "added_date": today} for row in rows]
+    inventory = [{"location": row.location, "quantity": row.quantity, "notes": row.notes} for row in rows]
+    if db.connection().dialect.driver == "psycopg2":
+        # COPY returns nothing, so the car and inventory ids are drawn up front
+        for car, stock, car_id, inventory_id in zip(
+            cars, inventory, reserve_ids(db, Car.car_id, len(rows)), reserve_ids(db, CarInventory.inventory_id, len(rows))
+        ):
+            car["car_id"] = stock["car_id"] = car_id
+            stock["inventory_id"] = inventory_id
+        copy_rows(db, Car, ["car_id"] + CAR_COLUMNS, cars)
+        copy_rows(db, CarInventory, ["inventory_id"] + INVENTORY_COLUMNS, inventory)
+    else:
+        car_ids = db.scalars(insert(Car).returning(Car.car_id, sort_by_parameter_order=True), cars).all()
+        for stock, car_id in zip(inventory, car_ids):
+            stock["car_id"] = car_id
+        inventory_ids = db.scalars(
+            insert(CarInventory).returning(CarInventory.inventory_id, sort_by_parameter_order=True), inventory
+        ).all()
+        for stock, inventory_id in zip(inventory, inventory_ids):
+            stock["inventory_id"] = inventory_id
+
+    logs = []
+    for stock, row in zip(inventory, rows):
+        if row.has_receipt():
+            unit_price = row.unit_price if row.unit_price is not None else row.price
+            logs.append({
+                "inventory_id": stock["inventory_id"],
+                "car_id": stock["car_id"],
+                "quantity": row.quantity,
+                "unit_price": unit_price,
+                "total_value": None if unit_price is None else unit_price * row.quantity,
+                "condition": row.condition,
+                "warehouse_location": row.location,
+                "received_date": row.received_date or today,
+            })
+    if logs:
+        copy_rows(db, CarInventoryLog, LOG_COLUMNS, logs)
+    refresh_category_price_stats(db, {row.category_id for row in rows})
+
+def load_inventory(db: Session, rows: List[CarInventoryCreate]):
+    copy_rows(db, CarInventory, INVENTORY_COLUMNS, [row.dict() for row in rows])
+
+def load_inventory_logs(db: Session, rows: List[CarInventoryLogCreate]):
+    copy_rows(db, CarInventoryLog, LOG_COLUMNS, [row.dict() for row in rows])
+
+# --- parent checks: one query per batch, failures become row errors ---------
+
+def _existing(db: Session, column, values) -> set:
+    return set(db.scalars(select(column).where(column.in_(set(values)))).all())
+
+def check_cars(db: Session, rows: List[CarImportRow]) -> List[Optional[str]]:
+    found = _existing(db, Category.category_id, [r.category_id for r in rows])
+    return [None if r.category_id in found else f"category {r.category_id} does not exist" for r in rows]
+
+def check_inventory(db: Session, rows: List[CarInventoryCreate]) -> List[Optional[str]]:
+    found = _existing(db, Car.car_id, [r.car_id for r in rows])
+    return [None if r.car_id in found else f"car {r.car_id} does not exist" for r in rows]
+
+def check_inventory_logs(db: Session, rows: List[CarInventoryLogCreate]) -> List[Optional[str]]:
+    pairs = {(r.inventory_id, r.car_id) for r in rows}
+    found = set(db.execute(
+        select(CarInventory.inventory_id, CarInventory.car_id)
+        .where(tuple_(CarInventory.inventory_id, CarInventory.car_id).in_(pairs))
+    ).all())
+    return [None if (r.inventory_id, r.car_id) in found else f"inventory {r.inventory_id} is not stock of car {r.car_id}" for r in rows]
+
+class Importer(NamedTuple):
+    schema: type
+    check: Callable
+    load: Callable
+
+IMPORTERS = {
+    "cars": Importer(CarImportRow, check_cars, load_cars),
+    "car_inventory": Importer(CarInventoryCreate, check_inventory, load_inventory),
+    "car_inventory_log": Importer(CarInventoryLogCreate, check_inventory_logs, load_inventory_logs),
+}
+
+# --- jobs ----------------------------------------------------------------------
+
+class ImportJob:
+    def __init__(self, job_id: str, entity: str):
+        self.job_id = job_id
+        self.entity = entity
+        self.status = "running"
+        self.rows_read = self.rows_loaded = self.rows_failed = 0
+        self.batches = self.bytes_read = 0
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+        self.errors: List[RowError] = []
+        self.message = None
+
+    def add_error(self, line: int, errors: List[Dict[str, str]]):
+        self.rows_failed += 1
+        if len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append(RowError(line=line, errors=errors))
+
+    def run_batch(self, db: Session, importer: Importer, records: List[Tuple[int, object]]):
+        """Validate, check and load one batch; runs in the threadpool."""
+        valid = []
+        for line, data in records:
+            self.rows_read += 1
+            if isinstance(data, Exception):
+                self.add_error(line, [{"field": "", "message": str(data)}])
+                continue
+            try:
+                valid.append((line, importer.schema.parse_obj(data)))
+            except ValidationError as e:
+                self.add_error(line, [{"field": ".".join(str(p) for p in err["loc"]), "message": err["msg"]} for err in e.errors()])
+        if valid:
+            problems = importer.check(db, [row for _, row in valid])
+            for (line, _), problem in zip(valid, problems):
+                if problem:
+                    self.add_error(line, [{"field": "", "message": problem}])
+            valid = [item for item, problem in zip(valid, problems) if not problem]
+        if valid:
+            self.rows_loaded += self._load(db, importer, valid)
+        self.batches += 1
+
+    def _load(self, db: Session, importer: Importer, valid) -> int:
+        try:
+            importer.load(db, [row for _, row in valid])
+            db.commit()
+            return len(valid)
+        except Exception:
+            db.rollback()
+        # Something only the database caught: retry row by row to find it
+        loaded = 0
+        for line, row in valid:
+            try:
+                with db.begin_nested():
+                    importer.load(db, [row])
+                loaded += 1
+            except Exception as e:
+                self.add_error(line, [{"field": "", "message": str(getattr(e, "orig", e)).strip().splitlines()[0]}])
+        db.commit()
+        return loaded
+
+    def snapshot(self) -> ImportJobResponse:
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return ImportJobResponse(
+            job_id=self.job_id,
+            entity=self.entity,
+            status=self.status,
+            rows_read=self.rows_read,
+            rows_loaded=self.rows_loaded,
+            rows_failed=self.rows_failed,
+            batches=self.batches,
+            bytes_read=self.bytes_read,
+            rows_per_second=round(self.rows_read / elapsed, 1) if elapsed else 0.0,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            error_count=self.rows_failed,
+            errors=list(self.errors),
+            message=self.message,
+        )
+
+_jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+def start_job(entity: str, job_id: Optional[str]) -> ImportJob:
+    with _jobs_lock:
+        job_id = job_id or uuid.uuid4().hex
+        if job_id in _jobs and _jobs[job_id].status == "running":
+            raise HTTPException(status_code=409, detail=f"Import job {job_id} is already running")
+        job = _jobs[job_id] = ImportJob(job_id, entity)
+        _jobs.move_to_end(job_id)
+        while len(_jobs) > MAX_JOBS_KEPT:
+            _jobs.popitem(last=False)
+        return job
+
+# --- parsing -------------------------------------------------------------------
+
+async def read_lines(stream: AsyncIterator[bytes], job: ImportJob) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()  # chunks can split a character
+    pending = ""
+    async for chunk in stream:
+        job.bytes_read += len(chunk)
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+def csv_fields(lines: List[str]) -> Optional[List[str]]:
+    """The fields of the CSV record made of `lines`, or None while csv
+    itself finds a quoted field still open at the end of them."""
+    if len(lines) == 1 and '"' not in lines[0]:
+        return next(csv.reader(lines))
+    # csv.reader only reads the extra line when the last quoted field is not closed
+    reader = csv.reader([line + "\n" for line in lines] + ["\n"])
+    values = next(reader)
+    return None if reader.line_num > len(lines) else values
+
+async def read_records(stream: AsyncIterator[bytes], fmt: str, job: ImportJob) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line number, dict or parse error) for every record in the body."""
+    line_no = 0
+    if fmt == "ndjson":
+        async for line in read_lines(stream, job):
+            line_no += 1
+            if line.strip():
+                try:
+                    data = json.loads(line)
+                    yield line_no, data if isinstance(data, dict) else ValueError("expected a JSON object")
+                except ValueError as e:
+                    yield line_no, e
+        return
+
+    header, record, start = None, [], 0
+    async for line in read_lines(stream, job):
+        line_no += 1
+        if not record:
+            if not line.strip():
+                continue
+            start = line_no
+        record.append(line)
+        try:
+            values = csv_fields(record)
+        except csv.Error as e:
+            # e.g. a quote that never closes, once the open field passes csv.field_size_limit()
+            yield start, ValueError(str(e))
+            record = []
+            continue
+        if values is None:
+            continue  # a quoted field spans lines
+        record = []
+        if header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield start, ValueError(f"expected {len(header)} fields, got {len(values)}")
+        else:
+            # Empty cells are missing values, so optional fields keep their defaults
+            yield start, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield start, ValueError("quoted field not closed before the end of the file")
+
+def detect_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    return fmt
+
+# --- routes --------------------------------------------------------------------
+
+router = APIRouter(prefix="/admin/import", tags=["admin"])
+
+@router.get("/jobs", response_model=List[ImportJobResponse])
+def list_import_jobs():
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.snapshot() for job in reversed(jobs)]
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+def read_import_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.snapshot()
+
+@router.post("/{entity}", response_model=ImportJobResponse)
+async def import_rows(
+    entity: str,
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    job_id: Optional[str] = None,
+):
+    """Stream a CSV (header row first) or NDJSON body into `entity`.
+
+    Pass your own `job_id` to poll GET /admin/import/jobs/{job_id} while
+    the upload runs; the response is the final job report either way.
+    """
+    importer = IMPORTERS.get(entity)
+    if importer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown import entity, use one of {sorted(IMPORTERS)}")
+    fmt = detect_format(request, format)
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    job = start_job(entity, job_id)
+    db = SessionLocal()
+    try:
+        batch = []
+        async for record in read_records(request.stream(), fmt, job):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await run_in_threadpool(job.run_batch, db, importer, batch)
+                batch = []
+        if batch:
+            await run_in_threadpool(job.run_batch, db, importer, batch)
+        job.status = "done"
+    except Exception as e:
+        job.status = "failed"
+        job.message = str(e)
+        raise
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.close()
+        if job.rows_loaded and entity == "cars":
+            invalidate_car_feeds()
+            tables_changed("car_inventory")
+        elif job.rows_loaded and entity == "car_inventory":
+            tables_changed("car_inventory")
+    return job.snapshot()
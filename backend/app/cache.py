@@ -0,0 +1,98 @@
+# app/cache.py
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+import os
+import threading
+import time
+
+from app.http_cache import tables_changed
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    The cache is per process: a write invalidates the worker that handled it,
+    and the TTL bounds how long other workers can serve the old value.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Like get_or_load, for async routes whose loader is a coroutine function."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = await loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, namespace: Hashable = None):
+        """Drop every entry, or only keys that are tuples starting with `namespace`."""
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if isinstance(k, tuple) and k[:1] == (namespace,)]:
+                    del self._data[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+# Home page carousels: top-rated, new arrivals, budget friendly
+feed_cache = TTLCache(
+    maxsize=int(os.getenv("FEED_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("FEED_CACHE_TTL", "60")),
+)
+
+def invalidate_car_feeds():
+    """Call after committing any write to cars or reviews."""
+    feed_cache.invalidate()
+    tables_changed("cars", "car_rating_stats")
@@ -0,0 +1,158 @@
+# app/checkout.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, conint
+from typing import List, Optional
+from datetime import date, timedelta
+from decimal import Decimal
+import time
+
+from app.database import get_async_db
+from app.http_cache import tables_changed
+from app.models.car import Car
+from app.models.car_inventory import take_stock
+from app.models.inventory_hold import claim_hold
+from app.models.purchase import PurchaseModel, PurchaseResponse
+from app.models.order import Order, OrderResponse
+from app.models.order_item import OrderItem, OrderItemResponse
+from app.sessions import SessionClaims, current_session
+
+class CheckoutItem(BaseModel):
+    car_id: int
+    quantity: conint(gt=0)
+
+class CheckoutRequest(BaseModel):
+    payment_method: Optional[str] = None
+    shipping_address: Optional[str] = None
+    expected_delivery: Optional[date] = None
+    invoice_number: Optional[str] = None
+    items: List[CheckoutItem]
+    hold_ids: List[int] = []  # inventory holds taken while the cart was open
+
+class CheckoutResponse(BaseModel):
+    purchase: PurchaseResponse
+    order: OrderResponse
+    order_items: List[OrderItemResponse]
+
+router = APIRouter(prefix="/checkout", tags=["checkout"])
+
+# Deadlock and serialization failure: the transaction lost a race with
+# another one and is safe to run again from the start
+RETRYABLE_SQLSTATES = ("40P01", "40001")
+
+def merge_cart_items(items: List[CheckoutItem]) -> dict:
+    """Collapse repeated cart lines into {car_id: total quantity}, keeping cart order."""
+    merged = {}
+    for item in items:
+        merged[item.car_id] = merged.get(item.car_id, 0) + item.quantity
+    return merged
+
+def checkout_cart(db: Session, checkout: CheckoutRequest, user_id: int):
+    """Write `user_id`'s purchase, order, order items and stock decrements in one transaction."""
+    cart = merge_cart_items(checkout.items)
+    if not cart:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    prices = dict(
+        db.query(Car.car_id, Car.price)
+        .filter(Car.car_id.in_(cart.keys()), Car.available == True)
+        .all()
+    )
+    missing = [car_id for car_id in cart if car_id not in prices]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Cars not available: {missing}")
+
+    try:
+        # Units already held for this user need no second decrement
+        to_take = dict(cart)
+        for hold_id in sorted(checkout.hold_ids):
+            held = claim_hold(db, hold_id, user_id)
+            if held is None:
+                raise HTTPException(status_code=409, detail=f"Hold {hold_id} has expired or is not yours")
+            if held.car_id not in to_take or held.quantity > to_take[held.car_id]:
+                raise HTTPException(status_code=400, detail=f"Hold {hold_id} does not match the cart")
+            to_take[held.car_id] -= held.quantity
+
+        # Lock stock rows in car_id order, so two carts holding the same cars
+        # in a different order wait for each other instead of deadlocking
+        for car_id, quantity in sorted(to_take.items()):
+            if quantity and not take_stock(db, car_id, quantity):
+                raise HTTPException(status_code=409, detail=f"Insufficient stock for car {car_id}")
+
+        amount = sum(((prices[car_id] or Decimal(0)) * quantity for car_id, quantity in cart.items()), Decimal(0))
+        purchase = db.scalar(
+            insert(PurchaseModel)
+            .values(
+                user_id=user_id,
+                amount=amount,
+                payment_method=checkout.payment_method,
+                status="pending",
+                invoice_number=checkout.invoice_number or f"INV-{int(time.time() * 1000)}",
+            )
+            .returning(PurchaseModel)
+        )
+
+        order = db.scalar(
+            insert(Order)
+            .values(
+                purchase_id=purchase.purchase_id,
+                status="processing",
+                shipping_address=checkout.shipping_address,
+                expected_delivery=checkout.expected_delivery or date.today() + timedelta(days=7),
+            )
+            .returning(Order)
+        )
+
+        order_items = db.scalars(
+            insert(OrderItem).returning(OrderItem),
+            [
+                {
+                    "order_id": order.order_id,
+                    "car_id": car_id,
+                    "quantity": quantity,
+                    "price_at_order": prices[car_id],
+                }
+                for car_id, quantity in cart.items()
+            ],
+        ).all()
+
+        # Serialize before commit so expire_on_commit doesn't trigger reloads
+        response = CheckoutResponse(
+            purchase=PurchaseResponse.from_orm(purchase),
+            order=OrderResponse.from_orm(order),
+            order_items=[OrderItemResponse.from_orm(item) for item in order_items],
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    tables_changed("car_inventory")
+    return response
+
+def _is_retryable(error: DBAPIError) -> bool:
+    return getattr(error.orig, "pgcode", None) in RETRYABLE_SQLSTATES
+
+def checkout_with_retry(db: Session, checkout: CheckoutRequest, user_id: int):
+    """checkout_cart, run once more if it deadlocks; 409 if it does again."""
+    try:
+        return checkout_cart(db, checkout, user_id)
+    except DBAPIError as e:
+        if not _is_retryable(e):
+            raise
+    try:
+        return checkout_cart(db, checkout, user_id)
+    except DBAPIError as e:
+        if not _is_retryable(e):
+            raise
+        raise HTTPException(status_code=409, detail="Checkout conflicted with another order, please retry")
+
+@router.post("/", response_model=CheckoutResponse)
+async def checkout_endpoint(checkout: CheckoutRequest, session: SessionClaims = Depends(current_session),
+                            db: AsyncSession = Depends(get_async_db)):
+    # The buyer is whoever the session token belongs to, never a user_id from the body.
+    # The row locks and commit all go through asyncpg without holding a thread
+    return await db.run_sync(checkout_with_retry, checkout, session.user_id)
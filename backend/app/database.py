@@ -1,13 +1,50 @@
 # app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from dotenv import load_dotenv
 import os
 
+from app.db_metrics import PoolMetrics, instrument_pool, timed_pool
+from app.query_stats import instrument_queries
+
 load_dotenv()  # Load environment variables from .env
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+# Pool sizing, per engine and per worker process. Workers x (size + overflow)
+# x 2 engines has to stay under the server's max_connections.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 to keep forever
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# "null" opens a connection per checkout and leaves pooling to PgBouncer
+POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue")
+# PgBouncer in transaction mode (Neon's -pooler hosts) cannot keep server-side
+# prepared statements across transactions, so asyncpg must not cache them
+PGBOUNCER = os.getenv("DB_PGBOUNCER", "1" if "-pooler" in (DATABASE_URL or "") else "0") == "1"
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+def pool_options(queue_pool, metrics: PoolMetrics) -> dict:
+    if POOL_CLASS == "null":
+        return {"poolclass": timed_pool(NullPool, metrics), "pool_pre_ping": POOL_PRE_PING}
+    return {
+        "poolclass": timed_pool(queue_pool, metrics),
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options(QueuePool, sync_pool_metrics))
+instrument_pool(engine, sync_pool_metrics)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -16,4 +53,38 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def async_url(url: str):
+    """Point a sync PostgreSQL URL at asyncpg and return it with its connect args.
+
+    asyncpg takes TLS as an `ssl` argument instead of libpq's sslmode query
+    parameter, and has no channel_binding option.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return url, {}
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    connect_args = {"ssl": sslmode} if sslmode else {}
+    if PGBOUNCER:
+        query["prepared_statement_cache_size"] = "0"
+        connect_args["statement_cache_size"] = 0
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+# Non-blocking engine for the async routes; shares the database, not the pool
+ASYNC_DATABASE_URL, _async_connect_args = async_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args,
+    **pool_options(AsyncAdaptedQueuePool, async_pool_metrics),
+)
+instrument_pool(async_engine, async_pool_metrics)
+instrument_queries(async_engine)
+# expire_on_commit=False: lazy refreshes after commit cannot run outside the greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,114 @@
+# app/db_metrics.py
+from bisect import bisect_left
+from sqlalchemy import event
+from typing import Sequence
+import threading
+import time
+
+# Upper bounds in milliseconds; the last bucket is everything slower
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Histogram:
+    """Fixed-bucket latency histogram, cumulative like Prometheus."""
+
+    def __init__(self, buckets: Sequence[float] = WAIT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value_ms)] += 1
+            self._sum += value_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "count": running, "sum_ms": round(total, 3)}
+
+class PoolMetrics:
+    """Checkout waits, pre-ping cost and connection churn for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_wait = Histogram()
+        self.pre_ping = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def count(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def snapshot(self, pool) -> dict:
+        size = pool.size() if hasattr(pool, "size") else 0
+        return {
+            "pool": type(pool).__name__,
+            "size": size,
+            "max_overflow": getattr(pool, "_max_overflow", 0),
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "closes": self.closes,
+            "invalidations": self.invalidations,
+            "checkout_wait_ms": self.checkout_wait.snapshot(),
+            "pre_ping_ms": self.pre_ping.snapshot(),
+        }
+
+def timed_pool(base, metrics: PoolMetrics):
+    """Subclass a pool class so every checkout records how long it waited.
+
+    `_do_get` is where a checkout blocks on an empty pool (or opens a new
+    connection); the subclass survives Pool.recreate() on engine.dispose().
+    """
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                record = super()._do_get()
+            except Exception:
+                metrics.count("timeouts")
+                raise
+            now = time.perf_counter()
+            metrics.checkout_wait.observe((now - started) * 1000)
+            record.info["_checked_out_at"] = now
+            return record
+
+    TimedPool.__name__ = base.__name__
+    return TimedPool
+
+def instrument_pool(engine, metrics: PoolMetrics):
+    """Count connection churn and time pre-ping on `engine`'s pool events."""
+    target = engine.sync_engine if hasattr(engine, "sync_engine") else engine
+
+    @event.listens_for(target, "connect")
+    def on_connect(dbapi_connection, record):
+        metrics.count("connects")
+
+    @event.listens_for(target, "close")
+    def on_close(dbapi_connection, record):
+        metrics.count("closes")
+
+    @event.listens_for(target, "invalidate")
+    def on_invalidate(dbapi_connection, record, exception):
+        metrics.count("invalidations")
+
+    @event.listens_for(target, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        # Fires after the pre-ping, so the gap since _do_get is its cost
+        got_at = record.info.pop("_checked_out_at", None)
+        if got_at is not None:
+            metrics.pre_ping.observe((time.perf_counter() - got_at) * 1000)
+        metrics.count("checkouts")
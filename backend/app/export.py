@@ -0,0 +1,112 @@
+# app/export.py
+"""Streaming CSV / NDJSON exports of the admin tables and the /queries reports.
+
+Rows come off a server-side cursor in `EXPORT_BATCH_ROWS` chunks and are
+written to the response as each chunk arrives, so memory stays flat however
+large the table is and the first bytes leave before the query finishes.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import Iterator, Optional
+import csv
+import io
+import json
+import os
+
+from app.database import engine
+from app.pagination import apply_filters
+from app.queries import REPORTS
+from app.models import (
+    Car, CarInventory, CarInventoryLog, Category, Employee, Order, OrderItem,
+    PurchaseModel, ReviewModel, Shipping, User,
+)
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+TABLES = {
+    "cars": Car,
+    "categories": Category,
+    "car_inventory": CarInventory,
+    "car_inventory_log": CarInventoryLog,
+    "employees": Employee,
+    "orders": Order,
+    "order_items": OrderItem,
+    "purchases": PurchaseModel,
+    "reviews": ReviewModel,
+    "shipping": Shipping,
+    "users": User,
+}
+EXCLUDED_COLUMNS = {"users": {"password"}}
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def stream_rows(statement, params: dict, fmt: str) -> Iterator[str]:
+    """Run `statement` on its own connection and yield it encoded, chunk by chunk.
+
+    A plain generator, so StreamingResponse iterates it in the threadpool;
+    the connection is held only while the client is reading.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_BATCH_ROWS).execute(statement, params)
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        for rows in result.partitions(EXPORT_BATCH_ROWS):
+            buffer.seek(0)
+            buffer.truncate()
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+def export_response(statement, params: dict, fmt: str, name: str) -> StreamingResponse:
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    return StreamingResponse(
+        stream_rows(statement, params, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+@router.get("/tables/{table}")
+def export_table(table: str, request: Request, format: str = "csv"):
+    """Dump an admin table in primary key order; column filters work as on /admin lists."""
+    model = TABLES.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table, use one of {sorted(TABLES)}")
+    excluded = EXCLUDED_COLUMNS.get(table, set())
+    columns = [column for column in model.__table__.columns if column.name not in excluded]
+    statement = apply_filters(select(*columns), model, request.query_params)
+    statement = statement.order_by(*model.__table__.primary_key.columns)
+    return export_response(statement, {}, format, table)
+
+@router.get("/reports/{report}")
+def export_report(report: str, format: str = "csv", category_id: Optional[int] = None):
+    """Stream one of the /queries reports; the category reports need ?category_id=."""
+    statement = REPORTS.get(report)
+    if statement is None:
+        raise HTTPException(status_code=404, detail=f"Unknown report, use one of {sorted(REPORTS)}")
+    params = {}
+    if "cat_id" in statement.compile().params:
+        if category_id is None:
+            raise HTTPException(status_code=400, detail="This report needs category_id")
+        params["cat_id"] = category_id
+    return export_response(statement, params, format, report)
@@ -0,0 +1,183 @@
+# app/http_cache.py
+"""Conditional GET: ETag and Last-Modified validators, and 304 responses.
+
+Two kinds of validator:
+
+  * conditional_json() hashes a response body the route has already
+    built, for reads that depend on the caller (the car overview). The
+    lookup runs every time; a match only saves the transfer.
+  * ConditionalGetMiddleware derives the ETag from per-table write
+    counters, for the catalog reads in CONDITIONAL_ROUTES. A client that
+    sends it back gets its 304 before the route runs, so an unchanged
+    page costs no query and no serialization.
+
+Every write path calls tables_changed() for the tables it wrote after
+committing: categories, cars, car_rating_stats (through
+app.cache.invalidate_car_feeds) and car_inventory (stock changes from
+checkout, holds, inventory and admin routes, and imports). The counters
+are per process, like app.cache.TTLCache: a write bumps the worker that
+made it, and every ETag also rolls over each HTTP_CACHE_TTL seconds.
+
+So the table-version ETags are weak (W/"..."): they say the response is
+no older than HTTP_CACHE_TTL, not that its bytes are the ones the client
+holds. With several workers, or a write made outside the API (psql, a
+migration), a client can get 304 for data that changed, for up to
+HTTP_CACHE_TTL seconds. conditional_json() hashes the body and issues
+strong ETags.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+from starlette.routing import Match
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+import hashlib
+import os
+import secrets
+import threading
+import time
+
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "60"))
+# How long a CDN or reverse proxy may reuse a catalog read without asking;
+# browsers (max-age=0) always revalidate, which is the cheap 304
+SHARED_MAX_AGE = int(os.getenv("HTTP_CACHE_SHARED_MAX_AGE", "10"))
+CATALOG_CACHE_CONTROL = f"public, max-age=0, s-maxage={SHARED_MAX_AGE}" if SHARED_MAX_AGE else "public, no-cache"
+
+# Reads served with table-version validators, by route path, and the tables
+# each response is built from
+CONDITIONAL_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/categories/": ("categories",),
+    "/categories/{category_id}": ("categories",),
+    "/cars/category/{category_id}": ("categories", "cars"),
+    "/cars/{car_id}": ("cars",),
+    "/cars/top-rated": ("cars", "car_rating_stats"),
+    "/cars/new-arrivals": ("cars",),
+    "/cars/budget-friendly": ("cars",),
+}
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+def body_etag(body: bytes) -> str:
+    return _etag(body)
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(headers: Mapping[str, str], etag: str) -> bool:
+    """If-None-Match comparison, which is weak: it ignores the W/ prefix on either side."""
+    header = headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in (_opaque(tag.strip()) for tag in header.split(","))
+
+def not_modified(headers: Mapping[str, str], etag: str, last_modified: float) -> bool:
+    # If-Modified-Since only counts when there is no If-None-Match (RFC 9110 13.1.3)
+    if "if-none-match" in headers:
+        return etag_matches(headers, etag)
+    since = headers.get("if-modified-since")
+    if not since:
+        return False
+    try:
+        # Last-Modified is sent rounded down to the second, so a client echoing it
+        # back only matches when nothing changed within that second
+        return parsedate_to_datetime(since).timestamp() >= last_modified
+    except (TypeError, ValueError):
+        return False
+
+def conditional_json(request: Request, body: bytes, cache_control: str = "no-cache",
+                     vary: Optional[str] = None) -> Response:
+    """`body` (already JSON) with an ETag, or 304 when the client holds the same body."""
+    headers = {"ETag": body_etag(body), "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    if etag_matches(request.headers, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class TableVersions:
+    """Per-process write counters and last-change times, by table name."""
+
+    def __init__(self):
+        self.boot_id = secrets.token_hex(8)  # so counters restarting at 0 never match old ETags
+        self.started = float(int(time.time()))  # whole seconds, as Last-Modified is sent
+        self._versions: Dict[str, int] = {}
+        self._changed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        with self._lock:
+            now = time.time()
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._changed[table] = now
+
+    def validators(self, tables: Iterable[str], key: bytes) -> Tuple[str, float]:
+        """(weak ETag, last-modified time) of the response `key` built from `tables`."""
+        epoch = int(time.time() // HTTP_CACHE_TTL)
+        with self._lock:
+            versions = [self._versions.get(table, 0) for table in tables]
+            changed = max(self._changed.get(table, self.started) for table in tables)
+        return "W/" + _etag(f"{self.boot_id}:{epoch}:{versions}:".encode() + key), max(changed, epoch * HTTP_CACHE_TTL)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._versions)
+
+table_versions = TableVersions()
+
+def tables_changed(*tables: str):
+    """Call after committing a write to `tables`, so reads built from them revalidate."""
+    table_versions.bump(*tables)
+
+class ConditionalGetMiddleware:
+    """Pure ASGI. Adds ETag, Last-Modified and Cache-Control to 200s from
+    CONDITIONAL_ROUTES, and answers a matching If-None-Match or
+    If-Modified-Since with 304 without calling the route.
+
+    The validators are taken before the route runs, so a write that lands
+    while the response is being built makes the next revalidation miss
+    rather than pinning the newer body to the older version.
+    """
+
+    def __init__(self, app, routes: Dict[str, Tuple[str, ...]] = CONDITIONAL_ROUTES):
+        self.app = app
+        self.routes = routes
+        self.prefixes = tuple({"/" + path.split("/")[1] for path in routes})
+
+    def match(self, scope):
+        """The route the router will pick, and its tables when it is conditional."""
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route, self.routes.get(getattr(route, "path", None))
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        route, tables = self.match(scope)
+        if tables is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag, last_modified = table_versions.validators(tables, scope["path"].encode() + b"?" + scope["query_string"])
+        headers = [
+            (b"etag", etag.encode()),
+            (b"last-modified", formatdate(last_modified, usegmt=True).encode()),
+            (b"cache-control", CATALOG_CACHE_CONTROL.encode()),
+        ]
+        if not_modified(Headers(scope=scope), etag, last_modified):
+            scope["route"] = route  # so metrics and query stats label the 304 with its route
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
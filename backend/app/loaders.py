@@ -0,0 +1,36 @@
+# app/loaders.py
+"""Loader options for the detail endpoints that return a row with its relationships.
+
+Collections are loaded with selectinload: one `SELECT ... WHERE fk IN (...)`
+per relationship, where a lazy load would run one per attribute access
+during serialization and a joinedload of two collections would return
+parents x children_a x children_b rows. Many-to-one relationships add a
+single row each, so they stay joined.
+"""
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from typing import Optional
+
+def columns_for(model, schema) -> list:
+    """The column attributes of `model` that `schema` serializes, plus the primary key."""
+    fields = set(schema.__fields__)
+    return [
+        getattr(model, prop.key) for prop in model.__mapper__.column_attrs
+        if prop.key in fields or any(column.primary_key for column in prop.columns)
+    ]
+
+def detail_loaders(model, schema: Optional[type] = None, **relationships) -> list:
+    """Options loading `model` and the named relationships in a fixed number of statements.
+
+    Pass a response schema for the row or for a relationship to load only
+    the columns it serializes; None loads every column.
+
+        detail_loaders(User, UserWithActivityResponse, reviews=ReviewSummary, purchases=None)
+    """
+    options = [load_only(*columns_for(model, schema))] if schema is not None else []
+    for name, related_schema in relationships.items():
+        attribute = getattr(model, name)
+        loader = selectinload(attribute) if attribute.property.uselist else joinedload(attribute)
+        if related_schema is not None:
+            loader = loader.load_only(*columns_for(attribute.property.mapper.class_, related_schema))
+        options.append(loader)
+    return options
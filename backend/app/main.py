@@ -1,14 +1,29 @@
 # app/main.py
+import logging
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.models import category, car, user, employee, car_inventory, car_inventory_log, purchase, order, order_item, shipping, review
-from app import queries
+from app.database import engine, Base, SessionLocal
+from app.models import category, car, user, employee, car_inventory, car_inventory_log, purchase, order, order_item, shipping, review, inventory_hold, category_price
+from app import queries, checkout, search, migrations, bulk_import, export, analytics, metrics, passwords
 from app.admin import admin_router
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER
+from app.analytics import DATA_AS_OF_HEADER, DATA_SOURCE_HEADER
+from app.query_stats import QueryStatsMiddleware
+from app.http_cache import ConditionalGetMiddleware
+from app.responses import CompressionMiddleware
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Car Purchase API")
 
+# ETag/Last-Modified for catalog reads, 304 before the route runs; innermost,
+# so CORS, query stats and metrics also see the 304s
+app.add_middleware(ConditionalGetMiddleware)
+# gzip/brotli for bodies over COMPRESS_MIN_SIZE; outside the validators, so
+# the encoded body gets its own ETag
+app.add_middleware(CompressionMiddleware)
+
 # Add CORS middleware
 origins = [
     "http://localhost:5173",  # React app URL
@@ -22,13 +37,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER, DATA_AS_OF_HEADER, DATA_SOURCE_HEADER],
 )
+# Statement count and DB time per request: Server-Timing header, /admin/db/queries
+app.add_middleware(QueryStatsMiddleware)
+# Per-route latency, in-flight requests, pool and cache gauges at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Create all database tables
 Base.metadata.create_all(bind=engine)
 
 # Include routers
 app.include_router(category.router)
+app.include_router(search.router)
 app.include_router(car.router)
 app.include_router(user.router)
 app.include_router(employee.router)
@@ -39,8 +60,33 @@ app.include_router(order.router)
 app.include_router(order_item.router)
 app.include_router(shipping.router)
 app.include_router(review.router)
+app.include_router(inventory_hold.router)
 app.include_router(queries.router)
+app.include_router(checkout.router)
 app.include_router(admin_router)
+app.include_router(bulk_import.router)
+app.include_router(export.router)
+app.include_router(analytics.router)
+app.include_router(metrics.router)
+
+@app.on_event("startup")
+def start_background_jobs():
+    try:
+        migrations.migrate()
+    except migrations.MigrationError:
+        # The API works without the missing indexes and views, only slower;
+        # the failed migration is tried again on the next start
+        logger.exception("Schema migration failed")
+    with SessionLocal() as db:
+        category_price.ensure_category_price_stats(db)
+    # Return stock held by abandoned carts
+    inventory_hold.start_hold_sweeper()
+    # Keep the /queries report views within ANALYTICS_REFRESH_INTERVAL of live
+    analytics.start_analytics_refresher()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    passwords.password_service.shutdown()
 
 @app.get("/")
 def read_root():
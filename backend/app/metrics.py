@@ -0,0 +1,221 @@
+# app/metrics.py
+"""Request, database pool and cache metrics in Prometheus text format at /metrics.
+
+MetricsMiddleware times every HTTP request into a histogram per
+(method, route template, status). Routes are the templates FastAPI
+matched, such as `/cars/{car_id}`, so ids never become labels, and at
+most MAX_SERIES label sets are kept; the rest are counted under
+route="other". Pool and cache figures are read from their own counters
+when /metrics is scraped, so they cost nothing per request.
+
+The figures are per worker process: scrape each worker, or sum them.
+"""
+from fastapi import APIRouter, Response
+import threading
+import time
+
+from app.cache import feed_cache
+from app.database import engine, async_engine, sync_pool_metrics, async_pool_metrics
+from app.db_metrics import Histogram
+from app.passwords import password_service
+from app.sessions import revocations
+from app.query_stats import route_path, route_stats
+
+MAX_SERIES = 1000  # (method, route, status) label sets before the rest become "other"
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.exceptions = 0
+        self._series = {}  # (method, route, status) -> Histogram
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, elapsed_ms: float, exception: bool):
+        key = (method, route, str(status))
+        with self._lock:
+            self.in_flight -= 1
+            self.exceptions += exception
+            histogram = self._series.get(key)
+            if histogram is None:
+                if len(self._series) >= MAX_SERIES:
+                    key = (method, "other", key[2])
+                histogram = self._series.setdefault(key, Histogram(LATENCY_BUCKETS_MS))
+        histogram.observe(elapsed_ms)
+
+    def series(self) -> list:
+        with self._lock:
+            return sorted(self._series.items())
+
+request_metrics = RequestMetrics()
+
+class MetricsMiddleware:
+    """Pure ASGI; the status comes from http.response.start, so streamed bodies are timed to their end."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # an exception before the response started
+        exception = False
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_metrics.started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            exception = True
+            raise
+        finally:
+            request_metrics.finished(
+                scope["method"], route_path(scope) or "unmatched",
+                status, (time.perf_counter() - started) * 1000, exception,
+            )
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class Exposition:
+    """Builds the text format, one HELP/TYPE header per metric family."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+
+    def histogram(self, name: str, snapshot: dict, **labels):
+        # Buckets are kept in milliseconds and exposed in seconds
+        for bound, count in snapshot["buckets"].items():
+            le = bound if bound == "+Inf" else repr(float(bound) / 1000)
+            self.sample(f"{name}_bucket", count, **labels, le=le)
+        self.sample(f"{name}_sum", round(snapshot["sum_ms"] / 1000, 6), **labels)
+        self.sample(f"{name}_count", snapshot["count"], **labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+def _request_families(out: Exposition):
+    series = [(key, histogram.snapshot()) for key, histogram in request_metrics.series()]
+    out.family("http_requests_in_flight", "gauge", "Requests being served by this worker.")
+    out.sample("http_requests_in_flight", request_metrics.in_flight)
+    out.family("http_requests_total", "counter", "Requests served, by method, route template and status.")
+    for (method, route, status), snapshot in series:
+        out.sample("http_requests_total", snapshot["count"], method=method, route=route, status=status)
+    out.family("http_request_exceptions_total", "counter", "Requests that ended in an unhandled exception.")
+    out.sample("http_request_exceptions_total", request_metrics.exceptions)
+    out.family("http_request_duration_seconds", "histogram", "Time from request to the end of the response body.")
+    for (method, route, status), snapshot in series:
+        out.histogram("http_request_duration_seconds", snapshot, method=method, route=route, status=status)
+
+def _query_families(out: Exposition):
+    routes = []
+    for label, stats in route_stats.snapshot().items():
+        method, _, route = label.partition(" ")  # "GET /cars/{car_id}", or "unmatched" / "other"
+        routes.append(({"method": method, "route": route} if route else {"route": label}, stats))
+    out.family("db_statements_total", "counter", "SQL statements sent while serving each route.")
+    for labels, stats in routes:
+        out.sample("db_statements_total", stats["queries"], **labels)
+    out.family("db_statement_rows_total", "counter", "Rows returned or affected by those statements.")
+    for labels, stats in routes:
+        out.sample("db_statement_rows_total", stats["rows"], **labels)
+    out.family("db_request_duration_seconds", "histogram", "Database time per request, by route.")
+    for labels, stats in routes:
+        out.histogram("db_request_duration_seconds", stats["db_ms"], **labels)
+
+def _pool_families(out: Exposition):
+    pools = [
+        ("sync", sync_pool_metrics.snapshot(engine.pool)),
+        ("async", async_pool_metrics.snapshot(async_engine.pool)),
+    ]
+    gauges = [
+        ("size", "Configured pool size."),
+        ("checked_out", "Connections lent out."),
+        ("idle", "Connections waiting in the pool."),
+        ("overflow", "Connections open beyond the pool size."),
+    ]
+    for field, help_text in gauges:
+        out.family(f"db_pool_{field}", "gauge", help_text)
+        for name, snapshot in pools:
+            if snapshot[field] is not None:
+                out.sample(f"db_pool_{field}", snapshot[field], pool=name)
+    counters = [
+        ("checkouts", "Connections checked out."),
+        ("timeouts", "Checkouts that gave up waiting for a connection."),
+        ("connects", "Connections opened."),
+        ("closes", "Connections closed."),
+        ("invalidations", "Connections discarded after an error."),
+    ]
+    for field, help_text in counters:
+        out.family(f"db_pool_{field}_total", "counter", help_text)
+        for name, snapshot in pools:
+            out.sample(f"db_pool_{field}_total", snapshot[field], pool=name)
+    out.family("db_pool_checkout_wait_seconds", "histogram", "Time a checkout waited for a connection.")
+    for name, snapshot in pools:
+        out.histogram("db_pool_checkout_wait_seconds", snapshot["checkout_wait_ms"], pool=name)
+
+def _cache_families(out: Exposition):
+    caches = [("feeds", feed_cache.stats())]
+    for field, kind, help_text in [
+        ("hits", "counter", "Cache lookups answered from the cache."),
+        ("misses", "counter", "Cache lookups that loaded the value."),
+        ("evictions", "counter", "Entries dropped to stay within maxsize."),
+        ("invalidations", "counter", "Invalidations after writes."),
+    ]:
+        out.family(f"cache_{field}_total", kind, help_text)
+        for name, stats in caches:
+            out.sample(f"cache_{field}_total", stats[field], cache=name)
+    out.family("cache_hit_ratio", "gauge", "Hits over lookups since start.")
+    for name, stats in caches:
+        out.sample("cache_hit_ratio", round(stats["hit_ratio"], 4), cache=name)
+    out.family("cache_entries", "gauge", "Entries held.")
+    for name, stats in caches:
+        out.sample("cache_entries", stats["size"], cache=name)
+
+def _password_families(out: Exposition):
+    stats = password_service.stats()
+    out.family("password_jobs_pending", "gauge", "bcrypt jobs queued or running on the password pool.")
+    out.sample("password_jobs_pending", stats["pending"])
+    out.family("password_jobs_rejected_total", "counter", "bcrypt jobs refused with 503 because the queue was full.")
+    out.sample("password_jobs_rejected_total", stats["rejected"])
+
+def _session_families(out: Exposition):
+    out.family("session_revocations", "gauge", "Revoked session tokens and users held until their tokens expire.")
+    out.sample("session_revocations", len(revocations))
+
+def render_metrics() -> str:
+    out = Exposition()
+    _request_families(out)
+    _query_families(out)
+    _pool_families(out)
+    _cache_families(out)
+    _password_families(out)
+    _session_families(out)
+    return out.text()
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,236 @@
+# app/migrations.py
+"""Versioned, idempotent schema migrations: indexes, materialized views and constraint changes.
+
+Applied automatically at startup under an advisory lock, or by hand:
+
+    python -m app.migrations status
+    python -m app.migrations upgrade
+    python -m app.migrations downgrade 1
+
+A migration is recorded as applied only when all of its steps succeeded.
+A failed step raises MigrationError, which stops the upgrade there, so
+the migration is tried again on the next run.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from typing import List, NamedTuple, Optional
+import logging
+import sys
+
+from app.database import engine as default_engine
+from app.search import SEARCH_DOCUMENT, SEARCH_VECTOR
+from app.analytics import REPORT_VIEWS
+
+MIGRATION_LOCK_ID = 2211_0001  # pg_advisory_lock key, shared by all workers
+
+logger = logging.getLogger(__name__)
+
+class MigrationError(Exception):
+    """A migration step failed; the migration was not recorded as applied."""
+
+class IndexSpec(NamedTuple):
+    name: str
+    table: str
+    definition: str  # everything after "ON <table>"
+    unique: bool = False
+    extension: Optional[str] = None  # skipped when this extension cannot be installed
+
+    def create(self) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        return f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {self.name} ON {self.table} {self.definition}"
+
+    def drop(self) -> str:
+        return f"DROP INDEX CONCURRENTLY IF EXISTS {self.name}"
+
+class ViewSpec(NamedTuple):
+    name: str
+    definition: str
+
+    def create(self) -> str:
+        return f"CREATE MATERIALIZED VIEW IF NOT EXISTS {self.name} AS {self.definition}"
+
+    def drop(self) -> str:
+        return f"DROP MATERIALIZED VIEW IF EXISTS {self.name}"
+
+class ConstraintSpec(NamedTuple):
+    name: str
+    table: str
+    definition: str  # everything after "ADD CONSTRAINT <name>"
+    previous: Optional[str] = None  # the definition a downgrade restores; dropped when None
+
+    def _alter(self, definition: Optional[str]) -> str:
+        # One statement, so the table is never left without the constraint
+        drop = f"ALTER TABLE {self.table} DROP CONSTRAINT IF EXISTS {self.name}"
+        return f"{drop}, ADD CONSTRAINT {self.name} {definition}" if definition else drop
+
+    def create(self) -> str:
+        return self._alter(self.definition)
+
+    def drop(self) -> str:
+        return self._alter(self.previous)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    indexes: List[IndexSpec] = []
+    extensions: List[str] = []
+    views: List[ViewSpec] = []  # created before, and dropped after, the indexes
+    constraints: List[ConstraintSpec] = []
+
+def _report_views(version: int) -> List[ViewSpec]:
+    return [ViewSpec(r.view, r.definition) for r in REPORT_VIEWS.values() if r.migration == version]
+
+def _report_view_indexes(version: int) -> List[IndexSpec]:
+    views = [r for r in REPORT_VIEWS.values() if r.migration == version]
+    return [IndexSpec(f"ux_{r.view}", r.view, f"({r.unique_key})", unique=True) for r in views] + [
+        IndexSpec(f"ix_{r.view}_order", r.view, f"({r.order_by})") for r in views if r.order_by
+    ]
+
+MIGRATIONS = [
+    Migration(1, "catalog search", extensions=["pg_trgm"], indexes=[
+        IndexSpec("ix_cars_search_tsv", "cars", f"USING GIN ({SEARCH_VECTOR})"),
+        IndexSpec("ix_cars_search_trgm", "cars", f"USING GIN ({SEARCH_DOCUMENT} gin_trgm_ops)", extension="pg_trgm"),
+    ]),
+    Migration(2, "query workload indexes", indexes=[
+        # Car detail reviews, /reviews/cars/{id}/reviews keyset, rating backfill
+        IndexSpec("ix_reviews_car_visible", "reviews", "(car_id, review_id) WHERE is_visible"),
+        # /queries/visible-reviews ORDER BY created_at DESC
+        IndexSpec("ix_reviews_visible_created", "reviews", "(created_at DESC) WHERE is_visible"),
+        IndexSpec("ix_reviews_user", "reviews", "(user_id)"),
+        # take_stock/return_stock location lookups per car, admin cars join
+        IndexSpec("ix_car_inventory_car", "car_inventory", "(car_id, inventory_id)"),
+        IndexSpec("ix_car_inventory_log_car", "car_inventory_log", "(car_id)"),
+        IndexSpec("ix_order_item_order", "order_item", "(order_id)"),
+        # Purchase-eligibility join and order details by car
+        IndexSpec("ix_order_item_car_order", "order_item", "(car_id, order_id)"),
+        IndexSpec("ix_orders_purchase", "orders", "(purchase_id)"),
+        IndexSpec("ix_orders_processing", "orders", "(order_id) WHERE status = 'processing'"),
+        IndexSpec("ix_purchase_user_status", "purchase", "(user_id, status)"),
+        IndexSpec("ix_shipping_emp_status", "shipping", "(emp_id, status)"),
+        IndexSpec("ix_shippings_emp", "shippings", "(emp_id)"),
+        # Category listing, category price statistics and price bands
+        IndexSpec("ix_cars_category_price", "cars", "(category_id, price DESC)"),
+        # Budget-friendly feed and price-range scans
+        IndexSpec("ix_cars_price", "cars", "(price, car_id) WHERE price IS NOT NULL"),
+        # New-arrivals feed
+        IndexSpec("ix_cars_added_date", "cars", "(added_date DESC, car_id DESC) WHERE added_date IS NOT NULL"),
+        # Available-only reports and engine-type filters (queries 1, 8, 11, search)
+        IndexSpec("ix_cars_available_engine", "cars", "(lower(engine_type)) WHERE available"),
+    ]),
+    Migration(3, "report materialized views", views=_report_views(3), indexes=_report_view_indexes(3)),
+    Migration(4, "employee shipment leaderboard", views=_report_views(4), indexes=_report_view_indexes(4) + [
+        # Live leaderboard with a date range
+        IndexSpec("ix_shipping_shipped_date", "shipping", "(shipped_date)"),
+    ]),
+    Migration(5, "search facet counts", views=_report_views(5), indexes=_report_view_indexes(5)),
+    Migration(6, "rating stats follow their car", constraints=[
+        # Deleting a car deletes its rating aggregates, as category_price_stats does for categories
+        ConstraintSpec("car_rating_stats_car_id_fkey", "car_rating_stats",
+                       "FOREIGN KEY (car_id) REFERENCES cars(car_id) ON DELETE CASCADE",
+                       previous="FOREIGN KEY (car_id) REFERENCES cars(car_id)"),
+    ]),
+]
+
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+def current_version(conn) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table}).scalar()
+
+def _run_up(conn, migration: Migration):
+    unavailable = set()
+    for extension in migration.extensions:
+        try:
+            conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+        except Exception as e:
+            # Optional: only the indexes that need it are skipped
+            unavailable.add(extension)
+            logger.warning("Migration %s: extension %s unavailable: %s", migration.version, extension, e)
+    for constraint in migration.constraints:
+        if not _table_exists(conn, constraint.table):
+            logger.warning("Migration %s: skipping %s, no table %s", migration.version, constraint.name, constraint.table)
+            continue
+        try:
+            conn.execute(text(constraint.create()))
+        except Exception as e:
+            raise MigrationError(f"Migration {migration.version}: could not change {constraint.name}") from e
+    for view in migration.views:
+        try:
+            conn.execute(text(view.create()))
+        except Exception as e:
+            raise MigrationError(f"Migration {migration.version}: could not create {view.name}") from e
+    for index in migration.indexes:
+        if not _table_exists(conn, index.table):
+            logger.warning("Migration %s: skipping %s, no table %s", migration.version, index.name, index.table)
+            continue
+        if index.extension in unavailable:
+            logger.warning("Migration %s: skipping %s, no extension %s", migration.version, index.name, index.extension)
+            continue
+        try:
+            conn.execute(text(index.create()))
+        except Exception as e:
+            # A failed CONCURRENTLY build leaves an INVALID index behind
+            conn.execute(text(index.drop()))
+            raise MigrationError(f"Migration {migration.version}: could not create {index.name}") from e
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n) ON CONFLICT (version) DO NOTHING"),
+        {"v": migration.version, "n": migration.name},
+    )
+
+def _run_down(conn, migration: Migration):
+    for index in reversed(migration.indexes):
+        conn.execute(text(index.drop()))
+    for view in reversed(migration.views):
+        conn.execute(text(view.drop()))
+    for constraint in reversed(migration.constraints):
+        if _table_exists(conn, constraint.table):
+            conn.execute(text(constraint.drop()))
+    conn.execute(text("DELETE FROM schema_migrations WHERE version = :v"), {"v": migration.version})
+
+def migrate(target: Optional[int] = None, engine: Engine = default_engine) -> int:
+    """Move the schema to `target` (default: latest) and return the new version.
+
+    Index builds use CONCURRENTLY so they never block writers, which means
+    they must run outside a transaction, hence the AUTOCOMMIT connection.
+    Materialized views are created populated, by one full query each.
+    """
+    if engine.dialect.name != "postgresql":
+        return 0
+    latest = MIGRATIONS[-1].version
+    target = latest if target is None else target
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATION_LOCK_ID})
+        try:
+            version = current_version(conn)
+            for migration in MIGRATIONS:
+                if version < migration.version <= target:
+                    _run_up(conn, migration)
+            for migration in reversed(MIGRATIONS):
+                if target < migration.version <= version:
+                    _run_down(conn, migration)
+            return current_version(conn)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATION_LOCK_ID})
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "upgrade":
+        print("Schema version:", migrate(int(sys.argv[2]) if len(sys.argv) > 2 else None))
+    elif command == "downgrade":
+        print("Schema version:", migrate(int(sys.argv[2])))
+    else:
+        with default_engine.connect() as conn:
+            version = current_version(conn)
+            conn.commit()
+        for migration in MIGRATIONS:
+            print(f"{'x' if migration.version <= version else ' '} {migration.version:3d} {migration.name}")
@@ -10,4 +10,7 @@ from .purchase import PurchaseModel
 from .order import Order
 from .order_item import OrderItem
 from .shipping import Shipping
-from .review import ReviewModel
\ No newline at end of file
+from .review import ReviewModel
+from .inventory_hold import InventoryHold
+from .car_rating import CarRatingStats
+from .category_price import CategoryPriceStats
\ No newline at end of file
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, ForeignKey, func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, ForeignKey, func, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
-from app.database import get_db, Base
-from datetime import date
+from app.database import get_db, get_async_db, Base
+from app.pagination import paginate, set_next_cursor
+from app.cache import feed_cache, invalidate_car_feeds
+from app.writes import insert_returning, commit_loaded
+from app.http_cache import conditional_json, tables_changed
+from app.sessions import SessionClaims, optional_session
+from datetime import date, datetime
 from app.models.category import Category
-from app.models.review import ReviewModel
-from app.models.car_inventory import CarInventory
+from app.models.review import ReviewModel, get_reviews_by_car_id
+from app.models.user import paid_purchase_for_car
+from app.models.car_inventory import CarInventory, stock_by_car
 from app.models.car_inventory_log import CarInventoryLog
+from app.models.car_rating import CarRatingStats
+from app.models.category_price import refresh_category_price_stats
 from app.models.category import get_category
 
 # Car model
@@ -99,31 +108,32 @@ def get_car(db: Session, car_id: int):
     return db.query(Car).filter(Car.car_id == car_id).first()
 
 def create_car(db: Session, car: CarCreate):
-    db_car = Car(**car.dict())
-    db.add(db_car)
-    db.commit()
-    db.refresh(db_car)
+    db_car = insert_returning(db, Car, car.dict())
 
-    # Create a car_inventory entry for the new car
-    db_inventory = CarInventory(car_id=db_car.car_id, quantity=10) # Default quantity 10
-    db.add(db_inventory)
-    db.commit()
-    db.refresh(db_inventory)
+    # Create a car_inventory entry for the new car, in the same transaction
+    insert_returning(db, CarInventory, {"car_id": db_car.car_id, "quantity": 10}) # Default quantity 10
+    refresh_category_price_stats(db, [db_car.category_id])
+    commit_loaded(db, db_car)
+    invalidate_car_feeds()
+    tables_changed("car_inventory")
 
     return db_car
 
 def get_top_rated_cars(db: Session, limit: int = 6):
+    # Walks the avg_rating index on car_rating_stats instead of aggregating reviews
     result = (
-        db.query(
-            Car,
-            func.avg(ReviewModel.rating).label("rating"),
-        )
-        .join(ReviewModel, Car.car_id == ReviewModel.car_id, isouter=True)
-        .group_by(Car.car_id)
-        .order_by(func.avg(ReviewModel.rating).desc())
+        db.query(Car, CarRatingStats.avg_rating)
+        .join(CarRatingStats, Car.car_id == CarRatingStats.car_id)
+        .filter(CarRatingStats.avg_rating != None)
+        .order_by(CarRatingStats.avg_rating.desc().nulls_last(), CarRatingStats.car_id)
         .limit(limit)
         .all()
     )
+    if len(result) < limit:
+        # Pad with unrated cars, as the old outer join did
+        rated = [car.car_id for car, _ in result]
+        unrated = db.query(Car).filter(Car.car_id.notin_(rated)).order_by(Car.car_id).limit(limit - len(result)).all()
+        result += [(car, None) for car in unrated]
     cars_with_ratings = []
     for car, rating in result:
         car_dict = car.__dict__
@@ -131,43 +141,51 @@ def get_top_rated_cars(db: Session, limit: int = 6):
         cars_with_ratings.append(CarWithRating.parse_obj(car_dict))
     return cars_with_ratings
 
-def get_new_arrivals(db: Session, limit: int = 6):
-    cars = db.query(Car).filter(Car.added_date != None).order_by(Car.added_date.desc()).limit(limit).all()
-    if cars:
-        print("New Arrivals:", [car.car_id for car in cars])
-    
-    return [CarBase.from_orm(car) for car in cars] if cars else []
+def get_new_arrivals(db: Session, limit: int = 6, cursor: Optional[str] = None):
+    query = db.query(Car).filter(Car.added_date != None)
+    cars, next_cursor = paginate(query, [Car.added_date, Car.car_id], cursor, limit=limit, descending=True)
+    return [CarBase.from_orm(car) for car in cars], next_cursor
 
-def get_budget_friendly_cars(db: Session, limit: int = 6):
-    cars = db.query(Car).filter(Car.price != None).order_by(Car.price.asc()).limit(limit).all()
-    if cars:
-        print("Budget Friendly Cars:", [car.car_id for car in cars])
-    
-    return [CarBase.from_orm(car) for car in cars] if cars else []
+def get_budget_friendly_cars(db: Session, limit: int = 6, cursor: Optional[str] = None):
+    query = db.query(Car).filter(Car.price != None)
+    cars, next_cursor = paginate(query, [Car.price, Car.car_id], cursor, limit=limit)
+    return [CarBase.from_orm(car) for car in cars], next_cursor
 
 
 # Routes (Including new route for car details)
 router = APIRouter(prefix="/cars", tags=["cars"])
 
+# The catalog routes run on the async engine; the Session-based helpers
+# above are shared with the sync routes through AsyncSession.run_sync.
 @router.get("/", response_model=List[CarBase])
-def read_cars(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Car).offset(skip).limit(limit).all()
+async def read_cars(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    cars, next_cursor = await db.run_sync(lambda s: paginate(s.query(Car), [Car.car_id], cursor, skip, limit))
+    set_next_cursor(response, next_cursor)
+    return cars
 
 @router.get("/top-rated", response_model=List[CarWithRating])
-def read_top_rated_cars(db: Session = Depends(get_db)):
-    return get_top_rated_cars(db)
+async def read_top_rated_cars(db: AsyncSession = Depends(get_async_db)):
+    return await feed_cache.aget_or_load(("top-rated",), lambda: db.run_sync(get_top_rated_cars))
 
 @router.get("/new-arrivals", response_model=List[CarBase])
-def read_new_arrivals(db: Session = Depends(get_db)):
-    return get_new_arrivals(db)
+async def read_new_arrivals(response: Response, limit: int = 6, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    cars, next_cursor = await feed_cache.aget_or_load(
+        ("new-arrivals", limit, cursor), lambda: db.run_sync(get_new_arrivals, limit, cursor)
+    )
+    set_next_cursor(response, next_cursor)
+    return cars
 
 @router.get("/budget-friendly", response_model=List[CarBase])
-def read_budget_friendly_cars(db: Session = Depends(get_db)):
-    return get_budget_friendly_cars(db)
+async def read_budget_friendly_cars(response: Response, limit: int = 6, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    cars, next_cursor = await feed_cache.aget_or_load(
+        ("budget-friendly", limit, cursor), lambda: db.run_sync(get_budget_friendly_cars, limit, cursor)
+    )
+    set_next_cursor(response, next_cursor)
+    return cars
 
 @router.get("/{car_id}", response_model=CarBase)
-def read_car(car_id: int, db: Session = Depends(get_db)):
-    db_car = get_car(db, car_id)
+async def read_car(car_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_car = await db.get(Car, car_id)
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
     return db_car
@@ -175,10 +193,10 @@ def read_car(car_id: int, db: Session = Depends(get_db)):
 # New endpoint for car details, including inventory and reviews
 @router.get("/car-detail/{car_id}", response_model=CarDetail)
 def read_car_detail(car_id: int, db: Session = Depends(get_db)):
-    return get_car_details(db, car_id)
+    return read_car_inventory_details(car_id, db)
 
 @router.get("/cars/{car_id}/details")
-def get_car_details(car_id: int, db: Session = Depends(get_db)):
+def read_car_inventory_details(car_id: int, db: Session = Depends(get_db)):
     # Get car details
     car = db.query(Car).filter(Car.car_id == car_id).first()
     if not car:
@@ -213,8 +231,8 @@ class CarResponse(CarBase):
         orm_mode = True
 
 @router.get("/{car_id}/details", response_model=CarResponse)
-def read_car_details(car_id: int, db: Session = Depends(get_db)):
-    db_car = get_car_details(db, car_id)
+async def read_car_details(car_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_car = await db.run_sync(get_car_details, car_id)
     if db_car is None:
         raise HTTPException(status_code=404, detail="Car not found")
     return db_car
@@ -227,11 +245,11 @@ def read_car_details(car_id: int, db: Session = Depends(get_db)):
 #     return db.query(Car).filter(Car.category_id == category_id).all()
 
 @router.get("/category/{category_id}", response_model=List[CarBase])
-def read_cars_by_category(category_id: int, db: Session = Depends(get_db)):
-    db_category = get_category(db, category_id)
+async def read_cars_by_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_category = await db.get(Category, category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    cars = db.query(Car).filter(Car.category_id == category_id).all()
+    cars = (await db.scalars(select(Car).where(Car.category_id == category_id))).all()
     return cars
 
 def generate_car_description(db: Session, car: Car) -> str:
@@ -259,19 +277,90 @@ def generate_car_description(db: Session, car: Car) -> str:
         description_parts.append(f"Price: ${car.price}")
     return ", ".join(description_parts) if description_parts else "No description available."
 
+def car_response(db: Session, car: Car, quantity: Optional[int], rating) -> CarResponse:
+    car_dict = car.__dict__
+    car_dict['quantity'] = quantity
+    car_dict['rating'] = rating
+    car_dict['description'] = generate_car_description(db, car)
+    return CarResponse.parse_obj(car_dict)
+
 def get_car_details(db: Session, car_id: int):
-    """Fetch car details with car_inventory data for a specific car_id."""
+    """Fetch car details with the car's stock (summed over its locations) for a specific car_id."""
+    stock = stock_by_car()
     result = (
-        db.query(Car, CarInventory.quantity)
-        .join(CarInventory, Car.car_id == CarInventory.car_id, isouter=True)
+        db.query(Car, func.coalesce(stock.c.quantity, 0), CarRatingStats.avg_rating)
+        .join(stock, Car.car_id == stock.c.car_id, isouter=True)
+        .join(CarRatingStats, Car.car_id == CarRatingStats.car_id, isouter=True)
         .filter(Car.car_id == car_id)
         .first()
     )
     if result is None:
         return None
-    car, quantity = result
-    car_dict = car.__dict__
-    car_dict['quantity'] = quantity
-    car_dict['rating'] = db.query(func.avg(ReviewModel.rating)).filter(ReviewModel.car_id == car.car_id).scalar()
-    car_dict['description'] = generate_car_description(db, car)
-    return CarResponse.parse_obj(car_dict)
\ No newline at end of file
+    car, quantity, rating = result
+    return car_response(db, car, quantity, rating)
+
+class CarReview(BaseModel):
+    review_id: int
+    user_id: int
+    username: Optional[str] = None
+    rating: int
+    review_text: Optional[str] = None
+    created_at: datetime
+    helpful_count: int = 0
+
+class CarOverview(BaseModel):
+    car: CarResponse
+    review_count: int = 0
+    reviews: List[CarReview] = []
+    next_reviews_cursor: Optional[str] = None  # continues at /reviews/cars/{car_id}/reviews?cursor=
+    purchase_id: Optional[int] = None  # the caller's paid purchase of this car, which they may review
+
+def get_car_overview(db: Session, car_id: int, user_id: Optional[int] = None, review_limit: int = 10) -> Optional[CarOverview]:
+    """Everything the car page shows, in two statements.
+
+    The car, its stock, its rating stats and the caller's purchase come back
+    as one row; the first page of visible reviews is the second statement,
+    skipped when car_rating_stats says there are none.
+    """
+    purchase = paid_purchase_for_car(user_id, car_id).scalar_subquery() if user_id is not None else null()
+    stock = stock_by_car()
+    row = db.execute(
+        select(Car, func.coalesce(stock.c.quantity, 0), CarRatingStats.avg_rating, CarRatingStats.visible_count,
+               purchase.label("purchase_id"))
+        .outerjoin(stock, Car.car_id == stock.c.car_id)
+        .outerjoin(CarRatingStats, Car.car_id == CarRatingStats.car_id)
+        .where(Car.car_id == car_id)
+    ).first()
+    if row is None:
+        return None
+    car, quantity, rating, review_count, purchase_id = row
+    reviews, next_cursor = [], None
+    if review_count:
+        reviews, next_cursor = get_reviews_by_car_id(db, car_id, limit=review_limit)
+    return CarOverview(
+        car=car_response(db, car, quantity, rating),
+        review_count=review_count or 0,
+        reviews=[CarReview(
+            review_id=review.ReviewModel.review_id,
+            user_id=review.ReviewModel.user_id,
+            username=review.username,
+            rating=review.ReviewModel.rating,
+            review_text=review.ReviewModel.review_text,
+            created_at=review.ReviewModel.created_at,
+            helpful_count=review.ReviewModel.helpful_count or 0
+        ) for review in reviews],
+        next_reviews_cursor=next_cursor,
+        purchase_id=purchase_id,
+    )
+
+# The car page in one request: /details, the first page of
+# /reviews/cars/{car_id}/reviews and, with a session, purchase-for-car.
+# The body depends on the caller, hence private and Vary: Authorization.
+@router.get("/{car_id}/overview", response_model=CarOverview)
+async def read_car_overview(car_id: int, request: Request, review_limit: int = 10,
+                            session: Optional[SessionClaims] = Depends(optional_session),
+                            db: AsyncSession = Depends(get_async_db)):
+    overview = await db.run_sync(get_car_overview, car_id, session.user_id if session else None, review_limit)
+    if overview is None:
+        raise HTTPException(status_code=404, detail="Car not found")
+    return conditional_json(request, overview.json().encode(), cache_control="private, no-cache", vary="Authorization")
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import Column, Integer, String, ForeignKey
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import Column, Integer, String, ForeignKey, select, update, func
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.writes import create_row
+from app.http_cache import tables_changed
+from app.pagination import paginate, set_next_cursor
 from app.models.review import ReviewModel  # Import ReviewModel (adjust path as needed)
 from app.models.user import User  # Import User model (adjust path as needed)
 
@@ -31,6 +34,7 @@ class CarInventoryCreate(CarInventoryBase):
 
 class CarInventoryUpdate(BaseModel):
     quantity: Optional[int] = None
+    delta: Optional[int] = None  # relative change, applied atomically
     notes: Optional[str] = None
 
 
@@ -45,8 +49,8 @@ router = APIRouter(prefix="/car_inventory", tags=["car_inventory"])
 def get_car_inventory(db: Session, inventory_id: int):
     return db.query(CarInventory).filter(CarInventory.inventory_id == inventory_id).first()
 
-def get_car_inventories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(CarInventory).offset(skip).limit(limit).all()
+def get_car_inventories(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(CarInventory), [CarInventory.inventory_id], cursor, skip, limit)
 
 # Fix: Return a list of car inventories, not just one
 def get_car_inventory_by_car_id(db: Session, car_id: int):
@@ -62,20 +66,88 @@ def get_reviews_by_car_id(db: Session, car_id: int, skip: int = 0, limit: int =
         .all()
     )
 
+def _primary_inventory_id(car_id: int):
+    return (
+        select(func.min(CarInventory.inventory_id))
+        .where(CarInventory.car_id == car_id)
+        .scalar_subquery()
+    )
+
+def stock_by_car():
+    """Subquery of (car_id, quantity) with the quantity summed over each car's
+    locations; outer-join it and coalesce to 0 for cars without inventory."""
+    return (
+        select(CarInventory.car_id, func.sum(CarInventory.quantity).label("quantity"))
+        .group_by(CarInventory.car_id)
+        .subquery()
+    )
+
+def take_stock(db: Session, car_id: int, quantity: int) -> bool:
+    """Atomically remove `quantity` units from a car's stock, across all its
+    locations; False if they do not hold that many between them.
+
+    Usually a single `UPDATE ... SET quantity = quantity - n WHERE quantity >= n`
+    on the car's first location, so concurrent buyers can never drive a count
+    below zero. When that location is short, the car's locations are locked in
+    inventory_id order and the units taken from several of them. The first
+    location is also the first one locked (a failed UPDATE can keep its row
+    lock), so buyers always lock in the same order and cannot deadlock.
+    Does not commit.
+    """
+    result = db.execute(
+        update(CarInventory)
+        .where(CarInventory.inventory_id == _primary_inventory_id(car_id), CarInventory.quantity >= quantity)
+        .values(quantity=CarInventory.quantity - quantity)
+        .returning(CarInventory.quantity)
+    ).first()
+    if result is not None:
+        return True
+    locations = db.execute(
+        select(CarInventory.inventory_id, CarInventory.quantity)
+        .where(CarInventory.car_id == car_id)
+        .order_by(CarInventory.inventory_id)
+        .with_for_update()
+    ).all()
+    if sum(location.quantity for location in locations) < quantity:
+        return False
+    remaining = quantity
+    for inventory_id, available in locations:
+        taken = min(available, remaining)
+        if not taken:
+            continue
+        db.execute(
+            update(CarInventory)
+            .where(CarInventory.inventory_id == inventory_id)
+            .values(quantity=CarInventory.quantity - taken)
+        )
+        remaining -= taken
+        if not remaining:
+            break
+    return True
+
+def return_stock(db: Session, car_id: int, quantity: int):
+    """Atomically add `quantity` units back to a car's stock, at its first
+    location (the units are not tracked per location). Does not commit."""
+    db.execute(
+        update(CarInventory)
+        .where(CarInventory.inventory_id == _primary_inventory_id(car_id))
+        .values(quantity=CarInventory.quantity + quantity)
+    )
+
 def create_car_inventory(db: Session, car_inventory: CarInventoryCreate):
-    db_inventory = CarInventory(**car_inventory.dict())
-    db.add(db_inventory)
-    db.commit()
-    db.refresh(db_inventory)
-    return db_inventory
+    return create_row(db, CarInventory, car_inventory.dict())
 
 @router.post("/", response_model=CarInventoryResponse)
 def create_car_inventory_endpoint(car_inventory: CarInventoryCreate, db: Session = Depends(get_db)):
-    return create_car_inventory(db, car_inventory)
+    db_inventory = create_car_inventory(db, car_inventory)
+    tables_changed("car_inventory")
+    return db_inventory
 
 @router.get("/", response_model=List[CarInventoryResponse])
-def read_car_inventories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_car_inventories(db, skip, limit)
+def read_car_inventories(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    inventories, next_cursor = get_car_inventories(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return inventories
 
 @router.get("/{inventory_id}", response_model=CarInventoryResponse)
 def read_car_inventory(inventory_id: int, db: Session = Depends(get_db)):
@@ -93,14 +165,23 @@ def read_car_inventory_by_car_id(car_id: int, db: Session = Depends(get_db)):
 
 @router.patch("/{car_id}", response_model=CarInventoryResponse)
 def update_car_inventory_endpoint(car_id: int, inventory_update: CarInventoryUpdate, db: Session = Depends(get_db)):
-    db_inventory = db.query(CarInventory).filter(CarInventory.car_id == car_id).first()
+    update_data = inventory_update.dict(exclude_unset=True)
+    delta = update_data.pop("delta", None)
+    stmt = update(CarInventory).where(CarInventory.inventory_id == _primary_inventory_id(car_id))
+    if delta is not None:
+        # Relative changes never lose a concurrent update and never oversell
+        update_data["quantity"] = CarInventory.quantity + delta
+        stmt = stmt.where(CarInventory.quantity + delta >= 0)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    db_inventory = db.scalar(stmt.values(**update_data).returning(CarInventory))
     if db_inventory is None:
+        db.rollback()
+        if delta is not None and get_car_inventory_by_car_id(db, car_id):
+            raise HTTPException(status_code=409, detail="Insufficient stock")
         raise HTTPException(status_code=404, detail="Car inventory not found")
-
-    update_data = inventory_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_inventory, key, value)
-
+    response = CarInventoryResponse.from_orm(db_inventory)
     db.commit()
-    db.refresh(db_inventory)
-    return db_inventory
\ No newline at end of file
+    tables_changed("car_inventory")
+    return response
\ No newline at end of file
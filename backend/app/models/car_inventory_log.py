@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy import Column, Integer, Numeric, String, Date, ForeignKey
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.writes import create_row
+from app.pagination import paginate, set_next_cursor
 from datetime import date
 
 class CarInventoryLog(Base):
@@ -46,23 +48,21 @@ router = APIRouter(prefix="/car_inventory_log", tags=["car_inventory_log"])
 def get_car_inventory_log(db: Session, log_id: int):
     return db.query(CarInventoryLog).filter(CarInventoryLog.log_id == log_id).first()
 
-def get_car_inventory_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(CarInventoryLog).offset(skip).limit(limit).all()
+def get_car_inventory_logs(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(CarInventoryLog), [CarInventoryLog.log_id], cursor, skip, limit)
 
 def create_car_inventory_log(db: Session, log: CarInventoryLogCreate):
-    db_log = CarInventoryLog(**log.dict())
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    return db_log
+    return create_row(db, CarInventoryLog, log.dict())
 
 @router.post("/", response_model=CarInventoryLogResponse)
 def create_car_inventory_log_endpoint(log: CarInventoryLogCreate, db: Session = Depends(get_db)):
     return create_car_inventory_log(db, log)
 
 @router.get("/", response_model=List[CarInventoryLogResponse])
-def read_car_inventory_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_car_inventory_logs(db, skip, limit)
+def read_car_inventory_logs(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    logs, next_cursor = get_car_inventory_logs(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return logs
 
 @router.get("/{log_id}", response_model=CarInventoryLogResponse)
 def read_car_inventory_log(log_id: int, db: Session = Depends(get_db)):
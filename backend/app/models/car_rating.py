@@ -0,0 +1,97 @@
+# app/models/car_rating.py
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.database import Base
+
+class CarRatingStats(Base):
+    """Per-car review aggregates, kept current by the review write paths."""
+    __tablename__ = "car_rating_stats"
+
+    car_id = Column(Integer, ForeignKey("cars.car_id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    visible_count = Column(Integer, nullable=False, default=0)
+    visible_rating_sum = Column(Integer, nullable=False, default=0)
+    avg_rating = Column(Numeric(4, 3))  # visible reviews only; NULL when none
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_car_rating_stats_avg_rating", avg_rating.desc().nulls_last(), "car_id"),
+    )
+
+def apply_review_delta(db: Session, car_id: int, rating: int, count: int = 0, visible: int = 0):
+    """Add `count` reviews and `visible` visible reviews of `rating` stars to a car.
+
+    Negative values remove them. Runs as one upsert inside the caller's
+    transaction, so concurrent reviews of the same car serialize on its row.
+    """
+    stats = CarRatingStats.__table__.c
+    stmt = insert(CarRatingStats).values(
+        car_id=car_id,
+        review_count=count,
+        rating_sum=rating * count,
+        visible_count=visible,
+        visible_rating_sum=rating * visible,
+        avg_rating=rating if visible > 0 else None,
+    )
+    new_count = stats.visible_count + visible
+    new_sum = stats.visible_rating_sum + rating * visible
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[stats.car_id],
+        set_={
+            "review_count": stats.review_count + count,
+            "rating_sum": stats.rating_sum + rating * count,
+            "visible_count": new_count,
+            "visible_rating_sum": new_sum,
+            "avg_rating": func.round(new_sum * 1.0 / func.nullif(new_count, 0), 3),
+            "updated_at": func.now(),
+        },
+    ))
+
+_AGGREGATE_SQL = """
+    SELECT car_id ,
+           COUNT(*) AS review_count ,
+           SUM(rating) AS rating_sum ,
+           COUNT(*) FILTER (WHERE is_visible) AS visible_count ,
+           COALESCE(SUM(rating) FILTER (WHERE is_visible), 0) AS visible_rating_sum ,
+           ROUND(AVG(rating) FILTER (WHERE is_visible), 3) AS avg_rating
+    FROM reviews
+    GROUP BY car_id
+"""
+
+def backfill_rating_stats(db: Session) -> int:
+    """Rebuild car_rating_stats from the reviews table in one transaction."""
+    db.execute(text("LOCK TABLE car_rating_stats IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM car_rating_stats"))
+    result = db.execute(text(f"""
+        INSERT INTO car_rating_stats (car_id , review_count , rating_sum , visible_count , visible_rating_sum , avg_rating)
+        {_AGGREGATE_SQL}
+    """))
+    db.commit()
+    return result.rowcount
+
+def check_rating_stats(db: Session) -> list:
+    """List cars whose stored aggregates differ from a fresh aggregation."""
+    query = text(f"""
+        WITH fresh AS ({_AGGREGATE_SQL})
+        SELECT COALESCE(f.car_id , s.car_id) AS car_id ,
+               f.review_count , s.review_count ,
+               f.visible_count , s.visible_count ,
+               f.avg_rating , s.avg_rating
+        FROM fresh f
+        FULL OUTER JOIN car_rating_stats s ON s.car_id = f.car_id
+        WHERE f.review_count IS DISTINCT FROM NULLIF(s.review_count, 0)
+           OR f.rating_sum IS DISTINCT FROM NULLIF(s.rating_sum, 0)
+           OR COALESCE(f.visible_count, 0) <> COALESCE(s.visible_count, 0)
+           OR COALESCE(f.visible_rating_sum, 0) <> COALESCE(s.visible_rating_sum, 0)
+           OR f.avg_rating IS DISTINCT FROM s.avg_rating
+        ORDER BY 1;
+    """)
+    result = db.execute(query).fetchall()
+    return [{
+        "car_id": row[0],
+        "expected_review_count": row[1], "stored_review_count": row[2],
+        "expected_visible_count": row[3], "stored_visible_count": row[4],
+        "expected_avg_rating": row[5], "stored_avg_rating": row[6],
+    } for row in result]
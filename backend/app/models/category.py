@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.writes import create_row
+from app.pagination import paginate, set_next_cursor
+from app.http_cache import tables_changed
 
 class Category(Base):
     __tablename__ = "categories"
@@ -32,14 +35,12 @@ router = APIRouter(prefix="/categories", tags=["categories"])
 def get_category(db: Session, category_id: int):
     return db.query(Category).filter(Category.category_id == category_id).first()
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Category).offset(skip).limit(limit).all()
+def get_categories(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(Category), [Category.category_id], cursor, skip, limit)
 
 def create_category(db: Session, category: CategoryCreate):
-    db_category = Category(**category.dict())
-    db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    db_category = create_row(db, Category, category.dict())
+    tables_changed("categories")
     return db_category
 
 @router.post("/", response_model=CategoryResponse)
@@ -47,8 +48,10 @@ def create_category_endpoint(category: CategoryCreate, db: Session = Depends(get
     return create_category(db, category)
 
 @router.get("/", response_model=List[CategoryResponse])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_categories(db, skip, limit)
+def read_categories(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    categories, next_cursor = get_categories(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return categories
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 def read_category(category_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,118 @@
+# app/models/category_price.py
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, func, text
+from sqlalchemy.orm import Session
+from typing import Iterable
+from app.database import Base
+
+PRICE_LOCK_ID = 2211_0003  # pg_advisory_xact_lock(key, category_id)
+
+# Cut points of the price bands, as (column, percentile); the bands run
+# min -> p10 -> p25 -> p50 -> p75 -> p90 -> max.
+PERCENTILES = [("p10", 0.10), ("p25", 0.25), ("p50", 0.50), ("p75", 0.75), ("p90", 0.90)]
+_CUTS = ["min_price"] + [name for name, _ in PERCENTILES] + ["max_price"]
+_LABELS = ["p0"] + [name for name, _ in PERCENTILES] + ["p100"]
+# (band, lower bound column, upper bound column), e.g. ("p25-p50", "p25", "p50")
+PRICE_BANDS = [(f"{_LABELS[i]}-{_LABELS[i + 1]}", _CUTS[i], _CUTS[i + 1]) for i in range(len(_CUTS) - 1)]
+
+class CategoryPriceStats(Base):
+    """Per-category price distribution, kept current by the car write paths."""
+    __tablename__ = "category_price_stats"
+
+    category_id = Column(Integer, ForeignKey("categories.category_id", ondelete="CASCADE"), primary_key=True)
+    car_count = Column(Integer, nullable=False, default=0)
+    priced_count = Column(Integer, nullable=False, default=0)  # cars with a price
+    min_price = Column(Numeric(10, 2))
+    max_price = Column(Numeric(10, 2))
+    p10 = Column(Numeric(10, 2))
+    p25 = Column(Numeric(10, 2))
+    p50 = Column(Numeric(10, 2))
+    p75 = Column(Numeric(10, 2))
+    p90 = Column(Numeric(10, 2))
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+def price_bands(stats: CategoryPriceStats) -> list:
+    """The category's price bands; each includes its lower bound, the last one also its upper."""
+    return [
+        {"band": band, "min_price": getattr(stats, lower), "max_price": getattr(stats, upper)}
+        for band, lower, upper in PRICE_BANDS
+    ]
+
+_AGGREGATE_SQL = f"""
+    SELECT cat.category_id ,
+           COUNT(c.car_id) AS car_count ,
+           COUNT(c.price) AS priced_count ,
+           MIN(c.price) AS min_price ,
+           MAX(c.price) AS max_price ,
+           {" , ".join(f"ROUND(CAST(percentile_cont({p}) WITHIN GROUP (ORDER BY c.price) AS NUMERIC), 2) AS {name}" for name, p in PERCENTILES)}
+    FROM categories cat
+    LEFT JOIN cars c ON c.category_id = cat.category_id
+"""
+_COLUMNS = "category_id , car_count , priced_count , min_price , max_price , " + " , ".join(name for name, _ in PERCENTILES)
+
+def refresh_category_price_stats(db: Session, category_ids: Iterable[int]):
+    """Recompute the stats of `category_ids` inside the caller's transaction.
+
+    Call it after the car rows are written. Percentiles cannot be updated
+    by deltas, so each category is re-aggregated, which walks
+    ix_cars_category_price. The per-category advisory lock makes concurrent
+    writers recompute one after another, each from a snapshot that
+    includes the other's committed cars.
+    """
+    ids = sorted({category_id for category_id in category_ids if category_id is not None})
+    if not ids:
+        return
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:k, c) FROM (SELECT unnest(CAST(:ids AS INT[])) AS c ORDER BY 1) AS ids"),
+        {"k": PRICE_LOCK_ID, "ids": ids},
+    )
+    updates = " , ".join(f"{column} = EXCLUDED.{column}" for column in _COLUMNS.split(" , ")[1:])
+    db.execute(text(f"""
+        INSERT INTO category_price_stats ({_COLUMNS})
+        {_AGGREGATE_SQL}
+        WHERE cat.category_id = ANY(CAST(:ids AS INT[]))
+        GROUP BY cat.category_id
+        ON CONFLICT (category_id) DO UPDATE SET {updates} , updated_at = now()
+    """), {"ids": ids})
+
+def backfill_category_price_stats(db: Session) -> int:
+    """Rebuild category_price_stats from the cars table in one transaction."""
+    db.execute(text("LOCK TABLE category_price_stats IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM category_price_stats"))
+    result = db.execute(text(f"""
+        INSERT INTO category_price_stats ({_COLUMNS})
+        {_AGGREGATE_SQL}
+        GROUP BY cat.category_id
+    """))
+    db.commit()
+    return result.rowcount
+
+def ensure_category_price_stats(db: Session) -> int:
+    """Backfill on first start, when cars exist but no stats were ever written."""
+    if db.scalar(text("SELECT EXISTS (SELECT 1 FROM category_price_stats)")):
+        return 0
+    if not db.scalar(text("SELECT EXISTS (SELECT 1 FROM cars)")):
+        return 0
+    return backfill_category_price_stats(db)
+
+def check_category_price_stats(db: Session) -> list:
+    """List categories whose stored stats differ from a fresh aggregation."""
+    # A category without a row has no cars yet
+    compared = [f"f.{c} <> COALESCE(s.{c}, 0)" for c in ("car_count", "priced_count")]
+    compared += [f"f.{c} IS DISTINCT FROM s.{c}" for c in ["min_price", "max_price"] + [name for name, _ in PERCENTILES]]
+    query = text(f"""
+        WITH fresh AS ({_AGGREGATE_SQL} GROUP BY cat.category_id)
+        SELECT f.category_id , f.car_count , s.car_count , f.priced_count , s.priced_count ,
+               f.min_price , s.min_price , f.max_price , s.max_price
+        FROM fresh f
+        LEFT JOIN category_price_stats s ON s.category_id = f.category_id
+        WHERE {" OR ".join(compared)}
+        ORDER BY 1;
+    """)
+    result = db.execute(query).fetchall()
+    return [{
+        "category_id": row[0],
+        "expected_car_count": row[1], "stored_car_count": row[2],
+        "expected_priced_count": row[3], "stored_priced_count": row[4],
+        "expected_min_price": row[5], "stored_min_price": row[6],
+        "expected_max_price": row[7], "stored_max_price": row[8],
+    } for row in result]
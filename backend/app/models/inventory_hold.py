@@ -0,0 +1,170 @@
+# app/models/inventory_hold.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, select, delete
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, conint
+from typing import Optional
+from app.database import get_db, Base, SessionLocal
+from app.models.car_inventory import take_stock, return_stock
+from app.http_cache import tables_changed
+from app.sessions import SessionClaims, current_session
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL_SECONDS = int(os.getenv("HOLD_TTL_SECONDS", "900"))
+HOLD_SWEEP_INTERVAL = int(os.getenv("HOLD_SWEEP_INTERVAL", "30"))
+
+class InventoryHold(Base):
+    __tablename__ = "inventory_holds"
+
+    hold_id = Column(Integer, primary_key=True, index=True)
+    car_id = Column(Integer, ForeignKey("cars.car_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"))
+    quantity = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class InventoryHoldCreate(BaseModel):
+    car_id: int
+    user_id: Optional[int] = None  # the signed-in user; set from the session token
+    quantity: conint(gt=0) = 1
+    ttl_seconds: Optional[conint(gt=0)] = None
+
+class InventoryHoldResponse(BaseModel):
+    hold_id: int
+    car_id: int
+    user_id: Optional[int] = None
+    quantity: int
+    created_at: datetime
+    expires_at: datetime
+
+    class Config:
+        orm_mode = True
+
+router = APIRouter(prefix="/inventory_holds", tags=["inventory_holds"])
+
+def get_hold(db: Session, hold_id: int):
+    return db.query(InventoryHold).filter(InventoryHold.hold_id == hold_id).first()
+
+def create_hold(db: Session, hold: InventoryHoldCreate):
+    """Move stock out of car_inventory into a time-limited hold; None if short."""
+    if not take_stock(db, hold.car_id, hold.quantity):
+        db.rollback()
+        return None
+    db_hold = InventoryHold(
+        car_id=hold.car_id,
+        user_id=hold.user_id,
+        quantity=hold.quantity,
+        expires_at=datetime.utcnow() + timedelta(seconds=hold.ttl_seconds or HOLD_TTL_SECONDS),
+    )
+    db.add(db_hold)
+    db.flush()
+    response = InventoryHoldResponse.from_orm(db_hold)
+    db.commit()
+    tables_changed("car_inventory")
+    return response
+
+def claim_hold(db: Session, hold_id: int, user_id: Optional[int] = None):
+    """Delete an unexpired hold and return (car_id, quantity), or None if it is gone.
+
+    The stock stays decremented; the caller's transaction takes ownership of it.
+    """
+    stmt = delete(InventoryHold).where(
+        InventoryHold.hold_id == hold_id,
+        InventoryHold.expires_at > datetime.utcnow(),
+    )
+    if user_id is not None:
+        stmt = stmt.where(InventoryHold.user_id == user_id)
+    return db.execute(stmt.returning(InventoryHold.car_id, InventoryHold.quantity)).first()
+
+def release_hold(db: Session, hold_id: int, user_id: Optional[int] = None) -> bool:
+    """Delete a hold (only `user_id`'s, when given) and put its units back into stock."""
+    stmt = delete(InventoryHold).where(InventoryHold.hold_id == hold_id)
+    if user_id is not None:
+        stmt = stmt.where(InventoryHold.user_id == user_id)
+    row = db.execute(stmt.returning(InventoryHold.car_id, InventoryHold.quantity)).first()
+    if row is None:
+        return False
+    return_stock(db, row.car_id, row.quantity)
+    db.commit()
+    tables_changed("car_inventory")
+    return True
+
+def release_expired_holds(db: Session, batch_size: int = 500) -> int:
+    """Return the stock of expired holds. Safe to run from several workers at once."""
+    expired = (
+        select(InventoryHold.hold_id)
+        .where(InventoryHold.expires_at <= datetime.utcnow())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        delete(InventoryHold)
+        .where(InventoryHold.hold_id.in_(expired))
+        .returning(InventoryHold.car_id, InventoryHold.quantity)
+    ).all()
+    released = {}
+    for car_id, quantity in rows:
+        released[car_id] = released.get(car_id, 0) + quantity
+    for car_id, quantity in released.items():
+        return_stock(db, car_id, quantity)
+    db.commit()
+    if rows:
+        tables_changed("car_inventory")
+    return len(rows)
+
+def start_hold_sweeper(interval: int = HOLD_SWEEP_INTERVAL):
+    """Run release_expired_holds every `interval` seconds on a daemon thread."""
+    stop = threading.Event()
+
+    def sweep():
+        while not stop.wait(interval):
+            db = SessionLocal()
+            try:
+                release_expired_holds(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Hold sweeper failed")
+            finally:
+                db.close()
+
+    threading.Thread(target=sweep, name="hold-sweeper", daemon=True).start()
+    return stop
+
+@router.post("/", response_model=InventoryHoldResponse)
+def create_hold_endpoint(hold: InventoryHoldCreate, session: SessionClaims = Depends(current_session), db: Session = Depends(get_db)):
+    # Holds always belong to a user, so checkout can claim them and only that user can release them
+    if hold.user_id is not None and hold.user_id != session.user_id:
+        raise HTTPException(status_code=403, detail="Signed in as a different user")
+    db_hold = create_hold(db, hold.copy(update={"user_id": session.user_id}))
+    if db_hold is None:
+        raise HTTPException(status_code=409, detail="Insufficient stock")
+    return db_hold
+
+@router.get("/{hold_id}", response_model=InventoryHoldResponse)
+def read_hold(hold_id: int, session: SessionClaims = Depends(current_session), db: Session = Depends(get_db)):
+    db_hold = get_hold(db, hold_id)
+    if db_hold is None:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    if db_hold.user_id != session.user_id:
+        raise HTTPException(status_code=403, detail="Hold belongs to a different user")
+    return db_hold
+
+@router.delete("/{hold_id}")
+def release_hold_endpoint(hold_id: int, session: SessionClaims = Depends(current_session), db: Session = Depends(get_db)):
+    db_hold = get_hold(db, hold_id)
+    if db_hold is not None and db_hold.user_id != session.user_id:
+        raise HTTPException(status_code=403, detail="Hold belongs to a different user")
+    if db_hold is None or not release_hold(db, hold_id, session.user_id):
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return {"message": "Hold released", "hold_id": hold_id}
+
+@router.post("/sweep")
+def sweep_holds_endpoint(session: SessionClaims = Depends(current_session), db: Session = Depends(get_db)):
+    # Only releases holds that have already expired, so any signed-in user may run it early
+    return {"released": release_expired_holds(db)}
@@ -1,10 +1,12 @@
 # app/models/order.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy import Column, Integer, String, Date, ForeignKey
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.writes import create_row
+from app.pagination import paginate, set_next_cursor
 from datetime import date  # Fix: Import date
 
 class Order(Base):
@@ -42,26 +44,24 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 def get_order(db: Session, order_id: int):
     return db.query(Order).filter(Order.order_id == order_id).first()
 
-def get_orders(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Order).offset(skip).limit(limit).all()
+def get_orders(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(Order), [Order.order_id], cursor, skip, limit)
 
 def get_orders_by_purchase(db: Session, purchase_id: int):
     return db.query(Order).filter(Order.purchase_id == purchase_id).all()
 
 def create_order(db: Session, order: OrderCreate):
-    db_order = Order(**order.dict())
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    return create_row(db, Order, order.dict())
 
 @router.post("/", response_model=OrderResponse)
 def create_order_endpoint(order: OrderCreate, db: Session = Depends(get_db)):
     return create_order(db, order)
 
 @router.get("/", response_model=List[OrderResponse])
-def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_orders(db, skip, limit)
+def read_orders(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    orders, next_cursor = get_orders(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return orders
 
 @router.get("/{order_id}", response_model=OrderResponse)
 def read_order(order_id: int, db: Session = Depends(get_db)):
@@ -1,10 +1,12 @@
 # app/models/purchase.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy import Column, Integer, Numeric, String, ForeignKey
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.writes import create_row
+from app.pagination import paginate, set_next_cursor
 
 class PurchaseModel(Base):
     __tablename__ = "purchase"
@@ -44,23 +46,21 @@ router = APIRouter(prefix="/purchases", tags=["purchases"])
 def get_purchase(db: Session, purchase_id: int):
     return db.query(PurchaseModel).filter(PurchaseModel.purchase_id == purchase_id).first()
 
-def get_purchases(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(PurchaseModel).offset(skip).limit(limit).all()
+def get_purchases(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(PurchaseModel), [PurchaseModel.purchase_id], cursor, skip, limit)
 
 def create_purchase(db: Session, purchase: PurchaseCreate):
-    db_purchase = PurchaseModel(**purchase.dict())
-    db.add(db_purchase)
-    db.commit()
-    db.refresh(db_purchase)
-    return db_purchase
+    return create_row(db, PurchaseModel, purchase.dict())
 
 @router.post("/", response_model=PurchaseResponse)
 def create_purchase_endpoint(purchase: PurchaseCreate, db: Session = Depends(get_db)):
     return create_purchase(db, purchase)
 
 @router.get("/", response_model=List[PurchaseResponse])
-def read_purchases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_purchases(db, skip, limit)
+def read_purchases(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    purchases, next_cursor = get_purchases(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return purchases
 
 @router.patch("/{purchase_id}", response_model=PurchaseResponse)
 def update_purchase_payment(purchase_id: int, payment_update: PurchaseUpdatePayment, db: Session = Depends(get_db)):
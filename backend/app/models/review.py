@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Boolean
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Boolean, func, update
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
 from app.database import get_db, Base
+from app.pagination import paginate, set_next_cursor
+from app.cache import invalidate_car_feeds
+from app.writes import insert_returning, commit_loaded
+from app.responses import fast_json, rows_as_dicts
+from app.models.car_rating import apply_review_delta
 from datetime import datetime
 from app.models.user import User  # Import the User model
 
@@ -38,6 +43,9 @@ class ReviewBase(BaseModel):
 class ReviewCreate(ReviewBase):
     pass
 
+class ReviewVisibilityUpdate(BaseModel):
+    is_visible: bool
+
 class ReviewResponse(ReviewBase):
     review_id: int
     created_at: datetime
@@ -51,33 +59,61 @@ router = APIRouter(prefix="/reviews", tags=["reviews"])
 def get_review(db: Session, review_id: int):
     return db.query(ReviewModel).filter(ReviewModel.review_id == review_id).first()
 
-def get_reviews(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(ReviewModel).offset(skip).limit(limit).all()
+def get_reviews(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(ReviewModel), [ReviewModel.review_id], cursor, skip, limit)
 
-def get_reviews_by_car_id(db: Session, car_id: int, skip: int = 0, limit: int = 100):
-    return (
+def get_reviews_by_car_id(db: Session, car_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = (
         db.query(ReviewModel, User.username)
         .outerjoin(User, ReviewModel.user_id == User.user_id)
         .filter(ReviewModel.car_id == car_id, ReviewModel.is_visible == True)
-        .offset(skip)
-        .limit(limit)
-        .all()
     )
+    return paginate(query, [ReviewModel.review_id], cursor, skip, limit, entity=lambda row: row.ReviewModel)
 
 def create_review(db: Session, review: ReviewCreate):
-    db_review = ReviewModel(**review.dict())
-    db.add(db_review)
-    db.commit()
-    db.refresh(db_review)
+    db_review = insert_returning(db, ReviewModel, review.dict())
+    apply_review_delta(db, review.car_id, review.rating, count=1, visible=1 if review.is_visible else 0)
+    commit_loaded(db, db_review)
+    invalidate_car_feeds()
     return db_review
 
+def set_review_visibility(db: Session, review_id: int, is_visible: bool):
+    """Toggle moderation visibility and move the review in or out of the car's average."""
+    # Only a real flip matches, so repeated toggles can't double-count. A NULL
+    # is_visible is hidden, as in the stats aggregation (FILTER (WHERE is_visible))
+    # and the review reads, so hiding it changes nothing and showing it counts it
+    flipped = db.execute(
+        update(ReviewModel)
+        .where(ReviewModel.review_id == review_id, func.coalesce(ReviewModel.is_visible, False) != is_visible)
+        .values(is_visible=is_visible)
+        .returning(ReviewModel.car_id, ReviewModel.rating)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if flipped is not None:
+        apply_review_delta(db, flipped.car_id, flipped.rating, visible=1 if is_visible else -1)
+        db.commit()
+        invalidate_car_feeds()
+    elif not is_visible:
+        # Already hidden and uncounted; only a NULL is left to store as False
+        db.execute(
+            update(ReviewModel)
+            .where(ReviewModel.review_id == review_id, ReviewModel.is_visible.is_(None))
+            .values(is_visible=False)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return get_review(db, review_id)
+
 @router.post("/", response_model=ReviewResponse)
 def create_review_endpoint(review: ReviewCreate, db: Session = Depends(get_db)):
     return create_review(db, review)
 
 @router.get("/", response_model=List[ReviewResponse])
-def read_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_reviews(db, skip, limit)
+def read_reviews(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    reviews, next_cursor = get_reviews(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    # Columns straight from the table, so skip re-validating each row
+    return fast_json(rows_as_dicts(reviews, ReviewResponse), response)
 
 @router.get("/{review_id}", response_model=ReviewResponse)
 def read_review(review_id: int, db: Session = Depends(get_db)):
@@ -87,8 +123,9 @@ def read_review(review_id: int, db: Session = Depends(get_db)):
     return db_review
 
 @router.get("/cars/{car_id}/reviews", response_model=List[ReviewResponse])
-def read_reviews_by_car_id(car_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    reviews = get_reviews_by_car_id(db, car_id, skip, limit)
+def read_reviews_by_car_id(car_id: int, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    reviews, next_cursor = get_reviews_by_car_id(db, car_id, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
     return [ReviewResponse(
         review_id=review.ReviewModel.review_id,
         purchase_id=review.ReviewModel.purchase_id,
@@ -101,4 +138,11 @@ def read_reviews_by_car_id(car_id: int, skip: int = 0, limit: int = 100, db: Ses
         helpful_count=review.ReviewModel.helpful_count,
         employee_feedback=review.ReviewModel.employee_feedback,
         username=review.username
-    ) for review in reviews]
\ No newline at end of file
+    ) for review in reviews]
+
+@router.patch("/{review_id}/visibility", response_model=ReviewResponse)
+def update_review_visibility(review_id: int, visibility: ReviewVisibilityUpdate, db: Session = Depends(get_db)):
+    db_review = set_review_visibility(db, review_id, visibility.is_visible)
+    if db_review is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return db_review
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import Column, Integer, String, Date
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import Column, Integer, String, Date, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, relationship
 from pydantic import BaseModel
 from typing import List, Optional
-from app.database import get_db, Base
+from app.database import get_db, get_async_db, Base
+from app.pagination import paginate, set_next_cursor
+from app.writes import create_row
+from app.loaders import detail_loaders
 from datetime import date, datetime
-from passlib.context import CryptContext
+from app.passwords import PasswordServiceBusy, hash_password, password_service_busy, verify_password
+from app.sessions import SESSION_TTL, SessionClaims, current_session, issue_token, revocations, session_for_user
 from app.models.purchase import PurchaseModel
 from app.models.order import Order
 from app.models.order_item import OrderItem
@@ -13,9 +18,6 @@ from app.models.order_item import OrderItem
 class PurchaseIdResponse(BaseModel):
     purchase_id: Optional[int] = None
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class User(Base):
     __tablename__ = "users"
     
@@ -113,12 +115,12 @@ def get_user(db: Session, user_id: int):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(User), [User.user_id], cursor, skip, limit)
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = pwd_context.hash(user.password)
-    db_user = User(
+def create_user(db: Session, user: UserCreate, hashed_password: str):
+    """Insert `user` with a password already hashed by app.passwords."""
+    return create_row(db, User, dict(
         email=user.email,
         username=user.username,
         password=hashed_password,
@@ -127,22 +129,22 @@ def create_user(db: Session, user: UserCreate):
         dob=user.dob,
         card_num=user.card_num,
         bank_acc=user.bank_acc
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    ))
 
 @router.get("/{user_id}/all", response_model=UserWithActivityResponse)
-def get_user_full_info(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.user_id == user_id).first()
+def get_user_full_info(user_id: int, session: SessionClaims = Depends(session_for_user), db: Session = Depends(get_db)):
+    # User row, reviews and purchases in three statements, each limited to
+    # the columns UserWithActivityResponse serializes
+    loaders = detail_loaders(User, UserWithActivityResponse, reviews=ReviewSummary, purchases=PurchaseSummary)
+    user = db.query(User).options(*loaders).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.put("/{user_id}", response_model=UserPublic)
-def update_user_endpoint(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
+def update_user_endpoint(user_id: int, user_update: UserUpdate, session: SessionClaims = Depends(session_for_user),
+                         db: Session = Depends(get_db)):
     db_user = get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -155,19 +157,28 @@ def update_user_endpoint(user_id: int, user_update: UserUpdate, db: Session = De
     db.refresh(db_user)
     return db_user
 
+# Password routes are async: bcrypt runs on the app.passwords pool while
+# the event loop and threadpool keep serving other requests.
 @router.post("/", response_model=UserResponse)
-def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, user.email)
+async def create_user_endpoint(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(get_user_by_email, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    db_user = get_user_by_email(db, user.username)
+    db_user = await db.run_sync(get_user_by_email, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already taken")
-    return create_user(db, user)
+    await db.commit()  # give the connection back while bcrypt runs
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordServiceBusy:
+        raise password_service_busy()
+    return await db.run_sync(create_user, user, hashed_password)
 
 @router.get("/", response_model=List[UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_users(db, skip, limit)
+def read_users(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    users, next_cursor = get_users(db, skip, limit, cursor)
+    set_next_cursor(response, next_cursor)
+    return users
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user(user_id: int, db: Session = Depends(get_db)):
@@ -176,36 +187,55 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
-def get_purchase_id_for_car(db: Session, user_id: int, car_id: int) -> Optional[int]:
-    """Get the purchase ID if a user has purchased a specific car."""
-    purchase = (
-        db.query(PurchaseModel.purchase_id)
+def paid_purchase_for_car(user_id: int, car_id: int):
+    """SELECT of a paid purchase of `user_id` whose order includes `car_id`."""
+    return (
+        select(PurchaseModel.purchase_id)
         .join(Order, PurchaseModel.purchase_id == Order.purchase_id)
         .join(OrderItem, Order.order_id == OrderItem.order_id)
-        .filter(PurchaseModel.user_id == user_id)
-        .filter(OrderItem.car_id == car_id)
-        .filter(PurchaseModel.status == 'paid')
-        .first()
+        .where(PurchaseModel.user_id == user_id)
+        .where(OrderItem.car_id == car_id)
+        .where(PurchaseModel.status == 'paid')
+        .limit(1)
     )
-    return purchase[0] if purchase else None
+
+def get_purchase_id_for_car(db: Session, user_id: int, car_id: int) -> Optional[int]:
+    """Get the purchase ID if a user has purchased a specific car."""
+    return db.scalar(paid_purchase_for_car(user_id, car_id))
 
 @router.get("/{user_id}/purchase-for-car/{car_id}", response_model=PurchaseIdResponse)
-def get_purchase_id_for_car_endpoint(user_id: int, car_id: int, db: Session = Depends(get_db)):
+def get_purchase_id_for_car_endpoint(user_id: int, car_id: int, session: SessionClaims = Depends(session_for_user),
+                                     db: Session = Depends(get_db)):
     purchase_id = get_purchase_id_for_car(db, user_id, car_id)
     return PurchaseIdResponse(purchase_id=purchase_id)
 
 @router.post("/login")
-def login_user(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, user.email)
+async def login_user(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(get_user_by_email, user.email)
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    await db.commit()  # give the connection back while bcrypt runs
     try:
-        if not pwd_context.verify(user.password, db_user.password):
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail="Error verifying password")
+        matches, new_hash = await verify_password(user.password, db_user.password)
+    except PasswordServiceBusy:
+        raise password_service_busy()
+    if not matches:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash is not None:
+        # Stored with an old BCRYPT_ROUNDS; replace it while the plaintext is at hand
+        await db.execute(update(User).where(User.user_id == db_user.user_id).values(password=new_hash))
+        await db.commit()
+    # Routes that act for this user check the token instead of the password
     return {
         "message": "Login successful",
         "user_id": db_user.user_id,
-        "username": db_user.username
-    }
\ No newline at end of file
+        "username": db_user.username,
+        "access_token": issue_token(db_user.user_id, db_user.username),
+        "token_type": "bearer",
+        "expires_in": SESSION_TTL
+    }
+
+@router.post("/logout")
+def logout_user(session: SessionClaims = Depends(current_session)):
+    revocations.revoke(session)
+    return {"message": "Logged out"}
\ No newline at end of file
@@ -0,0 +1,163 @@
+# app/pagination.py
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, tuple_, Boolean, Date, DateTime, Integer, Numeric, String
+from sqlalchemy.orm import Query
+from typing import Callable, List, Optional, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_ESTIMATED_HEADER = "X-Total-Count-Estimated"
+MAX_PAGE_SIZE = 500
+EXACT_COUNT_THRESHOLD = 100_000  # below this an estimate is replaced by an exact count
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else str(v) if isinstance(v, Decimal) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _coerce(column, value):
+    """A cursor value back in `column`'s Python type; ValueError or TypeError if it is not one."""
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    if isinstance(column.type, Numeric):
+        if not isinstance(value, (str, int)) or isinstance(value, bool):
+            raise TypeError(value)
+        number = Decimal(value)
+        if not number.is_finite():
+            raise ValueError(value)
+        return number
+    if isinstance(column.type, Boolean):
+        if not isinstance(value, bool):
+            raise TypeError(value)
+        return value
+    if isinstance(column.type, Integer):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise TypeError(value)
+        return value
+    if isinstance(column.type, String) and not isinstance(value, str):
+        raise TypeError(value)
+    return value
+
+def _parse(column, value: str):
+    if isinstance(column.type, Boolean):
+        return value.lower() in ("1", "true", "yes")
+    if isinstance(column.type, Integer):
+        return int(value)
+    return _coerce(column, value)
+
+def decode_cursor(cursor: str, keys: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [_coerce(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, ArithmeticError):  # decimal.InvalidOperation is an ArithmeticError
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(
+    query: Query,
+    keys: list,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    descending: bool = False,
+    entity: Callable = lambda row: row,
+    nulls_last: bool = False,
+) -> Tuple[List, Optional[str]]:
+    """Return one page of `query` ordered by `keys` plus the cursor of the next page.
+
+    With a cursor the page starts right after the last row seen, via a
+    `(k1, k2) > (:v1, :v2)` seek on the index, so every page costs the same.
+    `skip` is the legacy OFFSET fallback and is ignored when a cursor is given.
+    `keys` must end in a unique column (usually the primary key).
+    `nulls_last` is for a nullable first key: its NULL rows come after all
+    others in either direction instead of dropping out of the comparison.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    order = [key.desc() for key in keys] if descending else [key.asc() for key in keys]
+    if nulls_last:
+        order[0] = order[0].nulls_last()
+    query = query.order_by(*order)
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.filter(_seek(keys, values, descending, nulls_last))
+    elif skip:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = entity(rows[-1])
+        next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+    return rows, next_cursor
+
+def _after(keys: list, values: list, descending: bool):
+    return tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values)
+
+def _seek(keys: list, values: list, descending: bool, nulls_last: bool):
+    if not nulls_last:
+        return _after(keys, values, descending)
+    first, rest = keys[0], keys[1:]
+    if values[0] is None:
+        # Already into the NULL tail: only the remaining keys order it
+        return and_(first.is_(None), _after(rest, values[1:], descending))
+    return or_(_after(keys, values, descending), first.is_(None))
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Expose the next page's cursor without changing list-shaped bodies."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+def apply_filters(query: Query, model, params: dict):
+    """Apply `col=value`, `col__gte=value`, `col__lte=value` and `col__ilike=value`
+    filters for any column of `model` found in `params`; other keys are ignored."""
+    columns = model.__table__.columns
+    for name, raw in params.items():
+        field, _, op = name.partition("__")
+        if field not in columns or op not in ("", "gte", "lte", "ilike"):
+            continue
+        column = getattr(model, field)
+        try:
+            value = raw if op == "ilike" else _parse(column, raw)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail=f"Invalid value for {name}")
+        if op == "gte":
+            query = query.filter(column >= value)
+        elif op == "lte":
+            query = query.filter(column <= value)
+        elif op == "ilike":
+            query = query.filter(column.icontains(value, autoescape=True))  # % and _ in the value match literally
+        else:
+            query = query.filter(column == value)
+    return query
+
+def count_rows(query: Query, mode: str) -> Tuple[Optional[int], bool]:
+    """Count the rows `query` would return. Returns (count, is_estimate).
+
+    `exact` runs COUNT(*). `estimate` reads the planner's row estimate from
+    EXPLAIN on PostgreSQL, which costs no table scan, and falls back to an
+    exact count when the estimate is small enough for that to be cheap.
+    """
+    if mode == "none":
+        return None, False
+    query = query.order_by(None)
+    if mode == "estimate" and query.session.bind.dialect.name == "postgresql":
+        compiled = query.statement.compile(dialect=query.session.bind.dialect)
+        plan = query.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return query.count(), False
+
+def set_total_count(response: Response, total: Optional[int], estimated: bool):
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+        response.headers[TOTAL_ESTIMATED_HEADER] = "true" if estimated else "false"
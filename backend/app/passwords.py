@@ -0,0 +1,143 @@
+# app/passwords.py
+"""bcrypt hashing and verification on a dedicated, bounded process pool.
+
+A bcrypt round costs 100-400ms of CPU at the default work factor. Done
+inside a request handler, a burst of logins occupies the threadpool and
+the CPU that catalog requests need. Here the work goes to
+PASSWORD_WORKERS processes, so at most that many hashes run at once,
+at a lower CPU priority (PASSWORD_NICE) than the request handlers.
+At most PASSWORD_QUEUE_LIMIT jobs may be queued or running; beyond that
+callers get PasswordServiceBusy straight away, which the routes turn
+into 503 + Retry-After, rather than waiting in an unbounded queue.
+
+BCRYPT_ROUNDS sets the work factor for new hashes. verify_password
+reports a replacement hash when a stored one was made with a different
+factor, so changing BCRYPT_ROUNDS migrates users as they log in.
+PASSWORD_WORKERS=0 runs the same work on threads, for platforms without
+process support (bcrypt releases the GIL, so threads still run in
+parallel).
+"""
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from typing import Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(max(PASSWORD_WORKERS, 1) * 16)))
+PASSWORD_NICE = int(os.getenv("PASSWORD_NICE", "10"))  # added to the workers' niceness; 0 keeps API priority
+BUSY_RETRY_AFTER = 1  # seconds, sent with the 503
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+class PasswordServiceBusy(Exception):
+    """More password jobs are queued than PASSWORD_QUEUE_LIMIT allows."""
+
+def password_service_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many sign-ins in progress, retry shortly",
+                         headers={"Retry-After": str(BUSY_RETRY_AFTER)})
+
+# Run in the worker processes; module-level so they pickle by name
+def _init_worker(nice: int):
+    # Below the API process, so request handling wins the CPU while logins queue
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+class PasswordService:
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._start()
+            return self._executor
+
+    def _start(self) -> Executor:
+        if self.workers > 0 and multiprocessing.current_process().daemon:
+            logger.warning("Password process pool unavailable in a daemonic process, hashing on threads")
+        elif self.workers > 0:
+            # spawn, not fork: the API process holds DB connections and threads
+            try:
+                return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_worker, initargs=(PASSWORD_NICE,))
+            except (OSError, NotImplementedError):
+                logger.exception("Password process pool unavailable, hashing on threads")
+        return ThreadPoolExecutor(max(self.workers, 1), thread_name_prefix="password")
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        with self._lock:
+            if self.pending >= self.queue_limit:
+                self.rejected += 1
+                raise PasswordServiceBusy()
+            self.pending += 1
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenExecutor:
+                # A worker died (e.g. OOM-killed); start a fresh pool once
+                with self._lock:
+                    self._executor = None
+                future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return asyncio.wrap_future(future)
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash to store or None); a malformed stored hash does not match."""
+        try:
+            return await self._submit(_verify, password, hashed)
+        except (ValueError, TypeError):
+            return False, None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "mode": None if self._executor is None else
+                    "threads" if isinstance(self._executor, ThreadPoolExecutor) else "processes",
+            "rounds": BCRYPT_ROUNDS,
+            "pending": self.pending,
+            "queue_limit": self.queue_limit,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+password_service = PasswordService()
+
+async def hash_password(password: str) -> str:
+    return await password_service.hash(password)
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await password_service.verify(password, hashed)
@@ -1,7 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.cache import invalidate_car_feeds
+from app.http_cache import tables_changed
+from app.analytics import REPORT_VIEWS, read_report, set_data_headers, view_as_of
+from app.pagination import MAX_PAGE_SIZE, paginate, set_next_cursor
+from app.responses import fast_json
+from app.models.car import Car
+from app.models.category_price import CategoryPriceStats, PRICE_BANDS, price_bands, refresh_category_price_stats
+from app.passwords import PasswordServiceBusy, hash_password, password_service_busy
+from app.sessions import revoke_user
+from typing import Optional
+from datetime import date
 from pydantic import BaseModel
 
 class NewCar(BaseModel):
@@ -38,168 +50,188 @@ router = APIRouter(
 )
 
 # 1. Available Cars with Category (NATURAL JOIN)
+AVAILABLE_CARS_WITH_CATEGORY = text("""
+    SELECT c.model_name , c.manufacturer , c.year , c.price , cat.name AS category_name
+    FROM cars c
+    NATURAL JOIN categories cat
+    WHERE c.available = TRUE;
+""")
+
 @router.get("/available-cars-with-category")
-def get_available_cars_with_category(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT c.model_name , c.manufacturer , c.year , c.price , cat.name AS category_name
-        FROM cars c
-        NATURAL JOIN categories cat
-        WHERE c.available = TRUE;
-    """)
-    result = db.execute(query).fetchall()
+def get_available_cars_with_category(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "available-cars-with-category", AVAILABLE_CARS_WITH_CATEGORY, fresh=fresh)
     return [{"model_name": row[0], "manufacturer": row[1], "year": row[2], "price": row[3], "category_name": row[4]} for row in result]
 
 # 2. All Users and Their Purchases (LEFT OUTER JOIN)
+USERS_AND_PURCHASES = text("""
+    SELECT u.username , p.purchase_id , p.amount , p.date
+    FROM users u
+    LEFT OUTER JOIN purchase p ON u.user_id = p.user_id
+    WHERE p.status = 'paid' OR p.purchase_id IS NULL;
+""")
+
 @router.get("/users-and-purchases")
-def get_users_and_purchases(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT u.username , p.purchase_id , p.amount , p.date
-        FROM users u
-        LEFT OUTER JOIN purchase p ON u.user_id = p.user_id
-        WHERE p.status = 'paid' OR p.purchase_id IS NULL;
-    """)
-    result = db.execute(query).fetchall()
+def get_users_and_purchases(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "users-and-purchases", USERS_AND_PURCHASES, fresh=fresh)
     return [{"username": row[0], "purchase_id": row[1], "amount": row[2], "date": row[3]} for row in result]
 
 # 3. Order Details with Car Information (USING Clause)
+ORDER_DETAILS_WITH_CAR_INFO = text("""
+    SELECT o.order_id , o.date AS order_date , c.model_name
+    FROM orders o
+    JOIN order_item oi USING (order_id)
+    JOIN cars c USING (car_id)
+    WHERE o.status = 'processing';
+""")
+
 @router.get("/order-details-with-car-info")
-def get_order_details_with_car_info(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT o.order_id , o.date AS order_date , c.model_name
-        FROM orders o
-        JOIN order_item oi USING (order_id)
-        JOIN cars c USING (car_id)
-        WHERE o.status = 'processing';
-    """)
-    result = db.execute(query).fetchall()
+def get_order_details_with_car_info(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "order-details-with-car-info", ORDER_DETAILS_WITH_CAR_INFO, fresh=fresh)
     return [{"order_id": row[0], "order_date": row[1], "model_name": row[2]} for row in result]
 
 # 4. Users with Completed Purchases (EXISTS)
+USERS_WITH_COMPLETED_PURCHASES = text("""
+    SELECT u.username , u.email
+    FROM users u
+    WHERE EXISTS (
+        SELECT 1
+        FROM purchase p
+        WHERE p.user_id = u.user_id
+        AND p.status = 'paid'
+    );
+""")
+
 @router.get("/users-with-completed-purchases")
-def get_users_with_completed_purchases(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT u.username , u.email
-        FROM users u
-        WHERE EXISTS (
-            SELECT 1
-            FROM purchase p
-            WHERE p.user_id = u.user_id
-            AND p.status = 'paid'
-        );
-    """)
-    result = db.execute(query).fetchall()
+def get_users_with_completed_purchases(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "users-with-completed-purchases", USERS_WITH_COMPLETED_PURCHASES, fresh=fresh)
     return [{"username": row[0], "email": row[1]} for row in result]
 
 # 5. Cars More Expensive Than All Cars in a Category (ALL)
+# `price > ALL (prices in the category)` is `price > max_price` from
+# category_price_stats. Joining to the stats row makes that bound a parameter
+# of a range scan on ix_cars_price. ALL is never true when the category has an
+# unpriced car, and always true when it has no cars.
+CARS_MORE_EXPENSIVE_THAN_CATEGORY = text("""
+    SELECT c.model_name , c.price
+    FROM category_price_stats s
+    JOIN cars c ON c.price > s.max_price
+    WHERE s.category_id = :cat_id AND s.priced_count = s.car_count
+    UNION ALL
+    SELECT model_name , price
+    FROM cars
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM category_price_stats
+        WHERE category_id = :cat_id AND car_count > 0
+    )
+    ORDER BY price DESC;
+""")
+
 @router.get("/cars-more-expensive-than-category/{category_id}")
-def get_cars_more_expensive_than_category(category_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT model_name , price
-        FROM cars
-        WHERE price > ALL (
-            SELECT price
-            FROM cars
-            WHERE category_id = :cat_id
-        )
-        ORDER BY price DESC;
-    """)
-    result = db.execute(query, {"cat_id": category_id}).fetchall()
+def get_cars_more_expensive_than_category(category_id: int, response: Response, db: Session = Depends(get_db)):
+    result = read_report(db, response, "cars-more-expensive-than-category", CARS_MORE_EXPENSIVE_THAN_CATEGORY, {"cat_id": category_id})
     return [{"model_name": row[0], "price": row[1]} for row in result]
 
 # 6. Employees and Number of Orders Handled (Scalar Subquery)
+EMPLOYEES_AND_ORDERS_HANDLED = text("""
+    SELECT e.emp_id , e.name , e.position ,
+    (
+        SELECT COUNT(*)
+        FROM shipping s
+        WHERE s.emp_id = e.emp_id
+    ) AS total_shipments ,
+    (
+        SELECT COUNT(*)
+        FROM shipping s
+        WHERE s.emp_id = e.emp_id
+        AND s.status = 'delivered'
+    ) AS deliveries_completed
+    FROM employees e
+    WHERE e.status = 'active'
+    ORDER BY deliveries_completed DESC, total_shipments DESC, e.name;
+""")
+
 @router.get("/employees-and-orders-handled")
-def get_employees_and_orders_handled(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT e.emp_id , e.name , e.position ,
-        (
-            SELECT COUNT(*)
-            FROM shipping s
-            WHERE s.emp_id = e.emp_id
-        ) AS total_shipments ,
-        (
-            SELECT COUNT(*)
-            FROM shipping s
-            WHERE s.emp_id = e.emp_id
-            AND s.status = 'delivered'
-        ) AS deliveries_completed
-        FROM employees e
-        WHERE e.status = 'active'
-        ORDER BY deliveries_completed DESC, total_shipments DESC, e.name;
-    """)
-    result = db.execute(query).fetchall()
+def get_employees_and_orders_handled(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "employees-and-orders-handled", EMPLOYEES_AND_ORDERS_HANDLED, fresh=fresh)
     return [{"emp_id": row[0], "name": row[1], "position": row[2], "total_shipments": row[3], "deliveries_completed": row[4]} for row in result]
 
 # 7. Top 5 Most Reviewed Cars (WITH/CTE)
+TOP_5_MOST_REVIEWED_CARS = text("""
+    WITH CarReviews AS (
+        SELECT c.model_name , c.manufacturer , COUNT(r.review_id) AS review_count
+        FROM cars c
+        LEFT JOIN reviews r ON c.car_id = r.car_id
+        GROUP BY c.model_name , c.manufacturer
+    )
+    SELECT model_name , manufacturer , review_count
+    FROM CarReviews
+    ORDER BY review_count DESC
+    LIMIT 5;
+""")
+
 @router.get("/top-5-most-reviewed-cars")
-def get_top_5_most_reviewed_cars(db: Session = Depends(get_db)):
-    query = text("""
-        WITH CarReviews AS (
-            SELECT c.model_name , c.manufacturer , COUNT(r.review_id) AS review_count
-            FROM cars c
-            LEFT JOIN reviews r ON c.car_id = r.car_id
-            GROUP BY c.model_name , c.manufacturer
-        )
-        SELECT model_name , manufacturer , review_count
-        FROM CarReviews
-        ORDER BY review_count DESC
-        LIMIT 5;
-    """)
-    result = db.execute(query).fetchall()
+def get_top_5_most_reviewed_cars(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "top-5-most-reviewed-cars", TOP_5_MOST_REVIEWED_CARS, fresh=fresh)
     return [{"model_name": row[0], "manufacturer": row[1], "review_count": row[2]} for row in result]
 
 # 8. Available Cars and Inventory Quantities (INNER JOIN)
+AVAILABLE_CARS_AND_INVENTORY = text("""
+    SELECT c.model_name , c.manufacturer , ci.quantity , ci.location
+    FROM cars c
+    INNER JOIN car_inventory ci ON c.car_id = ci.car_id
+    WHERE c.available = TRUE AND ci.quantity > 0
+    ORDER BY ci.quantity DESC;
+""")
+
 @router.get("/available-cars-and-inventory")
-def get_available_cars_and_inventory(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT c.model_name , c.manufacturer , ci.quantity , ci.location
-        FROM cars c
-        INNER JOIN car_inventory ci ON c.car_id = ci.car_id
-        WHERE c.available = TRUE AND ci.quantity > 0
-        ORDER BY ci.quantity DESC;
-    """)
-    result = db.execute(query).fetchall()
+def get_available_cars_and_inventory(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "available-cars-and-inventory", AVAILABLE_CARS_AND_INVENTORY, fresh=fresh)
     return [{"model_name": row[0], "manufacturer": row[1], "quantity": row[2], "location": row[3]} for row in result]
 
 # 9. Employees and Their Shipping Records (RIGHT OUTER JOIN)
+EMPLOYEES_AND_SHIPPING_RECORDS = text("""
+    SELECT e.emp_id , e.name AS employee_name , e.department ,
+    s.ship_id , s.shipping_provider , s.status AS shipping_status ,
+    s.shipped_date , s.delivery_date
+    FROM shipping s
+    RIGHT OUTER JOIN employees e ON s.emp_id = e.emp_id
+    WHERE e.status = 'active'
+    ORDER BY s.shipped_date DESC NULLS LAST;
+""")
+
 @router.get("/employees-and-shipping-records")
-def get_employees_and_shipping_records(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT e.emp_id , e.name AS employee_name , e.department ,
-        s.ship_id , s.shipping_provider , s.status AS shipping_status ,
-        s.shipped_date , s.delivery_date
-        FROM shipping s
-        RIGHT OUTER JOIN employees e ON s.emp_id = e.emp_id
-        WHERE e.status = 'active'
-        ORDER BY s.shipped_date DESC NULLS LAST;
-    """)
-    result = db.execute(query).fetchall()
-    return [{"emp_id": row[0], "employee_name": row[1], "department": row[2], "ship_id": row[3], "shipping_provider": row[4], "shipping_status": row[5], "shipped_date": row[6], "delivery_date": row[7]} for row in result]
+def get_employees_and_shipping_records(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "employees-and-shipping-records", EMPLOYEES_AND_SHIPPING_RECORDS, fresh=fresh)
+    return fast_json([{"emp_id": row[0], "employee_name": row[1], "department": row[2], "ship_id": row[3], "shipping_provider": row[4], "shipping_status": row[5], "shipped_date": row[6], "delivery_date": row[7]} for row in result], response)
 
 # 10. Visible Reviews with User and Car Details (Multiple JOIN)
+VISIBLE_REVIEWS = text("""
+    SELECT r.review_id , r.rating , r.review_text , u.username , c.model_name
+    FROM reviews r
+    JOIN users u USING (user_id)
+    JOIN cars c USING (car_id)
+    WHERE r.is_visible = TRUE
+    ORDER BY r.created_at DESC;
+""")
+
 @router.get("/visible-reviews")
-def get_visible_reviews(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT r.review_id , r.rating , r.review_text , u.username , c.model_name
-        FROM reviews r
-        JOIN users u USING (user_id)
-        JOIN cars c USING (car_id)
-        WHERE r.is_visible = TRUE
-        ORDER BY r.created_at DESC;
-    """)
-    result = db.execute(query).fetchall()
+def get_visible_reviews(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "visible-reviews", VISIBLE_REVIEWS, fresh=fresh)
     return [{"review_id": row[0], "rating": row[1], "review_text": row[2], "username": row[3], "model_name": row[4]} for row in result]
 
 # 11. Electric or Hybrid Cars (Pattern Matching)
+ELECTRIC_OR_HYBRID_CARS = text("""
+    SELECT model_name , manufacturer , engine_type
+    FROM cars
+    WHERE lower(engine_type) IN ('electric', 'hybrid')
+    AND available = TRUE
+    ORDER BY model_name;
+""")
+
 @router.get("/electric-or-hybrid-cars")
-def get_electric_or_hybrid_cars(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT model_name , manufacturer , engine_type
-        FROM cars
-        WHERE engine_type ~* '^(electric|hybrid)$'
-        AND available = TRUE
-        ORDER BY model_name;
-    """)
-    result = db.execute(query).fetchall()
+def get_electric_or_hybrid_cars(response: Response, fresh: bool = False, db: Session = Depends(get_db)):
+    result = read_report(db, response, "electric-or-hybrid-cars", ELECTRIC_OR_HYBRID_CARS, fresh=fresh)
     return [{"model_name": row[0], "manufacturer": row[1], "engine_type": row[2]} for row in result]
 
 # 12. Insert a New Car (INSERT with Subquery)
@@ -227,13 +259,15 @@ def create_car(car: NewCar, db: Session = Depends(get_db)):
         VALUES (:car_id, 10);
     """)
     db.execute(inventory_query, {"car_id": car_id})
+    refresh_category_price_stats(db, [car.category_id])
 
     db.commit()
+    invalidate_car_feeds()
+    tables_changed("car_inventory")
     return {"car_id": car_id, "model_name": result[1], "price": result[2]}
 
 # 13. Register a New User (INSERT)
-@router.post("/users")
-def create_user(user: NewUser, db: Session = Depends(get_db)):
+def insert_user(db: Session, user: NewUser, hashed_password: str) -> dict:
     query = text("""
         INSERT INTO users (
             email , username , password , address , phone , dob , card_num ,
@@ -242,10 +276,21 @@ def create_user(user: NewUser, db: Session = Depends(get_db)):
         VALUES (:email, :username, :password, :address, :phone, :dob, :card_num, :bank_acc)
         RETURNING user_id , username , email;
     """)
-    result = db.execute(query, user.dict()).fetchone()
+    # asyncpg binds typed parameters, so the date string is parsed here
+    params = {**user.dict(), "password": hashed_password, "dob": date.fromisoformat(user.dob)}
+    result = db.execute(query, params).fetchone()
     db.commit()
     return {"user_id": result[0], "username": result[1], "email": result[2]}
 
+@router.post("/users")
+async def create_user(user: NewUser, db: AsyncSession = Depends(get_async_db)):
+    # Stored hashed, like POST /users/, so the new user can log in
+    try:
+        hashed_password = await hash_password(user.password)
+    except PasswordServiceBusy:
+        raise password_service_busy()
+    return await db.run_sync(insert_user, user, hashed_password)
+
 # 14. Update Car Price and Availability (UPDATE)
 @router.put("/cars/{car_id}")
 def update_car(car_id: int, car: UpdateCar, db: Session = Depends(get_db)):
@@ -255,29 +300,32 @@ def update_car(car_id: int, car: UpdateCar, db: Session = Depends(get_db)):
             available = :available,
             added_date = CURRENT_DATE
         WHERE car_id = :car_id
-        RETURNING car_id , model_name , price , available;
+        RETURNING car_id , model_name , price , available , category_id;
     """)
     result = db.execute(query, {"car_id": car_id, "price": car.price, "available": car.available}).fetchone()
+    if result:
+        refresh_category_price_stats(db, [result[4]])
     db.commit()
+    invalidate_car_feeds()
     if result:
         return {"car_id": result[0], "model_name": result[1], "price": result[2], "available": result[3]}
     else:
         raise HTTPException(status_code=404, detail="Car not found")
 
 # 15. Cars Cheaper Than Those in a Category (ANY Subquery)
+# `price < ANY (prices in the category)` is `price < max_price`; an empty or
+# unpriced category has a NULL max_price and matches nothing, as ANY does.
+CARS_CHEAPER_THAN_CATEGORY = text("""
+    SELECT c.car_id , c.model_name , c.manufacturer , c.price
+    FROM category_price_stats s
+    JOIN cars c ON c.price < s.max_price
+    WHERE s.category_id = :cat_id
+    ORDER BY c.price ASC;
+""")
+
 @router.get("/cars-cheaper-than-category/{category_id}")
-def get_cars_cheaper_than_category(category_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT c.car_id , c.model_name , c.manufacturer , c.price
-        FROM cars c
-        WHERE c.price < ANY (
-            SELECT c2.price
-            FROM cars c2
-            WHERE c2.category_id = :cat_id
-        )
-        ORDER BY c.price ASC;
-    """)
-    result = db.execute(query, {"cat_id": category_id}).fetchall()
+def get_cars_cheaper_than_category(category_id: int, response: Response, db: Session = Depends(get_db)):
+    result = read_report(db, response, "cars-cheaper-than-category", CARS_CHEAPER_THAN_CATEGORY, {"cat_id": category_id})
     return [{"car_id": row[0], "model_name": row[1], "manufacturer": row[2], "price": row[3]} for row in result]
 
 # 16. Delete User by Email (DELETE)
@@ -291,6 +339,128 @@ def delete_user(email: str, db: Session = Depends(get_db)):
     result = db.execute(query, {"email": email}).fetchone()
     db.commit()
     if result:
+        revoke_user(result[0])
         return {"user_id": result[0], "username": result[1], "email": result[2]}
     else:
         raise HTTPException(status_code=404, detail="User not found")
+
+# 17. Price Percentile Bands per Category (precomputed statistics)
+def _price_stats(stats: CategoryPriceStats) -> dict:
+    return {
+        "category_id": stats.category_id,
+        "car_count": stats.car_count,
+        "priced_count": stats.priced_count,
+        "min_price": stats.min_price,
+        "max_price": stats.max_price,
+        "bands": price_bands(stats),
+    }
+
+@router.get("/category-price-bands")
+def get_category_price_bands(db: Session = Depends(get_db)):
+    stats = db.query(CategoryPriceStats).order_by(CategoryPriceStats.category_id).all()
+    return [_price_stats(row) for row in stats]
+
+@router.get("/category-price-bands/{category_id}")
+def get_category_price_band(category_id: int, db: Session = Depends(get_db)):
+    stats = db.get(CategoryPriceStats, category_id)
+    if stats is None or stats.priced_count == 0:
+        raise HTTPException(status_code=404, detail="No priced cars in this category")
+    return _price_stats(stats)
+
+@router.get("/category-price-bands/{category_id}/{band}/cars")
+def get_cars_in_price_band(category_id: int, band: str, response: Response, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Cars of the category priced inside `band`, cheapest first, keyset-paginated."""
+    bounds = {name: (lower, upper) for name, lower, upper in PRICE_BANDS}
+    if band not in bounds:
+        raise HTTPException(status_code=404, detail=f"Unknown band, use one of {[name for name, _, _ in PRICE_BANDS]}")
+    stats = db.get(CategoryPriceStats, category_id)
+    if stats is None or stats.priced_count == 0:
+        raise HTTPException(status_code=404, detail="No priced cars in this category")
+    lower, upper = (getattr(stats, column) for column in bounds[band])
+    query = db.query(Car).filter(Car.category_id == category_id, Car.price >= lower)
+    # Bands include their lower bound only, except the top band, which ends at max_price
+    query = query.filter(Car.price <= upper if band == PRICE_BANDS[-1][0] else Car.price < upper)
+    cars, next_cursor = paginate(query, [Car.price, Car.car_id], cursor, limit=limit)
+    set_next_cursor(response, next_cursor)
+    return [{"car_id": car.car_id, "model_name": car.model_name, "manufacturer": car.manufacturer, "price": car.price} for car in cars]
+
+# 18. Employee Shipment Leaderboard (grouped aggregate over daily rollups)
+# Unfiltered, it is the per-employee view behind report 6. With a date range or
+# provider it sums the per-day rollup, whose size follows the fleet and the
+# calendar rather than the number of shipments. Live, the same aggregate runs
+# over shipping itself, one row per shipment.
+SHIPMENTS_LIVE = """(
+    SELECT emp_id , shipped_date AS day , shipping_provider AS provider ,
+           1 AS shipments , CASE WHEN status = 'delivered' THEN 1 ELSE 0 END AS delivered
+    FROM shipping
+)"""
+
+@router.get("/employee-leaderboard")
+def get_employee_leaderboard(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    department: Optional[str] = None,
+    provider: Optional[str] = None,
+    limit: int = 50,
+    fresh: bool = False,
+    db: Session = Depends(get_db),
+):
+    params = {"limit": max(1, min(limit, MAX_PAGE_SIZE))}
+    employee_filters = ["e.status = 'active'"]
+    if department is not None:
+        employee_filters.append("e.department = :department")
+        params["department"] = department
+    shipment_filters = ["TRUE"]
+    for value, condition, key in ((date_from, "d.day >= :date_from", "date_from"), (date_to, "d.day <= :date_to", "date_to"), (provider, "d.provider = :provider", "provider")):
+        if value is not None:
+            shipment_filters.append(condition)
+            params[key] = value
+
+    as_of = None
+    if not fresh and shipment_filters == ["TRUE"]:
+        as_of = view_as_of(db, "employees-and-orders-handled")
+    if as_of is not None:
+        query = f"""
+            SELECT m.emp_id , m.name , m.position , e.department , m.total_shipments , m.deliveries_completed
+            FROM {REPORT_VIEWS["employees-and-orders-handled"].view} m
+            JOIN employees e ON e.emp_id = m.emp_id
+            WHERE {" AND ".join(employee_filters)}
+        """
+    else:
+        as_of = None if fresh else view_as_of(db, "employee-leaderboard")
+        shipments = SHIPMENTS_LIVE if as_of is None else REPORT_VIEWS["employee-leaderboard"].view
+        query = f"""
+            SELECT e.emp_id , e.name , e.position , e.department ,
+                   COALESCE(t.shipments, 0) AS total_shipments ,
+                   COALESCE(t.delivered, 0) AS deliveries_completed
+            FROM employees e
+            LEFT JOIN (
+                SELECT d.emp_id , CAST(SUM(d.shipments) AS BIGINT) AS shipments , CAST(SUM(d.delivered) AS BIGINT) AS delivered
+                FROM {shipments} d
+                WHERE {" AND ".join(shipment_filters)}
+                GROUP BY d.emp_id
+            ) t ON t.emp_id = e.emp_id
+            WHERE {" AND ".join(employee_filters)}
+        """
+    query += " ORDER BY deliveries_completed DESC , total_shipments DESC , name LIMIT :limit"
+    set_data_headers(response, as_of)
+    result = db.execute(text(query), params).fetchall()
+    return [{"emp_id": row[0], "name": row[1], "position": row[2], "department": row[3], "total_shipments": row[4], "deliveries_completed": row[5]} for row in result]
+
+# Read-only reports by route name, for the streaming exports in app/export.py.
+# The category reports bind :cat_id.
+REPORTS = {
+    "available-cars-with-category": AVAILABLE_CARS_WITH_CATEGORY,
+    "users-and-purchases": USERS_AND_PURCHASES,
+    "order-details-with-car-info": ORDER_DETAILS_WITH_CAR_INFO,
+    "users-with-completed-purchases": USERS_WITH_COMPLETED_PURCHASES,
+    "cars-more-expensive-than-category": CARS_MORE_EXPENSIVE_THAN_CATEGORY,
+    "employees-and-orders-handled": EMPLOYEES_AND_ORDERS_HANDLED,
+    "top-5-most-reviewed-cars": TOP_5_MOST_REVIEWED_CARS,
+    "available-cars-and-inventory": AVAILABLE_CARS_AND_INVENTORY,
+    "employees-and-shipping-records": EMPLOYEES_AND_SHIPPING_RECORDS,
+    "visible-reviews": VISIBLE_REVIEWS,
+    "electric-or-hybrid-cars": ELECTRIC_OR_HYBRID_CARS,
+    "cars-cheaper-than-category": CARS_CHEAPER_THAN_CATEGORY,
+}
@@ -0,0 +1,183 @@
+# app/query_stats.py
+"""SQL statement count, database time and rows per request, aggregated per route.
+
+QueryStatsMiddleware opens a RequestQueries for every HTTP request. The
+engine's cursor events add each statement to it, through a ContextVar
+that the threadpool and run_sync both inherit. The request's totals go
+out in a Server-Timing header and are folded into `route_stats`.
+"""
+from contextvars import ContextVar
+from sqlalchemy import event
+from typing import Optional
+import logging
+import os
+import threading
+import time
+
+from app.db_metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))  # log statements slower than this; 0 disables
+MAX_ROUTES = 500  # routes tracked before the rest are pooled under "other"
+STATEMENT_PREVIEW = 500  # characters of SQL kept for the slowest statement
+QUERY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+class RequestQueries:
+    """What one request sent to the database."""
+
+    __slots__ = ("count", "db_ms", "rows", "slowest_ms", "slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.slowest_ms = 0.0
+        self.slowest = None
+
+    def add(self, statement: str, elapsed_ms: float, rows: int):
+        self.count += 1
+        self.db_ms += elapsed_ms
+        self.rows += rows
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms, self.slowest = elapsed_ms, statement
+
+    def server_timing(self, total_ms: float) -> str:
+        return f'db;dur={self.db_ms:.1f};desc="{self.count} queries, {self.rows} rows", app;dur={total_ms:.1f}'
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.rows = 0
+        self.db_ms = Histogram(QUERY_BUCKETS_MS)
+        self.queries_per_request = Histogram(QUERY_COUNT_BUCKETS)
+        self.slowest_ms = 0.0
+        self.slowest = None
+
+    def snapshot(self) -> dict:
+        db_ms = self.db_ms.snapshot()
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "avg_queries": round(self.queries / self.requests, 2) if self.requests else 0,
+            "max_queries": self.max_queries,
+            "rows": self.rows,
+            "avg_db_ms": round(db_ms["sum_ms"] / self.requests, 3) if self.requests else 0,
+            "db_ms": db_ms,
+            "queries_per_request": self.queries_per_request.snapshot(),
+            "slowest_ms": round(self.slowest_ms, 3),
+            "slowest_statement": self.slowest,
+        }
+
+class QueryStats:
+    """Per-route aggregates for this worker, since start or the last reset."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, queries: RequestQueries):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                if len(self._routes) >= MAX_ROUTES:
+                    route = "other"
+                stats = self._routes.setdefault(route, RouteStats())
+            stats.requests += 1
+            stats.queries += queries.count
+            stats.max_queries = max(stats.max_queries, queries.count)
+            stats.rows += queries.rows
+            if queries.slowest_ms > stats.slowest_ms:
+                stats.slowest_ms = queries.slowest_ms
+                stats.slowest = " ".join(queries.slowest.split())[:STATEMENT_PREVIEW]
+        stats.db_ms.observe(queries.db_ms)
+        stats.queries_per_request.observe(queries.count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = dict(self._routes)
+        return {route: stats.snapshot() for route, stats in sorted(routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+route_stats = QueryStats()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_statement_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("_statement_started", None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    queries = _current.get()
+    if queries is not None:
+        queries.add(statement, elapsed_ms, max(cursor.rowcount or 0, 0))
+    if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1fms): %s", elapsed_ms, " ".join(statement.split())[:STATEMENT_PREVIEW])
+
+def _cursor_events(engine) -> list:
+    target = engine.sync_engine if hasattr(engine, "sync_engine") else engine
+    return [
+        (target, "before_cursor_execute", _before_cursor_execute),
+        (target, "after_cursor_execute", _after_cursor_execute),
+    ]
+
+def instrument_queries(engine):
+    """Time every statement `engine` executes and charge it to the current request."""
+    for target, name, listener in _cursor_events(engine):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+def uninstrument_queries(engine):
+    """Remove the hooks again, for benchmarks that compare against a bare engine."""
+    for target, name, listener in _cursor_events(engine):
+        if event.contains(target, name, listener):
+            event.remove(target, name, listener)
+
+def route_path(scope) -> Optional[str]:
+    """The path template the request matched, so /cars/1 and /cars/2 count as one route."""
+    route = scope.get("route")
+    return route.path if route is not None else None
+
+def route_label(scope) -> str:
+    path = route_path(scope)
+    return f"{scope['method']} {path}" if path is not None else "unmatched"
+
+class QueryStatsMiddleware:
+    """Pure ASGI, so streaming responses pass through untouched.
+
+    Server-Timing is written when the response starts, which for a
+    streamed body is before its queries have finished; those still count
+    in the route totals.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries = RequestQueries()
+        token = _current.set(queries)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing = queries.server_timing((time.perf_counter() - started) * 1000)
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_stats.record(route_label(scope), queries)
@@ -0,0 +1,178 @@
+# app/responses.py
+"""Fast path for large JSON responses, and response compression.
+
+A route that returns a few hundred rows normally pays for response_model
+validation (from_orm on every ORM object) and then jsonable_encoder and
+json.dumps, which together take longer than the query. Routes whose rows
+come straight from the database can opt in by returning fast_json(): the
+rows are read into plain dicts of the response model's fields with
+rows_as_dicts(), without being validated again, and encoded by orjson.
+The route keeps its response_model for the OpenAPI schema.
+
+CompressionMiddleware encodes JSON, CSV and text bodies of at least
+COMPRESS_MIN_SIZE bytes with whichever of brotli and gzip the client
+prefers in Accept-Encoding. Brotli comes from the Brotli package in
+requirements.txt; the import stays optional, so an install without it
+still serves gzip.
+"""
+from decimal import Decimal
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from typing import Any, Iterable, List, Optional, Type
+import orjson
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; smaller bodies fit in a packet anyway
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 4 beats gzip -6 on size at about the same CPU
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+def _default(value):
+    # Numeric columns; the response models declare them as float
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+def rows_as_dicts(rows: Iterable, model: Type[BaseModel]) -> List[dict]:
+    """The `model` fields of each row, read as attributes and not validated."""
+    fields = list(model.__fields__)
+    return [{field: getattr(row, field, None) for field in fields} for row in rows]
+
+def fast_json(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """`content` encoded by orjson, with the headers a route set on its
+    injected `response` (paging cursors, data dates), which FastAPI drops
+    when a route returns a Response of its own."""
+    fast = FastJSONResponse(content)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                fast.headers.append(name, value)
+    return fast
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip", whichever Accept-Encoding weighs higher (br on a tie), or None."""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip()] = weight
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda coding: weights.get(coding, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
+
+class _Encoder:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = self._compressor.compress, self._compressor.flush
+
+# A strong ETag names one byte-exact representation, so the encoded body gets
+# its own: "abc" is sent as "abc-gzip", and the suffix is taken off again
+# when a client revalidates, before app.http_cache compares it. A tag for
+# another encoding than the one negotiated now keeps its suffix and misses.
+def _encoded_etag(etag: str, encoding: str) -> str:
+    return etag[:-1] + f'-{encoding}"' if etag.endswith('"') and not etag.startswith("W/") else etag
+
+def _decoded_etag(etag: str, encoding: Optional[str]) -> str:
+    suffix = f'-{encoding}"'
+    return etag[:-len(suffix)] + '"' if encoding and etag.endswith(suffix) else etag
+
+class CompressionMiddleware:
+    """Pure ASGI. Buffers nothing beyond the first body message: a whole
+    response is compressed when it reaches COMPRESS_MIN_SIZE, a streamed
+    one (exports) chunk by chunk as it is sent."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        sent_tags = {}
+        if "if-none-match" in request_headers:
+            for tag in request_headers["if-none-match"].split(","):
+                sent_tags[_decoded_etag(tag.strip(), encoding)] = tag.strip()
+            # In place: the router records the matched route in this same dict for the outer middleware
+            scope["headers"] = [
+                (name, b", ".join(t.encode() for t in sent_tags) if name == b"if-none-match" else value)
+                for name, value in scope["headers"]
+            ]
+        if encoding is None and not sent_tags:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+
+        async def send_encoded(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if message["status"] == 304 and headers.get("etag") in sent_tags:
+                    # Answer with the tag the client holds, encoded or not
+                    headers["etag"] = sent_tags[headers["etag"]]
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(message)
+                elif (encoding is None or message["status"] != 200 or "content-encoding" in headers
+                        or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                    await send(message)
+                else:
+                    start = message  # wait for the body to decide
+                return
+            if start is None:
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(start)
+                    await send(message)
+                    start = None
+                    return
+                encoder = _Encoder(encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["etag"] = _encoded_etag(headers["etag"], encoding)
+                if not more_body:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["content-length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["content-length"]
+                await send(start)
+            body = encoder.compress(body)
+            if not more_body:
+                body += encoder.finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_encoded)
@@ -0,0 +1,172 @@
+# app/search.py
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, text, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import re
+
+from app.analytics import REPORT_VIEWS, view_as_of
+from app.database import get_async_db
+from app.models.car import Car, CarBase
+from app.pagination import MAX_PAGE_SIZE, paginate
+
+# These expressions are also the definitions of the search indexes in
+# app/migrations.py; the planner only uses the indexes if both match.
+SEARCH_DOCUMENT = "(coalesce(manufacturer, '') || ' ' || coalesce(model_name, '') || ' ' || coalesce(modelnum, ''))"
+SEARCH_VECTOR = f"to_tsvector('simple', {SEARCH_DOCUMENT})"
+
+FACET_COLUMNS = ["category_id", "engine_type", "transmission", "color"]  # also in analytics.CAR_SEARCH_FACETS
+FACETS_REPORT = "car-search-facets"
+SORT_KEYS = {"price": Car.price, "year": Car.year, "mileage": Car.mileage, "newest": Car.added_date}
+
+class SearchFilters(BaseModel):
+    q: Optional[str] = None
+    category_id: Optional[int] = None
+    engine_type: Optional[str] = None
+    transmission: Optional[str] = None
+    color: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    mileage_min: Optional[int] = None
+    mileage_max: Optional[int] = None
+    available: Optional[bool] = True
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class CarSearchResponse(BaseModel):
+    total: int
+    items: List[CarBase]
+    facets: Dict[str, List[FacetCount]]
+    next_cursor: Optional[str] = None
+
+def to_prefix_tsquery(q: str) -> Optional[str]:
+    """Turn free text into an AND of prefix terms, e.g. 'tesla mod' -> 'tesla:* & mod:*'."""
+    terms = re.findall(r"\w+", q.lower())
+    return " & ".join(f"{term}:*" for term in terms) or None
+
+def contains_pattern(q: str) -> str:
+    """ILIKE pattern matching `q` anywhere, with its own % _ and \\ taken literally."""
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def is_unfiltered(filters: SearchFilters) -> bool:
+    """True when `filters` match every available car, as the default search does."""
+    return filters.available is True and not (filters.q or "").strip() and all(
+        getattr(filters, name) in (None, "") for name in filters.__fields__ if name not in ("q", "available")
+    )
+
+def apply_search_filters(query, filters: SearchFilters):
+    if filters.q and filters.q.strip():
+        tsquery = to_prefix_tsquery(filters.q)
+        # Whole-word prefixes come from the tsvector index, fragments
+        # inside a model number from the trigram index
+        matches = [text(f"{SEARCH_DOCUMENT} ILIKE :q_like ESCAPE '\\'")]
+        if tsquery:
+            matches.append(text(f"{SEARCH_VECTOR} @@ to_tsquery('simple', :q_ts)"))
+        query = query.filter(or_(*matches)).params(q_like=contains_pattern(filters.q.strip()), q_ts=tsquery)
+    if filters.category_id is not None:
+        query = query.filter(Car.category_id == filters.category_id)
+    for name in ("engine_type", "transmission", "color"):
+        value = getattr(filters, name)
+        if value:
+            query = query.filter(func.lower(getattr(Car, name)) == value.lower())
+    for column, low, high in (
+        (Car.price, filters.price_min, filters.price_max),
+        (Car.year, filters.year_min, filters.year_max),
+        (Car.mileage, filters.mileage_min, filters.mileage_max),
+    ):
+        if low is not None:
+            query = query.filter(column >= low)
+        if high is not None:
+            query = query.filter(column <= high)
+    if filters.available is not None:
+        query = query.filter(Car.available == filters.available)
+    return query
+
+def _sorted_facets(facets: Dict[str, List[FacetCount]]) -> Dict[str, List[FacetCount]]:
+    for counts in facets.values():
+        counts.sort(key=lambda facet: -facet.count)
+    return facets
+
+def materialized_facets(db: Session) -> Optional[Dict[str, List[FacetCount]]]:
+    """The unfiltered facet counts from their materialized view (at most
+    ANALYTICS_REFRESH_INTERVAL old), or None until the view is populated."""
+    if view_as_of(db, FACETS_REPORT) is None:
+        return None
+    facets = {name: [] for name in FACET_COLUMNS}
+    for facet, value, count in db.execute(REPORT_VIEWS[FACETS_REPORT].read()):
+        facets[facet].append(FacetCount(value=value, count=count))
+    return _sorted_facets(facets)
+
+def live_facets(db: Session, filters: SearchFilters) -> Dict[str, List[FacetCount]]:
+    """Count matches per value of every facet column in one GROUPING SETS scan."""
+    columns = [getattr(Car, name) for name in FACET_COLUMNS]
+    query = db.query(
+        *columns,
+        *[func.grouping(column) for column in columns],
+        func.count().label("count"),
+    ).group_by(func.grouping_sets(*[tuple_(column) for column in columns]))
+    rows = apply_search_filters(query, filters).all()
+
+    facets = {name: [] for name in FACET_COLUMNS}
+    n = len(FACET_COLUMNS)
+    for row in rows:
+        for i, name in enumerate(FACET_COLUMNS):
+            if row[n + i] == 0:  # grouping() is 0 for the set this row belongs to
+                value = row[i]
+                facets[name].append(FacetCount(value=None if value is None else str(value), count=row[-1]))
+    return _sorted_facets(facets)
+
+def search_facets(db: Session, filters: SearchFilters) -> Dict[str, List[FacetCount]]:
+    """Facet counts for `filters`: the materialized ones when nothing is
+    filtered, else (or until the view is populated) a live scan."""
+    if is_unfiltered(filters):
+        facets = materialized_facets(db)
+        if facets is not None:
+            return facets
+    return live_facets(db, filters)
+
+def search_cars(db: Session, filters: SearchFilters, sort: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None, skip: int = 0):
+    """Full-text + range search over cars, with facet counts for the whole match set."""
+    query = apply_search_filters(db.query(Car), filters)
+    descending = bool(sort and sort.startswith("-"))
+    sort_key = SORT_KEYS.get((sort or "").lstrip("-"))
+    if sort_key is not None:
+        # Cars with no value for the sort key still match (and count in `total`): they come last
+        cars, next_cursor = paginate(query, [sort_key, Car.car_id], cursor, skip, limit,
+                                     descending=descending, nulls_last=True)
+    elif filters.q and to_prefix_tsquery(filters.q):
+        # Relevance order cannot be keyset-paged; fall back to OFFSET
+        rank = text(f"ts_rank({SEARCH_VECTOR}, to_tsquery('simple', :q_ts)) DESC")
+        cars = query.order_by(rank, Car.car_id).offset(skip).limit(max(1, min(limit, MAX_PAGE_SIZE))).all()
+        next_cursor = None
+    else:
+        cars, next_cursor = paginate(query, [Car.car_id], cursor, skip, limit)
+
+    facets = search_facets(db, filters)
+    return CarSearchResponse(
+        total=sum(facet.count for facet in facets["category_id"]),
+        items=[CarBase.from_orm(car) for car in cars],
+        facets=facets,
+        next_cursor=next_cursor,
+    )
+
+# Registered ahead of the cars router so /cars/search is not taken for a car_id
+router = APIRouter(prefix="/cars", tags=["cars"])
+
+@router.get("/search", response_model=CarSearchResponse)
+async def search_cars_endpoint(
+    filters: SearchFilters = Depends(),
+    sort: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(search_cars, filters, sort, limit, cursor, skip)
@@ -0,0 +1,168 @@
+# app/sessions.py
+"""Signed session tokens, checked without the database.
+
+Login pays for one bcrypt verify and hands back a JWT (HS256) carrying
+the user's id and username. Routes that act for a user take it as
+`Authorization: Bearer <token>` and check the signature and expiry with
+one HMAC, so they never reload the user row or touch bcrypt again.
+
+SESSION_SECRET signs the tokens and must be the same for every API
+process; anyone who knows it can sign a token for any user, so it comes
+from the environment and never from the repository (.env.example names
+it). Without it the API refuses to start, unless SESSION_INSECURE_DEV=1
+is set for local development: then each process makes up its own and
+tokens stop working on restart. The flag is ignored on Vercel.
+SESSION_TTL is the lifetime in seconds.
+
+Logout puts the token's id on an in-memory revocation list until the
+token would have expired anyway, and revoke_user() refuses every token
+a user was issued before now (e.g. after the account is deleted). The
+list lives in this process only: with several API processes, a revoked
+token is refused by the one that revoked it and accepted by the others
+until it expires, which is why SESSION_TTL is kept short.
+"""
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from fastapi import Depends, Header, HTTPException
+from typing import Dict, Optional
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(12 * 3600)))
+SESSION_INSECURE_DEV = os.getenv("SESSION_INSECURE_DEV") == "1" and not os.getenv("VERCEL")
+# SHA-256 of secrets that were once committed to the repository and must never sign tokens
+REVOKED_SECRET_HASHES = {"4d12734c5350b1d62fd2a3b823c4297ac0f983967dab7addeeb2fa3cae4f83cc"}
+
+if not SESSION_SECRET and not SESSION_INSECURE_DEV:
+    raise RuntimeError("SESSION_SECRET is not set; set it in the environment "
+                       "(or SESSION_INSECURE_DEV=1 for a per-process secret in local development)")
+if SESSION_SECRET and hashlib.sha256(SESSION_SECRET.encode()).hexdigest() in REVOKED_SECRET_HASHES:
+    raise RuntimeError("SESSION_SECRET is a key that was published in the repository; generate a new one")
+if not SESSION_SECRET:
+    logger.warning("SESSION_SECRET is not set; using a per-process secret, sessions end when the API restarts")
+    SESSION_SECRET = secrets.token_urlsafe(32)
+
+_KEY = SESSION_SECRET.encode()
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+class InvalidSession(Exception):
+    """The token is malformed, badly signed, expired or revoked."""
+
+@dataclass(frozen=True)
+class SessionClaims:
+    user_id: int
+    username: str
+    token_id: str
+    issued_at: int
+    expires_at: int
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+def _sign(signing_input: bytes) -> bytes:
+    return _b64encode(hmac.new(_KEY, signing_input, hashlib.sha256).digest())
+
+class RevocationList:
+    """Token ids and per-user cutoffs refused until the tokens they cover expire."""
+
+    def __init__(self):
+        self._tokens: Dict[str, int] = {}  # token id -> its expiry
+        self._users: Dict[int, int] = {}  # user id -> tokens issued before this are refused
+        self._lock = threading.Lock()
+
+    def revoke(self, claims: SessionClaims):
+        with self._lock:
+            self._prune()
+            self._tokens[claims.token_id] = claims.expires_at
+
+    def revoke_user(self, user_id: int):
+        with self._lock:
+            self._prune()
+            self._users[user_id] = int(time.time()) + 1
+
+    def is_revoked(self, claims: SessionClaims) -> bool:
+        return claims.token_id in self._tokens or claims.issued_at < self._users.get(claims.user_id, 0)
+
+    def _prune(self):
+        now = int(time.time())
+        for token_id in [t for t, expires_at in self._tokens.items() if expires_at <= now]:
+            del self._tokens[token_id]
+        # A cutoff only matters while tokens issued before it can still be alive
+        for user_id in [u for u, cutoff in self._users.items() if cutoff + SESSION_TTL <= now]:
+            del self._users[user_id]
+
+    def __len__(self):
+        return len(self._tokens) + len(self._users)
+
+revocations = RevocationList()
+
+def issue_token(user_id: int, username: str) -> str:
+    now = int(time.time())
+    claims = {"sub": str(user_id), "name": username, "iat": now, "exp": now + SESSION_TTL,
+              "jti": secrets.token_urlsafe(12)}
+    signing_input = _HEADER + b"." + _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return (signing_input + b"." + _sign(signing_input)).decode()
+
+def verify_token(token: str) -> SessionClaims:
+    try:
+        signing_input, _, signature = token.encode().rpartition(b".")
+        header, _, payload = signing_input.partition(b".")
+        if header != _HEADER or not hmac.compare_digest(signature, _sign(signing_input)):
+            raise InvalidSession("bad signature")
+        data = json.loads(_b64decode(payload))
+        claims = SessionClaims(int(data["sub"]), data["name"], data["jti"], int(data["iat"]), int(data["exp"]))
+    except (ValueError, KeyError, TypeError, UnicodeError) as e:
+        raise InvalidSession("malformed token") from e
+    if claims.expires_at <= time.time():
+        raise InvalidSession("expired")
+    if revocations.is_revoked(claims):
+        raise InvalidSession("revoked")
+    return claims
+
+def revoke_user(user_id: int):
+    revocations.revoke_user(user_id)
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+def current_session(authorization: Optional[str] = Header(None)) -> SessionClaims:
+    """Dependency: the claims of the request's bearer token, or 401."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise _unauthorized("Not signed in")
+    try:
+        return verify_token(token.strip())
+    except InvalidSession:
+        raise _unauthorized("Session expired or invalid, sign in again")
+
+def session_for_user(user_id: int, session: SessionClaims = Depends(current_session)) -> SessionClaims:
+    """Dependency for /users/{user_id}/... routes: the token must belong to that user."""
+    if session.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Signed in as a different user")
+    return session
+
+def optional_session(authorization: Optional[str] = Header(None)) -> Optional[SessionClaims]:
+    """Dependency for public routes that add to their answer for a signed-in
+    user: the claims, or None when the token is missing or no longer valid."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_token(token.strip())
+    except InvalidSession:
+        return None
@@ -0,0 +1,27 @@
+# app/writes.py
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+def insert_returning(db: Session, model, values: dict):
+    """INSERT one row and load the instance from RETURNING, all in one round trip.
+
+    Python-side column defaults are applied, and server defaults come back
+    in the RETURNING row, so the instance needs no refresh().
+    """
+    return db.scalar(insert(model).values(**values).returning(model))
+
+def commit_loaded(db: Session, *instances):
+    """Commit and keep `instances` usable without reloading them.
+
+    expire_on_commit would expire them, and serializing the response would
+    then SELECT every row again. Detaching them first keeps the values that
+    RETURNING already loaded.
+    """
+    for instance in instances:
+        db.expunge(instance)
+    db.commit()
+    return instances[0] if len(instances) == 1 else instances
+
+def create_row(db: Session, model, values: dict):
+    """INSERT ... RETURNING + COMMIT: the whole create path in two round trips."""
+    return commit_loaded(db, insert_returning(db, model, values))
@@ -0,0 +1,131 @@
+# bench/async_load.py
+"""Sync vs async request throughput under many concurrent clients.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.async_load --clients 500 --duration 20
+
+The same catalog helpers are served twice from a uvicorn worker in a child
+process: once from plain `def` routes on the sync engine (one threadpool
+worker per request for the whole round trip) and once from `async def`
+routes on the asyncpg engine. The feed cache is bypassed so every request
+reaches the database.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_async_db
+from app.models.car import Car, CarBase, get_car, get_new_arrivals
+
+bench_app = FastAPI()
+
+@bench_app.get("/sync/cars/{car_id}", response_model=CarBase)
+def sync_car(car_id: int, db: Session = Depends(get_db)):
+    car = get_car(db, car_id)
+    if car is None:
+        raise HTTPException(status_code=404)
+    return car
+
+@bench_app.get("/async/cars/{car_id}", response_model=CarBase)
+async def async_car(car_id: int, db: AsyncSession = Depends(get_async_db)):
+    car = await db.get(Car, car_id)
+    if car is None:
+        raise HTTPException(status_code=404)
+    return car
+
+@bench_app.get("/sync/new-arrivals")
+def sync_new_arrivals(db: Session = Depends(get_db)):
+    return get_new_arrivals(db, 6)[0]
+
+@bench_app.get("/async/new-arrivals")
+async def async_new_arrivals(db: AsyncSession = Depends(get_async_db)):
+    return (await db.run_sync(get_new_arrivals, 6))[0]
+
+SCENARIOS = {
+    "car by id": "/{mode}/cars/{n}",
+    "new arrivals": "/{mode}/new-arrivals",
+}
+
+def serve(port: int):
+    uvicorn.run(bench_app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+async def drive(base: str, template: str, mode: str, clients: int, duration: float, car_ids: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def worker(worker_id: int):
+            nonlocal errors
+            n = worker_id
+            while time.perf_counter() < deadline:
+                n = n % car_ids + 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(template.format(mode=mode, n=n))
+                    if response.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+
+    latencies.sort()
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+def wait_until_up(base: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base + "/sync/new-arrivals", timeout=5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("bench server did not start")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario and mode")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--car-ids", type=int, default=1000, help="car ids 1..N to cycle through")
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base)
+        print(f"{args.clients} concurrent clients, {args.duration:.0f}s per run")
+        print(f"{'scenario':14s} {'mode':6s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+        for name, template in SCENARIOS.items():
+            for mode in ("sync", "async"):
+                r = asyncio.run(drive(base, template, mode, args.clients, args.duration, args.car_ids))
+                print(f"{name:14s} {mode:6s} {r['rps']:9.1f} {r['p50']:9.1f} {r['p95']:9.1f} {r['p99']:9.1f} {r['errors']:7d}")
+    finally:
+        server.terminate()
+        server.join()
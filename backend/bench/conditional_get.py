@@ -0,0 +1,90 @@
+# bench/conditional_get.py
+"""Full catalog reads against their 304 revalidations.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.conditional_get --requests 300
+
+For each route in app.http_cache.CONDITIONAL_ROUTES, serves the request
+through the whole app (middleware included) over ASGI, first plain, then
+with the ETag of the first response in If-None-Match, and reports the
+median time, response bytes and SQL statements of each. The feed routes
+are already in the TTL cache after the first request, so their plain
+time is the serialization cost alone.
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.main import app
+
+def scope_for(url: str, headers: list) -> dict:
+    path, _, query = url.partition("?")
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"bench")] + headers,
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+async def call(url: str, headers: list = []):
+    """(status, response headers, body bytes)"""
+    start, size = {}, 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope_for(url, headers), receive, send)
+    return start["status"], dict(start["headers"]), size
+
+async def profile(url: str, headers: list, requests: int):
+    """Median microseconds, bytes and statements of `url` with `headers`."""
+    for _ in range(10):
+        await call(url, headers)
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        status, _, size = await call(url, headers)
+        times.append((time.perf_counter() - started) * 1e6)
+    # QueryStatsMiddleware reports the statement count in Server-Timing
+    _, response_headers, _ = await call(url, headers)
+    statements = re.search(rb"(\d+) queries", response_headers.get(b"server-timing", b""))
+    return status, statistics.median(times), size, int(statements.group(1)) if statements else 0
+
+async def run(urls: list, requests: int):
+    print(f"{'route':24s} {'200 us':>8s} {'bytes':>7s} {'stmts':>5s} {'304 us':>8s} {'bytes':>5s} {'stmts':>5s}")
+    for url in urls:
+        status, headers, _ = await call(url)
+        if status != 200 or b"etag" not in headers:
+            print(f"{url:24s} status {status}, no ETag; skipped")
+            continue
+        _, full_us, full_bytes, full_statements = await profile(url, [], requests)
+        _, headers, _ = await call(url)  # ETags roll over every HTTP_CACHE_TTL, so take a fresh one
+        status, hit_us, hit_bytes, hit_statements = await profile(url, [(b"if-none-match", headers[b"etag"])], requests)
+        assert status == 304, f"{url} revalidated with {status}"
+        print(f"{url:24s} {full_us:8.0f} {full_bytes:7d} {full_statements:5d} {hit_us:8.0f} {hit_bytes:5d} {hit_statements:5d}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per route and case")
+    args = parser.parse_args()
+    with engine.connect() as conn:
+        car_id, category_id = conn.execute(text("SELECT MIN(car_id), MIN(category_id) FROM cars")).first()
+    if car_id is None:
+        sys.exit("no cars; seed the database first")
+    urls = ["/categories/", f"/categories/{category_id}", f"/cars/category/{category_id}", f"/cars/{car_id}",
+            "/cars/top-rated", "/cars/new-arrivals", "/cars/budget-friendly"]
+    asyncio.run(run(urls, args.requests))
@@ -0,0 +1,161 @@
+# bench/explain_queries.py
+"""EXPLAIN ANALYZE every statement the report queries and hot routes emit.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.explain_queries            # plans at the current schema version
+    python -m bench.explain_queries --compare  # without indexes, then with them
+
+Statements are captured by calling the route functions directly, so the
+harness always explains the SQL the app really sends. Everything, including
+the write reports, runs inside a transaction that is rolled back.
+"""
+import argparse
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app import queries, migrations, search
+from app.admin import ListParams, get_all_orders, get_all_purchases
+from app.models import car, review, user, order_item
+
+CAR_ID = USER_ID = CATEGORY_ID = ORDER_ID = PURCHASE_ID = 1
+
+WORKLOAD = [
+    ("q1 available-cars-with-category", lambda db: queries.get_available_cars_with_category(Response(), db=db)),
+    ("q2 users-and-purchases", lambda db: queries.get_users_and_purchases(Response(), db=db)),
+    ("q3 order-details-with-car-info", lambda db: queries.get_order_details_with_car_info(Response(), db=db)),
+    ("q4 users-with-completed-purchases", lambda db: queries.get_users_with_completed_purchases(Response(), db=db)),
+    ("q5 cars-more-expensive-than-category", lambda db: queries.get_cars_more_expensive_than_category(CATEGORY_ID, Response(), db)),
+    ("q6 employees-and-orders-handled", lambda db: queries.get_employees_and_orders_handled(Response(), db=db)),
+    ("q7 top-5-most-reviewed-cars", lambda db: queries.get_top_5_most_reviewed_cars(Response(), db=db)),
+    ("q8 available-cars-and-inventory", lambda db: queries.get_available_cars_and_inventory(Response(), db=db)),
+    ("q9 employees-and-shipping-records", lambda db: queries.get_employees_and_shipping_records(Response(), db=db)),
+    ("q10 visible-reviews", lambda db: queries.get_visible_reviews(Response(), db=db)),
+    ("q11 electric-or-hybrid-cars", lambda db: queries.get_electric_or_hybrid_cars(Response(), db=db)),
+    ("q12 insert car", lambda db: queries.create_car(queries.NewCar(
+        category_id=CATEGORY_ID, modelnum="EXPLAIN", manufacturer="x", model_name="x", year=2024,
+        engine_type="Petrol", transmission="Manual", color="x", mileage=0, fuel_capacity=1,
+        seating_capacity=1, price=1), db)),
+    ("q13 insert user", lambda db: queries.insert_user(db, queries.NewUser(
+        email="explain@example.com", username="explain", password="x", address="x", phone="x",
+        dob="2000-01-01", card_num="x", bank_acc="x"), "x")),
+    ("q14 update car", lambda db: queries.update_car(CAR_ID, queries.UpdateCar(price=1, available=True), db)),
+    ("q15 cars-cheaper-than-category", lambda db: queries.get_cars_cheaper_than_category(CATEGORY_ID, Response(), db)),
+    ("q16 delete user", lambda db: queries.delete_user("nobody@example.com", db)),
+    ("cars top-rated", lambda db: car.get_top_rated_cars(db)),
+    ("cars new-arrivals", lambda db: car.get_new_arrivals(db)),
+    ("cars budget-friendly", lambda db: car.get_budget_friendly_cars(db)),
+    ("cars by category", lambda db: db.query(car.Car).filter(car.Car.category_id == CATEGORY_ID).all()),
+    ("car details", lambda db: car.get_car_details(db, CAR_ID)),
+    ("car reviews", lambda db: review.get_reviews_by_car_id(db, CAR_ID)),
+    ("purchase for car", lambda db: user.get_purchase_id_for_car(db, USER_ID, CAR_ID)),
+    ("order items by order", lambda db: order_item.read_order_items_by_order(ORDER_ID, db)),
+    ("car search", lambda db: search.search_cars(db, search.SearchFilters(q="audi", price_max=50000))),
+    ("admin orders", lambda db: get_all_orders(Response(), _params(), db)),
+    ("admin paid purchases", lambda db: get_all_purchases(Response(), _params(status="paid"), db)),
+]
+
+class _Request:
+    def __init__(self, **filters):
+        self.query_params = filters
+
+def _params(**filters):
+    return ListParams(_Request(**filters), limit=50, count="none")
+
+def capture(conn, fn):
+    """Run `fn` on a session joined to `conn` and return the statements it sent."""
+    statements = []
+
+    def record(conn_, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+            statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", record)
+    savepoint = conn.begin_nested()
+    try:
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as db:
+            fn(db)
+    except HTTPException:
+        pass  # a 404 still sent its lookup, which is what we explain
+    finally:
+        event.remove(conn, "before_cursor_execute", record)
+        # Undo the writes so EXPLAIN ANALYZE can replay them
+        savepoint.rollback()
+    return statements
+
+def _walk(plan, found):
+    node = plan["Node Type"]
+    if "Relation Name" in plan:
+        found.add(f"{node} on {plan['Relation Name']}" + (f" using {plan['Index Name']}" if "Index Name" in plan else ""))
+    elif "Index Name" in plan:
+        found.add(f"{node} using {plan['Index Name']}")
+    for child in plan.get("Plans", []):
+        _walk(child, found)
+    return found
+
+def explain(conn, statement, parameters) -> dict:
+    cursor = conn.connection.cursor()
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+    raw = cursor.fetchone()[0]
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    return {
+        "ms": plan["Execution Time"] + plan["Planning Time"],
+        "scans": sorted(_walk(plan["Plan"], set())),
+    }
+
+def collect() -> dict:
+    results = {}
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+        for label, fn in WORKLOAD:
+            trans = conn.begin()
+            try:
+                statements = capture(conn, fn)
+                plans = [explain(conn, st, params) for st, params in statements]
+                results[label] = {
+                    "ms": sum(p["ms"] for p in plans),
+                    "scans": sorted({s for p in plans for s in p["scans"]}),
+                }
+            except Exception as e:
+                results[label] = {"error": (str(e) or repr(e)).splitlines()[0]}
+            finally:
+                trans.rollback()
+    return results
+
+def report(title, results):
+    print(f"\n== {title}")
+    for label, result in results.items():
+        if "error" in result:
+            print(f"{label:40s} ERROR {result['error']}")
+        else:
+            print(f"{label:40s} {result['ms']:9.2f} ms  {'; '.join(result['scans'])}")
+
+def compare(before, after):
+    print(f"\n== before -> after")
+    for label in before:
+        b, a = before[label], after.get(label, {})
+        if "error" in b or "error" in a:
+            continue
+        seq_before = sum(s.startswith("Seq Scan") for s in b["scans"])
+        seq_after = sum(s.startswith("Seq Scan") for s in a["scans"])
+        print(f"{label:40s} {b['ms']:9.2f} -> {a['ms']:9.2f} ms  seq scans {seq_before} -> {seq_after}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--compare", action="store_true", help="explain without the indexes, then with them")
+    args = parser.parse_args()
+    if args.compare:
+        migrations.migrate(0)
+        before = collect()
+        report("without indexes (schema version 0)", before)
+        migrations.migrate()
+        after = collect()
+        report(f"with indexes (schema version {migrations.MIGRATIONS[-1].version})", after)
+        compare(before, after)
+    else:
+        report("current schema", collect())
@@ -0,0 +1,74 @@
+# bench/export_stream.py
+"""Time to first byte and server peak memory: /queries JSON vs streaming export.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL (Linux only,
+peak RSS comes from /proc):
+
+    python -m bench.export_stream
+
+Every case gets a fresh uvicorn process so its VmHWM is that request's peak.
+"""
+import argparse
+import multiprocessing
+import time
+
+import httpx
+import uvicorn
+
+CASES = [
+    ("visible reviews, JSON", "/queries/visible-reviews"),
+    ("visible reviews, CSV export", "/export/reports/visible-reviews?format=csv"),
+    ("visible reviews, NDJSON export", "/export/reports/visible-reviews?format=ndjson"),
+    ("users + purchases, JSON", "/queries/users-and-purchases"),
+    ("users + purchases, CSV export", "/export/reports/users-and-purchases"),
+    ("cars table, CSV export", "/export/tables/cars"),
+]
+
+def serve(port: int):
+    uvicorn.run("app.main:app", host="127.0.0.1", port=port, log_level="warning")
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def run_case(path: str, port: int) -> dict:
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                httpx.get(base + "/", timeout=2)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        baseline = peak_rss_mb(server.pid)
+        started = time.perf_counter()
+        first_byte, size = None, 0
+        with httpx.stream("GET", base + path, timeout=600) as response:
+            for chunk in response.iter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                size += len(chunk)
+        return {
+            "status": response.status_code,
+            "ttfb_ms": (first_byte or 0) * 1000,
+            "total_ms": (time.perf_counter() - started) * 1000,
+            "mb": size / 1e6,
+            "rss_growth_mb": peak_rss_mb(server.pid) - baseline,
+        }
+    finally:
+        server.terminate()
+        server.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    print(f"{'case':32s} {'status':>6s} {'ttfb ms':>9s} {'total ms':>9s} {'body MB':>8s} {'peak RSS +MB':>13s}")
+    for name, path in CASES:
+        r = run_case(path, args.port)
+        print(f"{name:32s} {r['status']:6d} {r['ttfb_ms']:9.0f} {r['total_ms']:9.0f} {r['mb']:8.1f} {r['rss_growth_mb']:13.1f}")
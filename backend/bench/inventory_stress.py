@@ -0,0 +1,120 @@
+# bench/inventory_stress.py
+"""Hammer one car's stock with concurrent buyers and check it never oversells.
+
+Run from backend/ against a PostgreSQL DATABASE_URL:
+
+    python -m bench.inventory_stress --buyers 500 --stock 100
+    python -m bench.inventory_stress --stock 100 --locations 3 --quantity 4
+
+Exits non-zero when stock was oversold, lost or left unsold, so it can
+gate a deploy; it is not part of any automated suite.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal, Base, engine
+from app.models import Car, CarInventory, Category
+from app.models.car_inventory import take_stock
+from app.models.inventory_hold import InventoryHoldCreate, create_hold, release_expired_holds
+
+
+def make_hot_car(stock: int, locations: int) -> int:
+    db = SessionLocal()
+    try:
+        category = db.scalar(select(Category).limit(1)) or Category(name="Stress")
+        car = Car(category=category, modelnum="STRESS", model_name="Hot Car", price=1)
+        db.add(car)
+        db.flush()
+        # Uneven split, so buyers must often take units from two locations
+        for i in range(locations):
+            share = stock // locations + (1 if i < stock % locations else 0)
+            db.add(CarInventory(car_id=car.car_id, location=f"Stress {i + 1}", quantity=share))
+        db.commit()
+        return car.car_id
+    finally:
+        db.close()
+
+
+def buy(car_id: int, quantity: int, use_holds: bool, barrier: threading.Barrier, results: list):
+    db = SessionLocal()
+    try:
+        barrier.wait()
+        if use_holds:
+            ok = create_hold(db, InventoryHoldCreate(car_id=car_id, quantity=quantity, ttl_seconds=1)) is not None
+        else:
+            ok = take_stock(db, car_id, quantity)
+            db.commit()
+        results.append(quantity if ok else 0)
+    except Exception as e:
+        db.rollback()
+        results.append(e)
+    finally:
+        db.close()
+
+
+def stock_left(db, car_id: int) -> int:
+    return db.scalar(select(func.sum(CarInventory.quantity)).where(CarInventory.car_id == car_id))
+
+def run(buyers: int, stock: int, quantity: int, use_holds: bool, locations: int) -> list:
+    """Failed checks, empty when the stock held up."""
+    car_id = make_hot_car(stock, locations)
+    barrier = threading.Barrier(buyers)
+    results = []
+    threads = [
+        threading.Thread(target=buy, args=(car_id, quantity, use_holds, barrier, results))
+        for _ in range(buyers)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    sold = sum(r for r in results if not isinstance(r, Exception))
+    failures = []
+    db = SessionLocal()
+    try:
+        remaining = stock_left(db, car_id)
+        negative = db.scalar(select(func.count()).where(CarInventory.car_id == car_id, CarInventory.quantity < 0))
+        print(f"buyers={buyers} stock={stock} locations={locations} sold={sold} remaining={remaining} "
+              f"errors={len(errors)} in {elapsed:.2f}s")
+        if errors:
+            failures.append(f"{len(errors)} buyers failed, e.g. {errors[:3]}")
+        if negative:
+            failures.append("stock went negative")
+        if sold + remaining != stock:
+            failures.append("units were lost or oversold")
+        if sold != min((stock // quantity) * quantity, buyers * quantity):
+            failures.append("stock left unsold under contention")
+        if use_holds:
+            time.sleep(1.1)
+            release_expired_holds(db)
+            restored = stock_left(db, car_id)
+            if restored != stock:
+                failures.append(f"sweeper restored {restored} of {stock}")
+            else:
+                print("expired holds released, stock restored")
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--holds", action="store_true", help="reserve through inventory holds instead")
+    parser.add_argument("--locations", type=int, default=1, help="inventory rows the stock is split across")
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    failures = run(args.buyers, args.stock, args.quantity, args.holds, max(1, args.locations))
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,285 @@
+# bench/loadtest.py
+"""Replay the frontend's user journeys and report latency per endpoint.
+
+Seed first, then run from backend/ against the same DATABASE_URL:
+
+    python -m bench.seed --scale 100k --reset
+    python -m bench.loadtest --users 50 --duration 60 --save runs/before.json
+    # ...change something...
+    python -m bench.loadtest --users 50 --duration 60 --compare runs/before.json
+
+The API is started from app.main in a child uvicorn process, migrations
+and background jobs included; pass --url to load a server that is
+already running instead. Each virtual user repeatedly picks a journey by
+weight and makes the requests its page makes, concurrently where the
+page uses Promise.all:
+
+    home      Navbar categories + Home's three carousels
+    category  CarForMe: the category and its cars
+    detail    CarDetail: the car overview, which includes the purchase lookup when logged in
+    checkout  Login, CarDetail until an available car is found, CartContext's
+              POST /checkout/, then PurchaseAfter (purchase, orders, order
+              items, car details) and Payment
+    admin     one /queries report page, or a Manage* list and its detail
+
+Ids are drawn from the seeded ranges with a fixed --seed, so two runs
+against the same scale ask for the same rows. The report lists requests,
+throughput, p50/p95/p99 and errors per endpoint, keyed by route
+template. --compare exits non-zero when an endpoint's p95 regressed by
+more than --tolerance percent against a saved run.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+from sqlalchemy import text
+
+from app.database import engine
+from bench.seed import LOADTEST_PASSWORD, USER_EMAIL
+
+JOURNEYS = {"home": 35, "category": 20, "detail": 30, "checkout": 5, "admin": 10}
+REPORTS = [
+    "/queries/available-cars-with-category", "/queries/users-and-purchases",
+    "/queries/order-details-with-car-info", "/queries/users-with-completed-purchases",
+    "/queries/employees-and-orders-handled", "/queries/top-5-most-reviewed-cars",
+    "/queries/available-cars-and-inventory", "/queries/employees-and-shipping-records",
+    "/queries/visible-reviews", "/queries/electric-or-hybrid-cars",
+]
+CATEGORY_REPORTS = ["/queries/cars-more-expensive-than-category/{}", "/queries/cars-cheaper-than-category/{}"]
+ADMIN_LISTS = [("/admin/orders?limit=20", "/admin/orders/{}", "order_id"),
+               ("/admin/purchases?limit=20", "/admin/purchases/{}", "purchase_id")]
+
+class Recorder:
+    """Latencies and errors per endpoint label."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, label: str,
+                      ok=(200,), **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        if response.status_code not in ok:
+            self.errors[label] += 1
+            return None
+        return response
+
+class Catalog:
+    """Id ranges of the seeded data."""
+
+    def __init__(self):
+        with engine.connect() as conn:
+            self.cars = conn.scalar(text("SELECT MAX(car_id) FROM cars")) or 0
+            self.users = conn.scalar(text("SELECT MAX(user_id) FROM users WHERE email LIKE '%@loadtest.example'")) or 0
+            self.categories = [row[0] for row in conn.execute(text("SELECT category_id FROM categories ORDER BY 1"))]
+        if not self.cars or not self.users:
+            sys.exit("no load test data; run python -m bench.seed first")
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, catalog: Catalog, rng: random.Random):
+        self.client, self.rec, self.catalog, self.rng = client, recorder, catalog, rng
+
+    def get(self, url: str, label: str, **kwargs):
+        return self.rec.request(self.client, "GET", url, label, **kwargs)
+
+    def car_id(self) -> int:
+        return self.rng.randint(1, self.catalog.cars)
+
+    async def home(self):
+        await asyncio.gather(
+            self.get("/categories/", "GET /categories/"),
+            self.get("/cars/top-rated", "GET /cars/top-rated"),
+            self.get("/cars/new-arrivals", "GET /cars/new-arrivals"),
+            self.get("/cars/budget-friendly", "GET /cars/budget-friendly"),
+        )
+
+    async def category(self):
+        category_id = self.rng.choice(self.catalog.categories)
+        await self.get("/categories/", "GET /categories/")
+        await self.get(f"/categories/{category_id}", "GET /categories/{category_id}")
+        await self.get(f"/cars/category/{category_id}", "GET /cars/category/{category_id}")
+
+    async def detail(self, token: Optional[str] = None) -> Optional[dict]:
+        car_id = self.car_id()
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        overview = await self.get(f"/cars/{car_id}/overview?review_limit=100", "GET /cars/{car_id}/overview",
+                                  headers=headers)
+        return overview.json()["car"] if overview is not None else None
+
+    async def checkout(self):
+        user_id = self.rng.randint(1, self.catalog.users)
+        login = await self.rec.request(self.client, "POST", "/users/login", "POST /users/login",
+                                       json={"email": USER_EMAIL.format(user_id), "password": LOADTEST_PASSWORD})
+        if login is None:
+            return
+        token = login.json()["access_token"]
+        # Browse until the cart is full; CarDetail only offers "add to cart" for available cars
+        cart, wanted = [], self.rng.choice((1, 1, 1, 2))
+        for _ in range(wanted * 5):
+            car = await self.detail(token)
+            if car is not None and car["available"] and car["quantity"]:
+                cart.append(car["car_id"])
+                if len(cart) == wanted:
+                    break
+        if not cart:
+            return
+        response = await self.rec.request(self.client, "POST", "/checkout/", "POST /checkout/", json={
+            "user_id": user_id, "payment_method": "Credit Card", "shipping_address": f"{user_id} Load Test Road",
+            "invoice_number": f"LT-{os.getpid()}-{self.rng.getrandbits(48):x}",
+            "items": [{"car_id": car_id, "quantity": 1} for car_id in dict.fromkeys(cart)],
+        })
+        if response is None:
+            return
+        purchase_id = response.json()["purchase"]["purchase_id"]
+        # PurchaseAfter, then Payment
+        await self.get(f"/purchases/{purchase_id}", "GET /purchases/{purchase_id}")
+        orders = await self.get(f"/orders/purchase/{purchase_id}", "GET /orders/purchase/{purchase_id}")
+        for order in orders.json() if orders is not None else []:
+            items = await self.get(f"/order_items/by_order/{order['order_id']}", "GET /order_items/by_order/{order_id}")
+            await asyncio.gather(*(
+                self.get(f"/cars/{item['car_id']}/details", "GET /cars/{car_id}/details")
+                for item in (items.json() if items is not None else [])
+            ))
+        await self.get(f"/purchases/{purchase_id}", "GET /purchases/{purchase_id}")
+
+    async def admin(self):
+        choice = self.rng.random()
+        if choice < 0.6:
+            path = self.rng.choice(REPORTS)
+            await self.get(path, f"GET {path}")
+        elif choice < 0.8:
+            template = self.rng.choice(CATEGORY_REPORTS)
+            path = template.format(self.rng.choice(self.catalog.categories))
+            await self.get(path, "GET " + template.format("{category_id}"))
+        else:
+            list_path, detail_template, key = self.rng.choice(ADMIN_LISTS)
+            rows = await self.get(list_path, "GET " + list_path.split("?")[0])
+            if rows is not None and rows.json():
+                row_id = self.rng.choice(rows.json())[key]
+                await self.get(detail_template.format(row_id), "GET " + detail_template.format("{" + key + "}"))
+
+async def run_load(base: str, users: int, duration: float, think: float, seed: int, catalog: Catalog) -> Recorder:
+    recorder = Recorder()
+    names, weights = list(JOURNEYS), list(JOURNEYS.values())
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=users * 4, max_keepalive_connections=users * 4)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def user(n: int):
+            rng = random.Random(seed * 100_003 + n)
+            vu = VirtualUser(client, recorder, catalog, rng)
+            while time.perf_counter() < deadline:
+                await getattr(vu, rng.choices(names, weights)[0])()
+                if think:
+                    await asyncio.sleep(rng.uniform(0, 2 * think))
+
+        await asyncio.gather(*(user(n) for n in range(users)))
+    return recorder
+
+def percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def summarize(recorder: Recorder, duration: float) -> dict:
+    results = {}
+    for label in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = sorted(recorder.latencies[label])
+        results[label] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / duration, 2),
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "errors": recorder.errors[label],
+        }
+    return results
+
+def report(results: dict, duration: float, baseline: Optional[dict], tolerance: float) -> bool:
+    regressed = False
+    header = f"{'endpoint':52s} {'requests':>8s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>6s}"
+    print(header + ("  p95 vs baseline" if baseline else ""))
+    for label, r in results.items():
+        line = f"{label:52s} {r['requests']:8d} {r['rps']:8.1f} {r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} {r['errors']:6d}"
+        before = (baseline or {}).get(label)
+        if before and before["p95"]:
+            change = (r["p95"] - before["p95"]) / before["p95"] * 100
+            worse = change > tolerance and r["requests"] >= 20
+            regressed |= worse
+            line += f"  {change:+7.1f}%{'  REGRESSED' if worse else ''}"
+        print(line)
+    total = sum(r["requests"] for r in results.values())
+    errors = sum(r["errors"] for r in results.values())
+    print(f"{'total':52s} {total:8d} {total / duration:8.1f} {'':8s} {'':8s} {'':8s} {errors:6d}")
+    return regressed
+
+def serve(port: int):
+    uvicorn.run("app.main:app", host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+def wait_until_up(base: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base + "/", timeout=5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after warm-up")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--think", type=float, default=0, help="mean pause between journeys, seconds")
+    parser.add_argument("--seed", type=int, default=2211)
+    parser.add_argument("--url", help="load this server instead of starting one")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON of an earlier run to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=20, help="allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    catalog = Catalog()
+    server = None
+    base = args.url
+    if base is None:
+        server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+        server.start()
+        base = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(base)
+        print(f"{catalog.cars} cars, {catalog.users} users; {args.users} virtual users for {args.duration:.0f}s")
+        if args.warmup:
+            asyncio.run(run_load(base, args.users, args.warmup, args.think, args.seed + 1, catalog))
+        recorder = asyncio.run(run_load(base, args.users, args.duration, args.think, args.seed, catalog))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    results = summarize(recorder, args.duration)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    regressed = report(results, args.duration, baseline, args.tolerance)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"users": args.users, "duration": args.duration, "seed": args.seed,
+                       "cars": catalog.cars, "endpoints": results}, f, indent=2)
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,141 @@
+# bench/login_storm.py
+"""Catalog latency while logins hammer bcrypt.
+
+Seed first, then run from backend/ against the same DATABASE_URL:
+
+    python -m bench.seed --scale 10k --reset
+    python -m bench.login_storm --readers 20 --logins 40 --duration 20
+
+Serves app.main from a fresh uvicorn process per configuration and runs
+--readers clients reading car details and listings, alone and next to
+--logins clients logging in back to back:
+
+    no logins   catalog readers only
+    unbounded   one password worker per login client, no queue limit and no
+                lower priority: close to every login hashing in its own
+                request thread
+    bounded     the configured PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT and
+                PASSWORD_NICE
+
+Reports catalog p50/p95/p99 and req/s, and login throughput with the
+number of 503s the queue limit sent back. The readers should keep close
+to their "no logins" latency under "bounded"; logins beyond what the
+pool can hash are turned away instead of queuing.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from typing import List
+
+import httpx
+
+def serve(port: int, env: dict):
+    # A spawned process, so app.passwords reads this environment on import
+    os.environ.update(env)
+    import uvicorn
+    uvicorn.run("app.main:app", host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+def wait_until_up(base: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base + "/", timeout=5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+def pct(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+async def drive(base: str, readers: int, logins: int, duration: float, cars: int, users: int) -> dict:
+    from bench.seed import LOADTEST_PASSWORD, USER_EMAIL
+    catalog, login_ok, login_ms = [], 0, []
+    rejected = errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=readers + logins, max_keepalive_connections=readers + logins)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        async def reader(n: int):
+            nonlocal errors
+            rng = random.Random(n)
+            while time.perf_counter() < deadline:
+                url = f"/cars/{rng.randint(1, cars)}/details" if rng.random() < 0.8 else "/cars/?limit=20"
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+                catalog.append((time.perf_counter() - started) * 1000)
+
+        async def login(n: int):
+            nonlocal login_ok, rejected, errors
+            rng = random.Random(10_000 + n)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/users/login", json={
+                    "email": USER_EMAIL.format(rng.randint(1, users)), "password": LOADTEST_PASSWORD,
+                })
+                if response.status_code == 200:
+                    login_ok += 1
+                    login_ms.append((time.perf_counter() - started) * 1000)
+                elif response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(reader(n) for n in range(readers)), *(login(n) for n in range(logins)))
+    return {
+        "catalog_rps": len(catalog) / duration,
+        "p50": pct(catalog, 0.50), "p95": pct(catalog, 0.95), "p99": pct(catalog, 0.99),
+        "login_rps": login_ok / duration, "login_p95": pct(login_ms, 0.95),
+        "rejected": rejected, "errors": errors,
+    }
+
+def main(args):
+    # Imported here, not at the top: the spawned servers import this module
+    # too, and app.passwords must not be loaded before serve() sets its settings
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.connect() as conn:
+        cars = conn.scalar(text("SELECT MAX(car_id) FROM cars")) or 0
+        users = conn.scalar(text("SELECT MAX(user_id) FROM users WHERE email LIKE '%@loadtest.example'")) or 0
+    if not cars or not users:
+        raise SystemExit("no load test data; run python -m bench.seed first")
+
+    configs = [
+        ("no logins", 0, {}),
+        ("unbounded", args.logins, {"PASSWORD_WORKERS": str(args.logins), "PASSWORD_QUEUE_LIMIT": "100000",
+                                    "PASSWORD_NICE": "0"}),
+        ("bounded", args.logins, {}),
+    ]
+    spawn = multiprocessing.get_context("spawn")
+    print(f"{args.readers} catalog readers, {args.logins} login clients, {args.duration:.0f}s each")
+    print(f"{'config':10s} {'catalog/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} "
+          f"{'logins/s':>8s} {'login p95':>9s} {'503s':>6s} {'errors':>6s}")
+    for name, logins, env in configs:
+        server = spawn.Process(target=serve, args=(args.port, env))  # not daemonic: it starts the password pool
+        server.start()
+        base = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_up(base)
+            asyncio.run(drive(base, args.readers, logins, 3, cars, users))  # warm up
+            r = asyncio.run(drive(base, args.readers, logins, args.duration, cars, users))
+        finally:
+            server.terminate()
+            server.join()
+        print(f"{name:10s} {r['catalog_rps']:9.1f} {r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f} "
+              f"{r['login_rps']:8.1f} {r['login_p95']:9.1f} {r['rejected']:6d} {r['errors']:6d}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=20, help="concurrent catalog clients")
+    parser.add_argument("--logins", type=int, default=40, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per configuration")
+    parser.add_argument("--port", type=int, default=8767)
+    main(parser.parse_args())
@@ -0,0 +1,156 @@
+# bench/metrics_overhead.py
+"""What the request metrics and statement hooks add to each request.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.metrics_overhead --requests 300
+
+Timing the same route with and without instrumentation and subtracting
+does not resolve a 2% difference when PostgreSQL shares the CPU; the
+database round trip varies by more than that between runs. So the
+instrumentation is costed on its own, in loops with no I/O:
+
+  * MetricsMiddleware + QueryStatsMiddleware around an ASGI app that
+    only sends a response, minus that app alone;
+  * the cursor hooks, as the extra cost of executing `SELECT 1` on an
+    in-memory SQLite engine once they are installed, which includes
+    SQLAlchemy's event dispatch.
+
+Each route is then served over ASGI without the middleware to get its
+median time and statement count, and the overhead is
+(middleware + statements x hook) / request. The script exits non-zero
+when a database-backed route exceeds --limit percent.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from sqlalchemy import create_engine, text
+
+from app.database import engine
+from app.main import app
+from app.metrics import MetricsMiddleware
+from app.query_stats import QueryStatsMiddleware, RequestQueries, _current, instrument_queries, uninstrument_queries
+
+def scope_for(url: str) -> dict:
+    path, _, query = url.partition("?")
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80), "app": app,
+    }
+
+async def call(asgi, url: str) -> int:
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi(scope_for(url), receive, send)
+    return status
+
+def best_us(run, loops: int, repeat: int = 5) -> float:
+    """Lowest per-call time over `repeat` runs, the one least disturbed by other processes."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(loops)
+        best = min(best, (time.perf_counter() - started) / loops * 1e6)
+    return best
+
+def middleware_us(loops: int) -> float:
+    async def respond(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    # A matched route, as FastAPI's router would leave it in the scope
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/cars/{car_id}")
+
+    async def with_route(scope, receive, send):
+        scope["route"] = route
+        await respond(scope, receive, send)
+
+    instrumented = MetricsMiddleware(QueryStatsMiddleware(with_route))
+
+    def run(asgi):
+        async def go(n):
+            for _ in range(n):
+                await call(asgi, "/cars/1")
+        return lambda n: asyncio.run(go(n))
+
+    return best_us(run(instrumented), loops) - best_us(run(with_route), loops)
+
+def hook_us(loops: int) -> float:
+    sqlite = create_engine("sqlite://")
+    with sqlite.connect() as conn:
+        statement = text("SELECT 1")
+
+        def run(n):
+            for _ in range(n):
+                conn.execute(statement)
+
+        bare = best_us(run, loops)
+        instrument_queries(sqlite)
+        token = _current.set(RequestQueries())  # statements inside a request do the most work
+        hooked = best_us(run, loops)
+        _current.reset(token)
+        uninstrument_queries(sqlite)
+    return hooked - bare
+
+async def request_profile(url: str, requests: int):
+    """Median time of `url` without middleware, and the statements one request sends."""
+    bare = AsyncExitStackMiddleware(app.router)
+    for _ in range(20):
+        await call(bare, url)
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        status = await call(bare, url)
+        times.append((time.perf_counter() - started) * 1e6)
+    assert status == 200, f"{url} returned {status}"
+    queries = RequestQueries()
+    token = _current.set(queries)
+    await call(bare, url)
+    _current.reset(token)
+    return statistics.median(times), queries.count
+
+def main(args):
+    with engine.connect() as conn:
+        car_id = conn.execute(text("SELECT MIN(car_id) FROM cars")).scalar()
+    if car_id is None:
+        sys.exit("no cars; seed the database first")
+    per_request = middleware_us(args.loops)
+    per_statement = hook_us(args.loops)
+    print(f"middleware {per_request:.1f} us per request, cursor hooks {per_statement:.1f} us per statement\n")
+    print(f"{'route':20s} {'request us':>10s} {'statements':>10s} {'added us':>9s} {'overhead':>9s}")
+    failed = False
+    urls = ["/", f"/cars/{car_id}", "/cars/?limit=20", "/cars/top-rated"]
+
+    async def profile_all():  # one event loop, which the async engine's connections belong to
+        return [await request_profile(url, args.requests) for url in urls]
+
+    for url, (request, statements) in zip(urls, asyncio.run(profile_all())):
+        added = per_request + statements * per_statement
+        overhead = added / request * 100
+        checked = statements > 0
+        ok = not checked or overhead <= args.limit
+        failed |= not ok
+        verdict = "" if not checked else ("ok" if ok else "FAIL")
+        print(f"{url:20s} {request:10.1f} {statements:10d} {added:9.1f} {overhead:8.2f}%  {verdict}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per route")
+    parser.add_argument("--loops", type=int, default=20000, help="iterations per instrumentation timing")
+    parser.add_argument("--limit", type=float, default=2.0, help="allowed overhead in percent")
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+# bench/search_facets.py
+"""Facet counts for an unfiltered /cars/search: live aggregate vs materialized view.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL (schema at
+migration 5 or later, e.g. after starting the API once):
+
+    python -m bench.seed --scale 1m --reset
+    python -m bench.search_facets --requests 50
+
+Times the live GROUPING SETS scan (live_facets) against search_facets()
+reading mv_car_search_facets, as the route does without filters, and
+reports the time one refresh of the view takes. Times are medians in
+milliseconds.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from app import search
+from app.analytics import REPORT_VIEWS, refresh_views
+from app.database import SessionLocal
+from app.models.car import Car
+
+def median_ms(fn, requests: int) -> float:
+    fn()
+    times = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+def run(requests: int):
+    view = REPORT_VIEWS[search.FACETS_REPORT].view
+    refresh_ms = refresh_views([view]).get(view)
+    if refresh_ms is None:
+        sys.exit(f"{view} does not exist (or another worker is refreshing); run the migrations first")
+    filters = search.SearchFilters()
+    with SessionLocal() as db:
+        cars = db.scalar(select(func.count()).select_from(Car).where(Car.available == True))
+        live = search.live_facets(db, filters)
+        materialized = search.search_facets(db, filters)
+        assert {k: sorted((f.value or "", f.count) for f in v) for k, v in live.items()} == \
+               {k: sorted((f.value or "", f.count) for f in v) for k, v in materialized.items()}, "counts differ"
+        live_ms = median_ms(lambda: search.live_facets(db, filters), requests)
+        materialized_ms = median_ms(lambda: search.search_facets(db, filters), requests)
+    print(f"available cars          {cars}")
+    print(f"live GROUPING SETS      {live_ms:8.2f} ms")
+    print(f"materialized view       {materialized_ms:8.2f} ms")
+    print(f"one view refresh        {refresh_ms:8d} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="timed calls per case")
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,195 @@
+# bench/seed.py
+"""Fill PostgreSQL with a synthetic storefront for the load test.
+
+Run from backend/ against a PostgreSQL DATABASE_URL:
+
+    python -m bench.seed --scale 100k --reset
+
+The scale is the number of cars. It also sets the size of the rest:
+half as many users, one purchase and order per car, 1.3 order items per
+order, reviews on 60% of purchases, and shipping for orders that have
+left. Every value is derived from the row number, so a scale always
+produces the same rows, and a load test run against it is repeatable.
+Rows are generated inside PostgreSQL with generate_series; 1m takes a
+few minutes.
+
+Every user's password is LOADTEST_PASSWORD, so the checkout journey can
+log in. Stock is set high enough that checkouts do not run out during a
+run. --reset truncates the application tables first; without it the
+script refuses to write into a database that already has cars.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import text
+
+from app import migrations
+from app.analytics import refresh_views
+from app.database import Base, SessionLocal, engine
+import app.models  # noqa: F401  registers every table for create_all
+from app.models.car_rating import backfill_rating_stats
+from app.models.category_price import backfill_category_price_stats
+from app.passwords import pwd_context
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+LOADTEST_PASSWORD = "loadtest"
+USER_EMAIL = "user{}@loadtest.example"
+STOCK = 1_000_000
+
+CATEGORIES = ["Sedan", "SUV", "Hatchback", "Coupe", "Convertible", "Pickup",
+              "Minivan", "Wagon", "Electric", "Hybrid", "Luxury", "Sports"]
+TABLES = ["reviews", "shipping", "order_item", "orders", "purchase", "inventory_holds",
+          "car_inventory_log", "car_inventory", "car_rating_stats", "category_price_stats",
+          "cars", "categories", "employees", "users"]
+
+# A fixed scramble of the row number, 0 <= H(g, salt) < 1000003
+H = "((({g}::bigint * 2654435761 + {salt} * 40503) % 1000003)::int)"
+
+def h(salt: int, g: str = "g") -> str:
+    return H.format(g=g, salt=salt)
+
+def pick(values: list, salt: int, g: str = "g") -> str:
+    quoted = ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+    return f"(ARRAY[{quoted}])[1 + {h(salt, g)} % {len(values)}]"
+
+def steps(cars: int) -> list:
+    """(label, SQL) in dependency order; the users step binds :password."""
+    users = max(cars // 2, 1)
+    employees = max(cars // 1000, 20)
+    return [
+        ("categories", f"""
+            INSERT INTO categories (category_id, name, description)
+            SELECT g, (ARRAY{CATEGORIES!r})[g], 'Synthetic ' || lower((ARRAY{CATEGORIES!r})[g]) || ' listings'
+            FROM generate_series(1, {len(CATEGORIES)}) g
+        """),
+        ("cars", f"""
+            INSERT INTO cars (car_id, category_id, modelnum, manufacturer, model_name, year, engine_type,
+                              transmission, color, mileage, fuel_capacity, seating_capacity, price,
+                              available, added_date)
+            SELECT g, 1 + {h(1)} % {len(CATEGORIES)}, 'LT-' || g,
+                   {pick(["Toyota", "Honda", "Ford", "BMW", "Audi", "Tesla", "Hyundai", "Kia", "Nissan", "Volvo"], 2)},
+                   'Model ' || (1 + {h(3)} % 400), 2005 + {h(4)} % 20,
+                   {pick(["Petrol", "Petrol", "Diesel", "Hybrid", "Electric"], 5)},
+                   {pick(["Automatic", "Automatic", "Manual"], 6)},
+                   {pick(["White", "Black", "Silver", "Red", "Blue", "Grey"], 7)},
+                   {h(8)} % 200000, 40 + ({h(9)} % 400) / 10.0, 2 + {h(10)} % 7,
+                   8000 + {h(11)} % 92000 + ({h(12)} % 100) / 100.0,
+                   {h(13)} % 10 <> 0, CURRENT_DATE - ({h(14)} % 1500)
+            FROM generate_series(1, {cars}) g
+        """),
+        ("car_inventory", f"""
+            INSERT INTO car_inventory (car_id, location, quantity)
+            SELECT g, {pick(["Dhaka", "Chattogram", "Khulna", "Sylhet"], 15)}, {STOCK}
+            FROM generate_series(1, {cars}) g
+        """),
+        ("users", f"""
+            INSERT INTO users (user_id, email, username, password, address, phone, dob)
+            SELECT g, replace('{USER_EMAIL}', '{{}}', g::text), 'user' || g, :password,
+                   g || ' Load Test Road', '+880' || lpad(({h(16)})::text, 9, '0'),
+                   DATE '1960-01-01' + ({h(17)} % 15000)
+            FROM generate_series(1, {users}) g
+        """),
+        ("employees", f"""
+            INSERT INTO employees (emp_id, name, email, hire_date, salary, position, department, status)
+            SELECT g, 'Employee ' || g, 'employee' || g || '@loadtest.example',
+                   CURRENT_DATE - ({h(18)} % 3000), 30000 + {h(19)} % 70000,
+                   {pick(["Driver", "Dispatcher", "Courier", "Supervisor"], 20)},
+                   {pick(["Logistics", "Sales", "Support", "Warehouse"], 21)},
+                   {pick(["active", "active", "active", "on_leave", "inactive"], 22)}
+            FROM generate_series(1, {employees}) g
+        """),
+        # One purchase and one order per car; order items and reviews follow from them
+        ("purchase", f"""
+            INSERT INTO purchase (purchase_id, user_id, date, payment_method, status, invoice_number)
+            SELECT g, 1 + {h(23)} % {users}, CURRENT_DATE - ({h(24)} % 730),
+                   {pick(["Credit Card", "Bank Transfer", "Cash"], 25)},
+                   {pick(["paid", "paid", "paid", "paid", "paid", "paid", "paid", "pending", "pending", "refunded"], 26)},
+                   'LT-INV-' || g
+            FROM generate_series(1, {cars}) g
+        """),
+        ("orders", f"""
+            INSERT INTO orders (order_id, purchase_id, date, status, shipping_address, expected_delivery)
+            SELECT p.purchase_id, p.purchase_id, p.date,
+                   CASE WHEN p.status = 'paid'
+                        THEN {pick(["processing", "shipped", "delivered", "delivered", "delivered"], 27, "p.purchase_id")}
+                        ELSE 'processing' END,
+                   p.user_id || ' Load Test Road', p.date + 7
+            FROM purchase p
+        """),
+        ("order_item", f"""
+            INSERT INTO order_item (order_id, car_id, quantity, price_at_order)
+            SELECT o.order_id, c.car_id, 1, c.price
+            FROM orders o
+            CROSS JOIN LATERAL (VALUES (1 + {h(28, "o.order_id")} % {cars}),
+                                       (CASE WHEN o.order_id % 3 = 0 THEN 1 + {h(29, "o.order_id")} % {cars} END)) AS item(car_id)
+            JOIN cars c ON c.car_id = item.car_id
+        """),
+        ("purchase amounts", """
+            UPDATE purchase p SET amount = t.total
+            FROM (SELECT o.purchase_id, SUM(oi.price_at_order * oi.quantity) AS total
+                  FROM orders o JOIN order_item oi ON oi.order_id = o.order_id
+                  GROUP BY o.purchase_id) t
+            WHERE t.purchase_id = p.purchase_id
+        """),
+        ("shipping", f"""
+            INSERT INTO shipping (emp_id, order_id, shipping_provider, tracking_number, status,
+                                  shipped_date, delivery_date, delivery_address)
+            SELECT 1 + {h(30, "o.order_id")} % {employees}, o.order_id,
+                   {pick(["FedEx", "DHL", "Sundarban", "Pathao"], 31, "o.order_id")}, 'LT-TRK-' || o.order_id,
+                   o.status, o.date + 1 + {h(32, "o.order_id")} % 3,
+                   CASE WHEN o.status = 'delivered' THEN o.date + 4 + {h(33, "o.order_id")} % 6 END,
+                   o.shipping_address
+            FROM orders o
+            WHERE o.status IN ('shipped', 'delivered')
+        """),
+        # Of the first car in the purchase's order, which order_item drew with the same salt
+        ("reviews", f"""
+            INSERT INTO reviews (purchase_id, car_id, user_id, rating, review_text, created_at, is_visible, helpful_count)
+            SELECT p.purchase_id, 1 + {h(28, "p.purchase_id")} % {cars}, p.user_id,
+                   (ARRAY[1, 2, 3, 3, 4, 4, 4, 5, 5, 5])[1 + {h(34, "p.purchase_id")} % 10],
+                   'Synthetic review ' || p.purchase_id, p.date + 14,
+                   {h(35, "p.purchase_id")} % 10 <> 0, {h(36, "p.purchase_id")} % 25
+            FROM purchase p
+            WHERE p.status = 'paid' AND {h(37, "p.purchase_id")} % 10 < 7
+        """),
+    ]
+
+def reset_sequences(conn):
+    for table, column in [("categories", "category_id"), ("cars", "car_id"), ("car_inventory", "inventory_id"),
+                          ("users", "user_id"), ("employees", "emp_id"), ("purchase", "purchase_id"),
+                          ("orders", "order_id"), ("order_item", "order_item_id"), ("shipping", "ship_id"),
+                          ("reviews", "review_id")]:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), COALESCE(MAX({column}), 0) + 1, false) FROM {table}"
+        ))
+
+def seed(cars: int, reset: bool):
+    Base.metadata.create_all(bind=engine)
+    migrations.migrate()
+    password_hash = pwd_context.hash(LOADTEST_PASSWORD)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+        elif conn.scalar(text("SELECT EXISTS (SELECT 1 FROM cars)")):
+            sys.exit("the database already has cars; pass --reset to replace them")
+        for label, sql in steps(cars):
+            step_started = time.perf_counter()
+            rows = conn.execute(text(sql), {"password": password_hash} if label == "users" else {}).rowcount
+            print(f"{label:18s} {rows:10d} rows {time.perf_counter() - step_started:8.1f}s")
+        reset_sequences(conn)
+    with SessionLocal() as db:
+        print(f"{'car_rating_stats':18s} {backfill_rating_stats(db):10d} rows")
+        print(f"{'category prices':18s} {backfill_category_price_stats(db):10d} rows")
+    print(f"{'report views':18s} {len(refresh_views()):10d} refreshed")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"seeded {cars} cars in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES, key=SCALES.get), default="10k", help="number of cars")
+    parser.add_argument("--reset", action="store_true", help="truncate the application tables first")
+    args = parser.parse_args()
+    seed(SCALES[args.scale], args.reset)
@@ -0,0 +1,100 @@
+# bench/serialization.py
+"""Response serialization and compression cost of the large list endpoints.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.serialization --rows 1000
+
+Loads each endpoint's rows once, then times only the work after the
+query: the default FastAPI path (response_model validation,
+jsonable_encoder, json.dumps) against fast_json() (plain dicts, orjson),
+and the wire size and CPU of gzip, and brotli when it is installed, on
+the result. Times are medians in microseconds.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import zlib
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.admin import model_to_dict
+from app.database import SessionLocal
+from app.main import app
+from app.models.car import Car
+from app.models.car_inventory import CarInventory
+from app.models.review import ReviewModel, ReviewResponse
+from app.queries import EMPLOYEES_AND_SHIPPING_RECORDS
+from app.responses import BROTLI_QUALITY, GZIP_LEVEL, brotli, fast_json, rows_as_dicts
+
+def load_cases(db, rows: int) -> list:
+    """(route path, content the route returned before, function building the fast_json content)"""
+    cars = db.query(Car, CarInventory.quantity).outerjoin(CarInventory, Car.car_id == CarInventory.car_id) \
+        .order_by(Car.car_id).limit(rows).all()
+    cars_list = [dict(model_to_dict(car), quantity=quantity or 0) for car, quantity in cars]
+    reviews = db.query(ReviewModel).order_by(ReviewModel.review_id).limit(rows).all()
+    records = [{"emp_id": row[0], "employee_name": row[1], "department": row[2], "ship_id": row[3],
+                "shipping_provider": row[4], "shipping_status": row[5], "shipped_date": row[6],
+                "delivery_date": row[7]} for row in db.execute(EMPLOYEES_AND_SHIPPING_RECORDS).fetchall()[:rows]]
+    return [
+        ("/admin/cars", cars_list, lambda: cars_list),
+        ("/reviews/", reviews, lambda: rows_as_dicts(reviews, ReviewResponse)),
+        ("/queries/employees-and-shipping-records", records, lambda: records),
+    ]
+
+def median_us(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(times)
+
+async def default_body(field, content) -> bytes:
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+async def median_us_async(coro_fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(times)
+
+async def run(rows: int, repeat: int):
+    fields = {route.path: route.response_field for route in app.routes if hasattr(route, "response_field")}
+    db = SessionLocal()
+    try:
+        cases = load_cases(db, rows)
+    finally:
+        db.close()
+    print(f"{'route':40s} {'rows':>5s} {'default us':>10s} {'fast us':>8s} {'json B':>8s} "
+          f"{'gzip B':>7s} {'gzip us':>7s} {'br B':>7s} {'br us':>6s}")
+    for path, before, after in cases:
+        field = fields[path]
+        default_us = await median_us_async(lambda: default_body(field, before), repeat)
+        fast_us = median_us(lambda: fast_json(after()).body, repeat)
+        body = fast_json(after()).body
+        gzip_us = median_us(lambda: zlib.compress(body, GZIP_LEVEL, 16 + zlib.MAX_WBITS), repeat)
+        gzip_bytes = len(zlib.compress(body, GZIP_LEVEL, 16 + zlib.MAX_WBITS))
+        if brotli is not None:
+            br_us = median_us(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat)
+            br = f"{len(brotli.compress(body, quality=BROTLI_QUALITY)):7d} {br_us:6.0f}"
+        else:
+            br = f"{'-':>7s} {'-':>6s}"
+        print(f"{path:40s} {len(before):5d} {default_us:10.0f} {fast_us:8.0f} {len(body):8d} "
+              f"{gzip_bytes:7d} {gzip_us:7.0f} {br}")
+    if brotli is None:
+        print("brotli is not installed; only gzip is measured")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="rows per endpoint, at most")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per case")
+    args = parser.parse_args()
+    if args.rows <= 0:
+        sys.exit("--rows must be positive")
+    asyncio.run(run(args.rows, args.repeat))
@@ -0,0 +1,68 @@
+# bench/statement_counts.py
+"""Check how many SQL statements each detail endpoint sends.
+
+Run from backend/ against a seeded PostgreSQL DATABASE_URL:
+
+    python -m bench.statement_counts
+
+Picks the user, purchase and order with the most children, so an N+1 or a
+row explosion would show up, and exits non-zero when an endpoint sends
+more statements than its loader options allow.
+"""
+import sys
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.database import async_engine, engine
+from app.main import app
+from app.sessions import issue_token
+
+# (label, path template, id query, statements expected)
+ENDPOINTS = [
+    ("car overview", "/cars/{}/overview",
+     "SELECT car_id FROM car_rating_stats ORDER BY visible_count DESC LIMIT 1", 2),
+    ("user with activity", "/users/{}/all",
+     "SELECT user_id FROM reviews GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1", 3),
+    ("admin user details", "/admin/users/{}",
+     "SELECT user_id FROM purchase GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1", 3),
+    ("admin purchase details", "/admin/purchases/{}",
+     "SELECT purchase_id FROM orders GROUP BY purchase_id ORDER BY COUNT(*) DESC LIMIT 1", 2),
+    ("admin order details", "/admin/orders/{}",
+     "SELECT order_id FROM order_item GROUP BY order_id ORDER BY COUNT(*) DESC LIMIT 1", 2),
+]
+
+class Statements:
+    """Statements and result rows seen by the engine."""
+
+    def __init__(self):
+        self.statements = self.rows = 0
+        for target in (engine, async_engine.sync_engine):  # async routes run on the second
+            event.listen(target, "after_cursor_execute", self.on_statement)
+
+    def on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.rows += max(cursor.rowcount, 0)
+
+    def reset(self):
+        self.statements = self.rows = 0
+
+if __name__ == "__main__":
+    client = TestClient(app)  # no startup events, so only the requests are counted
+    with engine.connect() as conn:
+        ids = [conn.execute(text(query)).scalar() for _, _, query, _ in ENDPOINTS]
+    seen = Statements()
+    failed = False
+    print(f"{'endpoint':24s} {'id':>8s} {'status':>6s} {'statements':>10s} {'expected':>8s} {'rows':>6s}")
+    for (label, path, _, expected), row_id in zip(ENDPOINTS, ids):
+        if row_id is None:
+            print(f"{label:24s} skipped, no data")
+            continue
+        seen.reset()
+        # /users/{id}/... routes want that user's session; the token is checked without SQL
+        headers = {"Authorization": f"Bearer {issue_token(row_id, 'bench')}"} if path.startswith("/users/") else {}
+        status = client.get(path.format(row_id), headers=headers).status_code
+        ok = status == 200 and seen.statements <= expected
+        failed |= not ok
+        print(f"{label:24s} {row_id:8d} {status:6d} {seen.statements:10d} {expected:8d} {seen.rows:6d}  {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,125 @@
+# bench/write_roundtrips.py
+"""Per-request cost of the create paths: add/commit/refresh vs INSERT ... RETURNING.
+
+Run from backend/ against a PostgreSQL DATABASE_URL with at least one user:
+
+    python -m bench.write_roundtrips --requests 200
+
+Each request gets its own session, as under get_db, and its timing includes
+serializing the response model, where the old path reloaded expired rows.
+Rows created by the benchmark are deleted at the end.
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, event, select
+
+from app.database import SessionLocal, engine
+from app.models.car import Car, CarBase, CarCreate, create_car
+from app.models.car_inventory import CarInventory
+from app.models.category import Category, CategoryCreate, CategoryResponse, create_category
+from app.models.employee import Employee, EmployeeCreate, EmployeeResponse, create_employee
+from app.models.order import Order, OrderCreate, OrderResponse, create_order
+from app.models.purchase import PurchaseModel, PurchaseCreate, PurchaseResponse, create_purchase
+from app.models.user import User
+
+def legacy_create(db, model, values):
+    row = model(**values)
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return row
+
+def legacy_create_car(db, car: CarCreate):
+    db_car = legacy_create(db, Car, car.dict())
+    legacy_create(db, CarInventory, {"car_id": db_car.car_id, "quantity": 10})
+    return db_car
+
+def cases(run, user_id, category_id, purchase_id):
+    """(name, model, response schema, old helper, new helper, payload factory)"""
+    return [
+        ("category", Category, CategoryResponse,
+         lambda db, c: legacy_create(db, Category, c.dict()), create_category,
+         lambda i: CategoryCreate(name=f"bench-{run}-{i}")),
+        ("employee", Employee, EmployeeResponse,
+         lambda db, e: legacy_create(db, Employee, e.dict()), create_employee,
+         lambda i: EmployeeCreate(name="bench", email=f"bench-{run}-{i}@example.com")),
+        ("purchase", PurchaseModel, PurchaseResponse,
+         lambda db, p: legacy_create(db, PurchaseModel, p.dict()), create_purchase,
+         lambda i: PurchaseCreate(user_id=user_id, amount=1, status="pending", invoice_number=f"BENCH-{run}-{i}")),
+        ("order", Order, OrderResponse,
+         lambda db, o: legacy_create(db, Order, o.dict()), create_order,
+         lambda i: OrderCreate(purchase_id=purchase_id, status="processing")),
+        ("car + inventory", Car, CarBase,
+         legacy_create_car, create_car,
+         lambda i: CarCreate(category_id=category_id, modelnum=f"BENCH-{run}-{i}")),
+    ]
+
+class RoundTrips:
+    """Count statements and commits sent to the server."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.on_statement)
+        event.listen(engine, "commit", self.on_commit)
+
+    def on_statement(self, *args):
+        self.count += 1
+
+    def on_commit(self, conn):
+        self.count += 1
+
+def measure(helper, schema, payload, requests, trips):
+    latencies, created = [], []
+    before = trips.count
+    for i in range(requests):
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            row = helper(db, payload(i))
+            schema.from_orm(row)  # what FastAPI does with the return value
+        finally:
+            db.close()
+        latencies.append((time.perf_counter() - started) * 1000)
+        created.append(row)
+    return statistics.median(latencies), statistics.fmean(latencies), (trips.count - before) / requests, created
+
+def cleanup(model, rows):
+    pk = model.__mapper__.primary_key[0]
+    ids = [getattr(row, pk.key) for row in rows]
+    with SessionLocal() as db:
+        if model is Car:
+            db.execute(delete(CarInventory).where(CarInventory.car_id.in_(ids)))
+        db.execute(delete(model).where(pk.in_(ids)))
+        db.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="creates per helper")
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        user_id = db.scalar(select(User.user_id).limit(1))
+        if user_id is None:
+            raise SystemExit("Seed at least one user first")
+    # Parents for the FK-bearing cases, created and removed by the benchmark
+    with SessionLocal() as db:
+        category = create_category(db, CategoryCreate(name=f"bench-{run}"))
+        purchase = create_purchase(db, PurchaseCreate(user_id=user_id, amount=1, invoice_number=f"BENCH-{run}"))
+
+    trips = RoundTrips()
+    print(f"{args.requests} creates per helper, one session per request")
+    print(f"{'entity':16s} {'old p50':>8s} {'new p50':>8s} {'old mean':>9s} {'new mean':>9s} {'saved':>7s} {'trips':>9s}")
+    try:
+        for name, model, schema, old, new, payload in cases(run, user_id, category.category_id, purchase.purchase_id):
+            old_p50, old_mean, old_trips, old_rows = measure(old, schema, lambda i: payload(f"old-{i}"), args.requests, trips)
+            new_p50, new_mean, new_trips, new_rows = measure(new, schema, lambda i: payload(f"new-{i}"), args.requests, trips)
+            print(f"{name:16s} {old_p50:7.2f}ms {new_p50:7.2f}ms {old_mean:8.2f}ms {new_mean:8.2f}ms "
+                  f"{old_mean - new_mean:6.2f}ms {old_trips:4.1f}->{new_trips:3.1f}")
+            cleanup(model, old_rows + new_rows)
+    finally:
+        cleanup(PurchaseModel, [purchase])
+        cleanup(Category, [category])
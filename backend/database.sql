@@ -129,4 +129,54 @@ CREATE TABLE reviews (
     is_visible BOOLEAN DEFAULT TRUE, -- moderation toggle
     helpful_count INT DEFAULT 0, -- like upvotes
     employee_feedback TEXT -- optional if staff behavior is reviewed
-);
\ No newline at end of file
+);
+
+CREATE TABLE inventory_holds (
+    hold_id SERIAL PRIMARY KEY,
+    car_id INT NOT NULL REFERENCES cars(car_id),
+    user_id INT REFERENCES users(user_id), -- cart owner, if known
+    quantity INT NOT NULL CHECK (quantity > 0),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL -- swept back into car_inventory after this
+);
+
+CREATE INDEX ix_inventory_holds_expires_at ON inventory_holds (expires_at);
+
+-- Review aggregates per car, maintained by the review write paths
+CREATE TABLE car_rating_stats (
+    car_id INT PRIMARY KEY REFERENCES cars(car_id) ON DELETE CASCADE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    visible_count INT NOT NULL DEFAULT 0,
+    visible_rating_sum INT NOT NULL DEFAULT 0,
+    avg_rating NUMERIC(4,3), -- visible reviews only
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_car_rating_stats_avg_rating ON car_rating_stats (avg_rating DESC NULLS LAST, car_id);
+
+-- Price distribution per category, maintained by the car write paths
+CREATE TABLE category_price_stats (
+    category_id INT PRIMARY KEY REFERENCES categories(category_id) ON DELETE CASCADE,
+    car_count INT NOT NULL DEFAULT 0,
+    priced_count INT NOT NULL DEFAULT 0, -- cars with a price
+    min_price NUMERIC(10, 2),
+    max_price NUMERIC(10, 2),
+    p10 NUMERIC(10, 2),
+    p25 NUMERIC(10, 2),
+    p50 NUMERIC(10, 2),
+    p75 NUMERIC(10, 2),
+    p90 NUMERIC(10, 2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Last refresh of each /queries report materialized view (app/analytics.py)
+CREATE TABLE analytics_refresh (
+    view_name VARCHAR(63) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL, -- UTC
+    duration_ms INT
+);
+
+-- Secondary indexes (catalog search, query workload) and the report
+-- materialized views are versioned in app/migrations.py and applied at
+-- startup or with `python -m app.migrations upgrade`.
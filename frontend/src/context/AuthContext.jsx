@@ -1,26 +1,71 @@
 import React, { createContext, useState, useEffect } from 'react';
+import axios from 'axios';
 
 export const AuthContext = createContext();
 
+// Routes that act for the signed-in user check this token instead of the password
+const setSessionToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
+  } else {
+    delete axios.defaults.headers.common['Authorization'];
+  }
+};
+
+// Read before the first render, so pages never see a signed-in user without a token
+const readStoredUser = () => {
+  const storedUser = localStorage.getItem('user');
+  if (!storedUser) {
+    return null;
+  }
+  const parsed = JSON.parse(storedUser);
+  if (!parsed.access_token) {
+    // Signed in before session tokens existed: sign in again
+    localStorage.removeItem('user');
+    return null;
+  }
+  setSessionToken(parsed.access_token);
+  return parsed;
+};
+
 export const AuthProvider = ({ children }) => {
-  const [user, setUser] = useState(null);
+  const [user, setUser] = useState(readStoredUser);
+
+  const endSession = () => {
+    setSessionToken(null);
+    setUser(null);
+    localStorage.removeItem('user');
+  };
 
   useEffect(() => {
-    // Check for existing user data in localStorage on mount
-    const storedUser = localStorage.getItem('user');
-    if (storedUser) {
-      setUser(JSON.parse(storedUser));
-    }
+    // A 401 on a request that carried the token means the session expired or was
+    // revoked (or the API restarted with a new secret): sign out, so pages ask
+    // for a login instead of showing a fetch error
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && error.config?.headers?.Authorization) {
+          endSession();
+        }
+        return Promise.reject(error);
+      },
+    );
+    return () => axios.interceptors.response.eject(interceptor);
   }, []);
 
   const login = (userData) => {
+    setSessionToken(userData.access_token);
     setUser(userData);
     localStorage.setItem('user', JSON.stringify(userData));
   };
 
   const logout = () => {
-    setUser(null);
-    localStorage.removeItem('user');
+    if (user?.access_token) {
+      axios.post('http://localhost:8000/users/logout', null, {
+        headers: { Authorization: `Bearer ${user.access_token}` },
+      }).catch(() => {});
+    }
+    endSession();
   };
 
   return (
@@ -28,4 +73,4 @@ export const AuthProvider = ({ children }) => {
       {children}
     </AuthContext.Provider>
   );
-};
\ No newline at end of file
+};
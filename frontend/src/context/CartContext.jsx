@@ -49,43 +49,19 @@ export const CartProvider = ({ children }) => {
       return { success: false, message: 'Please log in to place an order.' };
     }
     try {
-      const totalAmount = cartItems.reduce(
-        (total, item) => total + item.price * item.quantity,
-        0
-      );
-      const purchaseResponse = await axios.post('http://localhost:8000/purchases/', {
-        user_id: user.user_id,
-        amount: totalAmount,
+      // Purchase, order, order items and stock are written in one transaction
+      const checkoutResponse = await axios.post('http://localhost:8000/checkout/', {
         payment_method: orderDetails.paymentMethod,
-        status: 'pending',
-        invoice_number: `INV-${Date.now()}`,
-      });
-
-      const orderResponse = await axios.post('http://localhost:8000/orders/', {
-        purchase_id: purchaseResponse.data.purchase_id,
         shipping_address: orderDetails.shippingAddress,
-        status: 'processing',
-        expected_delivery: new Date(Date.now() + 7 * 24 * 60 * 60 * 1000).toISOString().split('T')[0], // 7 days from now
+        invoice_number: `INV-${Date.now()}`,
+        items: cartItems.map((item) => ({ car_id: item.car_id, quantity: item.quantity })),
       });
 
-      for (const item of cartItems) {
-        await axios.post('http://localhost:8000/order_items/', {
-          order_id: orderResponse.data.order_id,
-          car_id: item.car_id,
-          quantity: item.quantity,
-          price_at_order: item.price,
-        });
-
-        await axios.patch(`http://localhost:8000/car_inventory/${item.car_id}`, {
-          quantity: item.maxQuantity - item.quantity,
-        });
-      }
-
       clearCart();
       return {
         success: true,
         message: 'Order placed successfully!',
-        purchaseId: purchaseResponse.data.purchase_id,
+        purchaseId: checkoutResponse.data.purchase.purchase_id,
       };
     } catch (error) {
       console.error('Failed to submit order:', error);
@@ -87,23 +87,16 @@ const CarDetail = () => {
         }
 
         console.log('Fetching car data for carId:', carId);
-        const [carResponse, reviewsResponse] = await Promise.all([
-          axios.get(`http://localhost:8000/cars/${carId}/details`).catch(err => {
-            if (err.response?.status === 404) {
-              throw new Error('Car not found. It may have been removed or doesn’t exist.');
-            }
-            throw new Error(`Car API error: ${err.response?.status} ${err.response?.data?.detail || err.message}`);
-          }),
-          axios.get(`http://localhost:8000/reviews/cars/${carId}/reviews`).catch(err => {
-            if (err.response?.status === 404) {
-              return { data: [] }; // Handle missing reviews gracefully
-            }
-            throw new Error(`Reviews API error: ${err.response?.status} ${err.response?.data?.detail || err.message}`);
-          }),
-        ]);
+        // Car, stock, rating, first reviews and (when signed in) our purchase, in one request
+        const overviewResponse = await axios.get(`http://localhost:8000/cars/${carId}/overview?review_limit=100`).catch(err => {
+          if (err.response?.status === 404) {
+            throw new Error('Car not found. It may have been removed or doesn’t exist.');
+          }
+          throw new Error(`Car API error: ${err.response?.status} ${err.response?.data?.detail || err.message}`);
+        });
+        const carResponse = { data: overviewResponse.data.car };
 
-        console.log('Car Details Response:', carResponse.data);
-        console.log('Reviews Response:', reviewsResponse.data);
+        console.log('Car Overview Response:', overviewResponse.data);
 
         const carImageResult = getCarImage(carResponse.data.manufacturer);
 
@@ -124,17 +117,13 @@ const CarDetail = () => {
           available: carResponse.data.quantity > 0,
         });
         setReviews(
-          reviewsResponse.data.map(review => ({
+          overviewResponse.data.reviews.map(review => ({
             username: review.username || 'Anonymous',
             review_text: review.review_text || 'No comment',
             rating: review.rating || 0,
           }))
         );
-
-        if (user) {
-          const purchaseResponse = await axios.get(`http://localhost:8000/users/${user.user_id}/purchase-for-car/${carId}`);
-          setPurchaseIdForReview(purchaseResponse.data.purchase_id);
-        }
+        setPurchaseIdForReview(user ? overviewResponse.data.purchase_id : null);
 
       } catch (err) {
         console.error('Fetch error:', err);
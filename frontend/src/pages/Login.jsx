@@ -41,7 +41,11 @@ const LoginSignup = () => {
         password: formData.password,
       });
       if (response.status === 200) {
-        login({ user_id: response.data.user_id, username: response.data.username });
+        login({
+          user_id: response.data.user_id,
+          username: response.data.username,
+          access_token: response.data.access_token,
+        });
         navigate('/');
       }
     } catch (err) {
@@ -1,9 +1,11 @@
 import React, { useContext, useState, useEffect } from 'react';
+import { useNavigate } from 'react-router-dom';
 import { AuthContext } from '../context/AuthContext.jsx';
 import axios from 'axios';
 
 const UserProfile = () => {
     const { user } = useContext(AuthContext);
+    const navigate = useNavigate();
     const [userData, setUserData] = useState(null);
     const [editMode, setEditMode] = useState(false);
     const [formData, setFormData] = useState({});
@@ -12,6 +14,13 @@ const UserProfile = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
+    useEffect(() => {
+        // Not signed in, or the session just ended on a 401
+        if (!user) {
+            navigate('/login');
+        }
+    }, [user, navigate]);
+
     useEffect(() => {
         if (user) {
             const fetchData = async () => {
@@ -2,9 +2,13 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import AdminNavbar from '../../components/AdminNavbar';
 import Footer from '../../components/Footer';
+import './Admin.css';
+
+const PAGE_SIZE = 50;
 
 const ManageCars = () => {
     const [cars, setCars] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [categories, setCategories] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
@@ -37,8 +41,9 @@ const ManageCars = () => {
 
     const fetchCars = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/admin/cars');
+            const response = await axios.get('http://localhost:8000/admin/cars', { params: { limit: PAGE_SIZE } });
             setCars(response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (err) {
             setError('Failed to fetch cars.');
             console.error('Error fetching cars:', err);
@@ -47,6 +52,19 @@ const ManageCars = () => {
         }
     };
 
+    const loadMore = async () => {
+        try {
+            const response = await axios.get('http://localhost:8000/admin/cars', {
+                params: { limit: PAGE_SIZE, cursor: nextCursor },
+            });
+            setCars((prev) => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch more cars.');
+            console.error('Error fetching more cars:', err);
+        }
+    };
+
     const fetchCategories = async () => {
         try {
             const response = await axios.get('http://localhost:8000/categories/');
@@ -243,6 +261,9 @@ const ManageCars = () => {
                             ))}
                         </tbody>
                     </table>
+                    {nextCursor && (
+                        <button onClick={loadMore} className="load-more-button">Load more</button>
+                    )}
                 </div>
 
                 {showModal && editedCar && (
@@ -4,8 +4,11 @@ import AdminNavbar from '../../components/AdminNavbar';
 import Footer from '../../components/Footer';
 import './Admin.css';
 
+const PAGE_SIZE = 50;
+
 const ManageEmployees = () => {
     const [employees, setEmployees] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [selectedEmployee, setSelectedEmployee] = useState(null);
@@ -27,8 +30,9 @@ const ManageEmployees = () => {
 
     const fetchEmployees = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/admin/employees');
+            const response = await axios.get('http://localhost:8000/admin/employees', { params: { limit: PAGE_SIZE } });
             setEmployees(response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (err) {
             setError('Failed to fetch employees.');
             console.error('Error fetching employees:', err);
@@ -37,6 +41,19 @@ const ManageEmployees = () => {
         }
     };
 
+    const loadMore = async () => {
+        try {
+            const response = await axios.get('http://localhost:8000/admin/employees', {
+                params: { limit: PAGE_SIZE, cursor: nextCursor },
+            });
+            setEmployees((prev) => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch more employees.');
+            console.error('Error fetching more employees:', err);
+        }
+    };
+
     const handleRowClick = (employee) => {
         setSelectedEmployee(employee);
         setEditedEmployee(employee);
@@ -164,6 +181,9 @@ const ManageEmployees = () => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <button onClick={loadMore} className="load-more-button">Load more</button>
+                        )}
                     </div>
                 )}
 
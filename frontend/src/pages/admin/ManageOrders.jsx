@@ -4,8 +4,11 @@ import AdminNavbar from '../../components/AdminNavbar';
 import Footer from '../../components/Footer';
 import './Admin.css';
 
+const PAGE_SIZE = 50;
+
 const ManageOrders = () => {
     const [orders, setOrders] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [selectedOrder, setSelectedOrder] = useState(null);
@@ -14,8 +17,9 @@ const ManageOrders = () => {
     useEffect(() => {
         const fetchOrders = async () => {
             try {
-                const response = await axios.get('http://localhost:8000/admin/orders');
+                const response = await axios.get('http://localhost:8000/admin/orders', { params: { limit: PAGE_SIZE } });
                 setOrders(response.data);
+                setNextCursor(response.headers['x-next-cursor'] || null);
             } catch (err) {
                 setError('Failed to fetch orders.');
                 console.error('Error fetching orders:', err);
@@ -27,6 +31,19 @@ const ManageOrders = () => {
         fetchOrders();
     }, []);
 
+    const loadMore = async () => {
+        try {
+            const response = await axios.get('http://localhost:8000/admin/orders', {
+                params: { limit: PAGE_SIZE, cursor: nextCursor },
+            });
+            setOrders((prev) => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch more orders.');
+            console.error('Error fetching more orders:', err);
+        }
+    };
+
     const handleRowClick = async (orderId) => {
         try {
             const response = await axios.get(`http://localhost:8000/admin/orders/${orderId}`);
@@ -84,6 +101,9 @@ const ManageOrders = () => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <button onClick={loadMore} className="load-more-button">Load more</button>
+                        )}
                     </div>
                 )}
 
@@ -4,8 +4,11 @@ import AdminNavbar from '../../components/AdminNavbar';
 import Footer from '../../components/Footer';
 import './Admin.css';
 
+const PAGE_SIZE = 50;
+
 const ManageUsers = () => {
     const [users, setUsers] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [selectedUser, setSelectedUser] = useState(null);
@@ -19,8 +22,9 @@ const ManageUsers = () => {
 
     const fetchUsers = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/admin/users');
+            const response = await axios.get('http://localhost:8000/admin/users', { params: { limit: PAGE_SIZE } });
             setUsers(response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (err) {
             setError('Failed to fetch users.');
             console.error('Error fetching users:', err);
@@ -29,6 +33,19 @@ const ManageUsers = () => {
         }
     };
 
+    const loadMore = async () => {
+        try {
+            const response = await axios.get('http://localhost:8000/admin/users', {
+                params: { limit: PAGE_SIZE, cursor: nextCursor },
+            });
+            setUsers((prev) => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch more users.');
+            console.error('Error fetching more users:', err);
+        }
+    };
+
     const handleRowClick = async (userId) => {
         try {
             const response = await axios.get(`http://localhost:8000/admin/users/${userId}`);
@@ -126,6 +143,9 @@ const ManageUsers = () => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <button onClick={loadMore} className="load-more-button">Load more</button>
+                        )}
                     </div>
                 )}
 
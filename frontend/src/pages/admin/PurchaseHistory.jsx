@@ -4,8 +4,11 @@ import AdminNavbar from '../../components/AdminNavbar';
 import Footer from '../../components/Footer';
 import './Admin.css';
 
+const PAGE_SIZE = 50;
+
 const PurchaseHistory = () => {
     const [purchases, setPurchases] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [selectedPurchase, setSelectedPurchase] = useState(null);
@@ -14,8 +17,9 @@ const PurchaseHistory = () => {
     useEffect(() => {
         const fetchPurchases = async () => {
             try {
-                const response = await axios.get('http://localhost:8000/admin/purchases');
+                const response = await axios.get('http://localhost:8000/admin/purchases', { params: { limit: PAGE_SIZE } });
                 setPurchases(response.data);
+                setNextCursor(response.headers['x-next-cursor'] || null);
             } catch (err) {
                 setError('Failed to fetch purchase history.');
                 console.error('Error fetching purchase history:', err);
@@ -27,6 +31,19 @@ const PurchaseHistory = () => {
         fetchPurchases();
     }, []);
 
+    const loadMore = async () => {
+        try {
+            const response = await axios.get('http://localhost:8000/admin/purchases', {
+                params: { limit: PAGE_SIZE, cursor: nextCursor },
+            });
+            setPurchases((prev) => [...prev, ...response.data]);
+            setNextCursor(response.headers['x-next-cursor'] || null);
+        } catch (err) {
+            setError('Failed to fetch more purchases.');
+            console.error('Error fetching more purchases:', err);
+        }
+    };
+
     const handleRowClick = async (purchaseId) => {
         try {
             const response = await axios.get(`http://localhost:8000/admin/purchases/${purchaseId}`);
@@ -84,6 +101,9 @@ const PurchaseHistory = () => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <button onClick={loadMore} className="load-more-button">Load more</button>
+                        )}
                     </div>
                 )}
 